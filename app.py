@@ -1,10 +1,22 @@
 # app.py
+import multiprocessing
 import sys
 from PyQt6.QtWidgets import QApplication
 from ui.main_window import MainWindow
 
+
+def close_transport():
+    # Сетевой стек импортируется лениво; закрываем сессии, только если он успел загрузиться
+    transport = sys.modules.get("utils.transport")
+    if transport:
+        transport.close_all()
+
 if __name__ == "__main__":
+    # Процессы-шарды запускаются методом spawn; в собранном PyInstaller приложении это обязательно
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
+    # Закрываем общие keep-alive сессии при выходе из приложения
+    app.aboutToQuit.connect(close_transport)
     window = MainWindow()
     window.show()
     sys.exit(app.exec())
@@ -0,0 +1,573 @@
+"""
+Локальные заглушки узлов для бенчмарков: JSON-RPC EVM и REST Cosmos SDK
+с настраиваемой задержкой, разбросом, долей ошибок и лимитом частоты.
+
+    python benchmarks/mock_nodes.py --port 8545 --latency 0.05 --error-rate 0.01
+
+Один сервер обслуживает все сети: EVM-запросы принимаются POST по любому пути
+(например, /evm/ethereum), Cosmos — GET /cosmos/... (REST) и POST /cometbft (abci_query). Балансы детерминированно
+выводятся из адреса, поэтому результаты разных запусков совпадают.
+Заглушки используют только стандартную библиотеку.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+HEAD_BLOCK = 20_000_000
+BLOCK_GAS_LIMIT = 30_000_000
+# Время блока HEAD_BLOCK и интервал между блоками — для запросов eth_getBlockByNumber
+HEAD_TIMESTAMP = 1_720_000_000
+BLOCK_TIME = 12
+COSMOS_HEIGHT = 22_000_000
+# Валидаторов в сети и наибольшее число делегаций адреса: часть адресов не помещается
+# в одну страницу (100 записей по умолчанию)
+COSMOS_VALIDATORS = 180
+MAX_DELEGATIONS = 150
+PAGE_LIMIT = 100
+
+AGGREGATE3_SELECTOR = bytes.fromhex("82ad56cb")
+GET_ETH_BALANCE_SELECTOR = bytes.fromhex("4d2301cc")
+BALANCE_OF_SELECTOR = bytes.fromhex("70a08231")
+DECIMALS_SELECTOR = bytes.fromhex("313ce567")
+SYMBOL_SELECTOR = bytes.fromhex("95d89b41")
+
+COSMOS_ROUTES = {
+    "balance": re.compile(r"^/cosmos/bank/v1beta1/balances/([^/?]+)"),
+    "staked": re.compile(r"^/cosmos/staking/v1beta1/delegations/([^/?]+)"),
+    "unbonding": re.compile(r"^/cosmos/staking/v1beta1/delegators/([^/?]+)/unbonding_delegations"),
+    "validators": re.compile(r"^/cosmos/staking/v1beta1/validators/?$"),
+    "rewards": re.compile(r"^/cosmos/distribution/v1beta1/delegators/([^/?]+)/rewards"),
+    "latest": re.compile(r"^/cosmos/base/tendermint/v1beta1/blocks/latest"),
+}
+
+
+class NodeProfile:
+    """Поведение заглушки: задержка ответа, разброс, доля ошибок 503 и лимит запросов в секунду."""
+
+    def __init__(self, latency=0.02, jitter=0.01, error_rate=0.0, rate_limit=0, multicall=True):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        # 0 — без лимита; сверх лимита отвечаем 429 с Retry-After
+        self.rate_limit = rate_limit
+        # Развёрнут ли Multicall3 (eth_getCode возвращает код по любому адресу)
+        self.multicall = multicall
+
+    def delay(self):
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class TokenBucket:
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+def amount(*parts, modulus=10**21):
+    """Детерминированное значение для адреса (и токена): одно и то же при каждом запросе."""
+    digest = hashlib.blake2b("|".join(parts).lower().encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % modulus
+
+
+# --- ABI aggregate3 вручную, чтобы заглушке не требовался eth_abi ---
+
+def _word(value):
+    return value.to_bytes(32, "big")
+
+
+def _read_word(data, offset):
+    return int.from_bytes(data[offset:offset + 32], "big")
+
+
+def _padded(data):
+    return data + b"\0" * (-len(data) % 32)
+
+
+def decode_aggregate3_calls(data):
+    """Разбирает аргумент aggregate3((address,bool,bytes)[]) в список (target, calldata)."""
+    base = _read_word(data, 0)
+    count = _read_word(data, base)
+    heads = base + 32
+    calls = []
+    for i in range(count):
+        start = heads + _read_word(data, heads + 32 * i)
+        target = "0x" + data[start + 12:start + 32].hex()
+        calldata_start = start + _read_word(data, start + 64)
+        length = _read_word(data, calldata_start)
+        calls.append((target, data[calldata_start + 32:calldata_start + 32 + length]))
+    return calls
+
+
+def encode_aggregate3_returns(returns):
+    """Кодирует ответ aggregate3: (bool,bytes)[]."""
+    tuples = [_word(int(success)) + _word(64) + _word(len(data)) + _padded(data) for success, data in returns]
+    offsets = []
+    position = 32 * len(tuples)
+    for encoded in tuples:
+        offsets.append(_word(position))
+        position += len(encoded)
+    return _word(32) + _word(len(tuples)) + b"".join(offsets) + b"".join(tuples)
+
+
+def encode_string(value):
+    raw = value.encode()
+    return _word(32) + _word(len(raw)) + _padded(raw)
+
+
+def contract_call(target, calldata):
+    """Результат вызова контракта: (success, returnData)."""
+    selector, argument = calldata[:4], calldata[4:]
+    if selector == GET_ETH_BALANCE_SELECTOR:
+        return True, _word(amount("0x" + argument[12:32].hex()))
+    if selector == BALANCE_OF_SELECTOR:
+        return True, _word(amount(target, "0x" + argument[12:32].hex()))
+    if selector == DECIMALS_SELECTOR:
+        return True, _word(18)
+    if selector == SYMBOL_SELECTOR:
+        return True, encode_string("MOCK")
+    return False, b""
+
+
+class RpcMethodError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def block_number(tag):
+    if tag in (None, "latest", "pending", "safe", "finalized"):
+        return HEAD_BLOCK
+    if tag == "earliest":
+        return 0
+    return int(tag, 16)
+
+
+def evm_method(method, params, multicall=True):
+    if method == "eth_chainId":
+        return "0x1"
+    if method == "eth_blockNumber":
+        return hex(HEAD_BLOCK)
+    if method == "eth_getBalance":
+        return hex(amount(params[0]))
+    if method == "eth_getCode":
+        return "0x6080604052" if multicall else "0x"
+    if method == "eth_getBlockByNumber":
+        number = min(block_number(params[0]), HEAD_BLOCK)
+        return {
+            "number": hex(number),
+            "gasLimit": hex(BLOCK_GAS_LIMIT),
+            "timestamp": hex(HEAD_TIMESTAMP - (HEAD_BLOCK - number) * BLOCK_TIME),
+        }
+    if method == "eth_call":
+        call = params[0]
+        data = bytes.fromhex(call.get("data", call.get("input", "0x"))[2:])
+        if data[:4] == AGGREGATE3_SELECTOR:
+            returns = [contract_call(target, calldata) for target, calldata in decode_aggregate3_calls(data[4:])]
+            return "0x" + encode_aggregate3_returns(returns).hex()
+        success, returned = contract_call(call["to"], data)
+        if not success:
+            raise RpcMethodError(3, "execution reverted")
+        return "0x" + returned.hex()
+    raise RpcMethodError(-32601, f"the method {method} does not exist/is not available")
+
+
+def validator_address(index):
+    return f"cosmosvaloper1mock{index:03d}"
+
+
+def address_validators(address):
+    """Валидаторы, которым делегирует адрес: от 1 до MAX_DELEGATIONS подряд идущих."""
+    count = 1 + amount(address, "delegations", modulus=MAX_DELEGATIONS)
+    start = amount(address, "first", modulus=COSMOS_VALIDATORS)
+    return [validator_address((start + k) % COSMOS_VALIDATORS) for k in range(count)]
+
+
+def paginate(items, params):
+    """Страница списка по pagination.key / pagination.offset / pagination.limit, как в Cosmos SDK."""
+    def param(name):
+        values = params.get(f"pagination.{name}")
+        return values[0] if values else None
+
+    limit = int(param("limit") or PAGE_LIMIT)
+    key = param("key")
+    offset = int(base64.b64decode(key)) if key else int(param("offset") or 0)
+    end = offset + limit
+    pagination = {
+        "next_key": base64.b64encode(str(end).encode()).decode() if end < len(items) else None,
+        # total возвращается только по count_total и не вместе с key
+        "total": str(len(items)) if param("count_total") == "true" and not key else "0",
+    }
+    return items[offset:end], pagination
+
+
+def cosmos_response(query, address, params=None):
+    params = params or {}
+    if query == "latest":
+        return {"block": {"header": {"height": str(COSMOS_HEIGHT)}}}
+    if query == "validators":
+        validators = [{"operator_address": validator_address(index), "description": {"moniker": f"Mock {index}"}}
+                      for index in range(COSMOS_VALIDATORS)]
+        page, pagination = paginate(validators, params)
+        return {"validators": page, "pagination": pagination}
+    if query == "balance":
+        value = str(amount(address, query, modulus=10**12))
+        return {"balances": [{"denom": "uatom", "amount": value}], "pagination": {"next_key": None, "total": "1"}}
+    validators = address_validators(address)
+    if query == "staked":
+        delegations = [{
+            "delegation": {"delegator_address": address, "validator_address": validator,
+                           "shares": f"{amount(address, validator, modulus=10**10)}.000000000000000000"},
+            "balance": {"denom": "uatom", "amount": str(amount(address, validator, modulus=10**10))},
+        } for validator in validators]
+        page, pagination = paginate(delegations, params)
+        return {"delegation_responses": page, "pagination": pagination}
+    if query == "unbonding":
+        # Незавершённые выводы есть у каждого четвёртого адреса, по две записи у первого валидатора
+        unbonding = [{
+            "delegator_address": address,
+            "validator_address": validators[0],
+            "entries": [{"creation_height": str(COSMOS_HEIGHT - 1000 * k), "initial_balance": "0",
+                         "balance": str(amount(address, "unbonding", str(k), modulus=10**9))} for k in range(2)],
+        }] if amount(address, "unbonds", modulus=4) == 0 else []
+        page, pagination = paginate(unbonding, params)
+        return {"unbonding_responses": page, "pagination": pagination}
+    # Награды — DecCoin с 18 знаками после запятой
+    rewards = [{"validator_address": validator,
+                "reward": [{"denom": "uatom", "amount": f"{amount(address, 'rewards', validator, modulus=10**8)}"
+                                                          ".123456789000000000"}]}
+               for validator in validators]
+    total = sum(amount(address, "rewards", validator, modulus=10**8) * 10**18 + 123456789 * 10**9
+                for validator in validators)
+    return {"rewards": rewards, "total": [{"denom": "uatom", "amount": f"{total // 10**18}.{total % 10**18:018d}"}]}
+
+
+# --- protobuf для abci_query вручную, чтобы заглушке не требовались классы Cosmos SDK ---
+
+ABCI_PATHS = {
+    "/cosmos.bank.v1beta1.Query/Balance": "balance",
+    "/cosmos.staking.v1beta1.Query/DelegatorDelegations": "staked",
+    "/cosmos.staking.v1beta1.Query/DelegatorUnbondingDelegations": "unbonding",
+    "/cosmos.distribution.v1beta1.Query/DelegationTotalRewards": "rewards",
+    "/cosmos.staking.v1beta1.Query/Validators": "validators",
+}
+
+
+def _pb_varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _pb_field(number, value):
+    """Поле protobuf: str/bytes — length-delimited, int — varint (0 не кодируется)."""
+    if isinstance(value, int):
+        return _pb_varint(number << 3) + _pb_varint(value) if value else b""
+    if isinstance(value, str):
+        value = value.encode()
+    return _pb_varint(number << 3 | 2) + _pb_varint(len(value)) + value
+
+
+def _pb_decode(data):
+    fields = {}
+    pos = 0
+
+    def varint():
+        nonlocal pos
+        value = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value
+
+    while pos < len(data):
+        key = varint()
+        if key & 7 == 0:
+            value = varint()
+        else:
+            length = varint()
+            value = data[pos:pos + length]
+            pos += length
+        fields.setdefault(key >> 3, []).append(value)
+    return fields
+
+
+def _pb_coin(coin, dec=False):
+    amount = coin["amount"]
+    if dec:
+        # sdk.Dec в protobuf — целое, умноженное на 10^18, без точки
+        whole, _, fraction = amount.partition(".")
+        amount = str(int(whole) * 10**18 + int(fraction.ljust(18, "0")))
+    return _pb_field(1, coin["denom"]) + _pb_field(2, amount)
+
+
+def _pb_page(pagination):
+    next_key = base64.b64decode(pagination["next_key"]) if pagination["next_key"] else b""
+    return _pb_field(1, next_key) + _pb_field(2, int(pagination["total"]))
+
+
+def abci_query(path, data):
+    """Ответ abci_query: тот же ответ, что у REST-маршрута, закодированный в protobuf."""
+    query = ABCI_PATHS.get(path)
+    if query is None:
+        return {"response": {"code": 6, "log": f"unknown query path: {path}", "height": str(COSMOS_HEIGHT)}}
+    request = _pb_decode(bytes.fromhex(data))
+    address = request[1][0].decode() if query != "validators" and 1 in request else None
+    params = {}
+    if query in ("staked", "unbonding", "validators") and 2 in request:
+        page = _pb_decode(request[2][0])
+        if 1 in page:
+            params["pagination.key"] = [base64.b64encode(page[1][0]).decode()]
+        for number, name in ((2, "offset"), (3, "limit")):
+            if number in page:
+                params[f"pagination.{name}"] = [str(page[number][0])]
+        if page.get(4, [0])[0]:
+            params["pagination.count_total"] = ["true"]
+    rest = cosmos_response(query, address, params)
+
+    if query == "balance":
+        value = b"".join(_pb_field(1, _pb_coin(coin)) for coin in rest["balances"][:1])
+    elif query == "staked":
+        value = b"".join(_pb_field(1, _pb_field(1, _pb_field(1, item["delegation"]["delegator_address"])
+                                                   + _pb_field(2, item["delegation"]["validator_address"]))
+                                    + _pb_field(2, _pb_coin(item["balance"])))
+                         for item in rest["delegation_responses"])
+        value += _pb_field(2, _pb_page(rest["pagination"]))
+    elif query == "unbonding":
+        value = b"".join(_pb_field(1, _pb_field(1, item["delegator_address"]) + _pb_field(2, item["validator_address"])
+                                    + b"".join(_pb_field(3, _pb_field(1, int(entry["creation_height"]))
+                                                         + _pb_field(3, entry["initial_balance"])
+                                                         + _pb_field(4, entry["balance"]))
+                                               for entry in item["entries"]))
+                         for item in rest["unbonding_responses"])
+        value += _pb_field(2, _pb_page(rest["pagination"]))
+    elif query == "rewards":
+        value = b"".join(_pb_field(1, _pb_field(1, item["validator_address"])
+                                    + b"".join(_pb_field(2, _pb_coin(coin, dec=True)) for coin in item["reward"]))
+                         for item in rest["rewards"])
+        value += b"".join(_pb_field(2, _pb_coin(coin, dec=True)) for coin in rest["total"])
+    else:
+        # Validator: operator_address (1), description (7) с moniker (1)
+        value = b"".join(_pb_field(1, _pb_field(1, item["operator_address"])
+                                    + _pb_field(7, _pb_field(1, item["description"]["moniker"])))
+                         for item in rest["validators"])
+        value += _pb_field(2, _pb_page(rest["pagination"]))
+    return {"response": {"code": 0, "log": "", "value": base64.b64encode(value).decode(),
+                         "height": str(COSMOS_HEIGHT)}}
+
+
+def cometbft_method(method, params):
+    if method == "abci_query":
+        return abci_query(params["path"], params.get("data") or "")
+    if method == "status":
+        return {"sync_info": {"latest_block_height": str(COSMOS_HEIGHT)}}
+    raise RpcMethodError(-32601, "Method not found")
+
+
+class MockStats:
+    """Счётчики запросов, которые увидела заглушка."""
+
+    FIELDS = ("http_requests", "rpc_calls", "rest_calls", "injected_errors", "throttled")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, field, value=1):
+        with self.lock:
+            self.counts[field] += value
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counts)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 — клиенты держат keep-alive соединения, как с настоящими узлами
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def admit(self):
+        """Лимит частоты, задержка и случайные ошибки; False — ответ уже отправлен."""
+        nodes = self.server.nodes
+        nodes.stats.add("http_requests")
+        if nodes.bucket and not nodes.bucket.take():
+            nodes.stats.add("throttled")
+            self.send_json(429, {"error": "rate limited"}, {"Retry-After": "1"})
+            return False
+        time.sleep(nodes.profile.delay())
+        if random.random() < nodes.profile.error_rate:
+            nodes.stats.add("injected_errors")
+            self.send_json(503, {"error": "service unavailable"})
+            return False
+        return True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.admit():
+            return
+        payload = json.loads(body)
+        calls = payload if isinstance(payload, list) else [payload]
+        self.server.nodes.stats.add("rpc_calls", len(calls))
+        replies = []
+        for call in calls:
+            reply = {"jsonrpc": "2.0", "id": call.get("id")}
+            try:
+                if self.path.startswith("/cometbft"):
+                    reply["result"] = cometbft_method(call["method"], call.get("params") or {})
+                else:
+                    reply["result"] = evm_method(call["method"], call.get("params") or [],
+                                                 self.server.nodes.profile.multicall)
+            except RpcMethodError as e:
+                reply["error"] = {"code": e.code, "message": str(e)}
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                reply["error"] = {"code": -32602, "message": f"invalid params: {e}"}
+            replies.append(reply)
+        self.send_json(200, replies if isinstance(payload, list) else replies[0])
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        for query, route in COSMOS_ROUTES.items():
+            match = route.match(url.path)
+            if match:
+                break
+        else:
+            self.send_json(404, {"code": 5, "message": "not found"})
+            return
+        if not self.admit():
+            return
+        self.server.nodes.stats.add("rest_calls")
+        self.send_json(200, cosmos_response(query, match.group(1) if match.groups() else None, parse_qs(url.query)),
+                       {"Grpc-Metadata-X-Cosmos-Block-Height": str(COSMOS_HEIGHT)})
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Клиенты открывают десятки соединений сразу — очередь по умолчанию (5) мала
+    request_queue_size = 1024
+
+
+class MockNodes:
+    """
+    Заглушки узлов в фоновом потоке:
+
+        with MockNodes(NodeProfile(latency=0.05)) as nodes:
+            nodes.evm_url("ethereum"), nodes.cosmos_url, nodes.cosmos_rpc_url, nodes.stats.snapshot()
+    """
+
+    def __init__(self, profile=None, host="127.0.0.1", port=0):
+        self.profile = profile or NodeProfile()
+        self.bucket = TokenBucket(self.profile.rate_limit) if self.profile.rate_limit else None
+        self.stats = MockStats()
+        self.server = MockServer((host, port), MockHandler)
+        self.server.nodes = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def cosmos_url(self):
+        return self.url
+
+    @property
+    def cosmos_rpc_url(self):
+        return f"{self.url}/cometbft"
+
+    def evm_url(self, network):
+        return f"{self.url}/evm/{network}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_profile_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.02, help="средняя задержка ответа, с")
+    parser.add_argument("--jitter", type=float, default=0.01, help="разброс задержки, ± с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--rate-limit", type=float, default=0, help="запросов в секунду, 0 — без лимита")
+    parser.add_argument("--no-multicall", action="store_true", help="Multicall3 не развёрнут")
+
+
+def profile_from_args(args):
+    return NodeProfile(args.latency, args.jitter, args.error_rate, args.rate_limit, not args.no_multicall)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Заглушки узлов EVM и Cosmos для бенчмарков")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    nodes = MockNodes(profile_from_args(args), args.host, args.port)
+    print(f"EVM: {nodes.evm_url('<сеть>')}  Cosmos REST: {nodes.cosmos_url}  CometBFT RPC: {nodes.cosmos_rpc_url}"
+          "  (Ctrl+C — остановить)")
+    try:
+        nodes.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        nodes.server.server_close()
+        print(json.dumps(nodes.stats.snapshot()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Бенчмарк запуска GUI: время импорта модулей интерфейса и время до первого показа окна.
+
+    python benchmarks/startup.py --runs 5 --output startup.json
+
+Каждый замер выполняется в отдельном процессе, чтобы импорт был «холодным».
+Для серверов без дисплея используйте QT_QPA_PLATFORM=offscreen.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые не должны загружаться до открытия страниц чекеров
+HEAVY_MODULES = ["web3", "pyarrow", "aiohttp", "eth_abi", "requests"]
+
+CHILD_CODE = r"""
+import sys, time, json
+t0 = time.perf_counter()
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer
+t_qt = time.perf_counter()
+from ui.main_window import MainWindow
+t_import = time.perf_counter()
+app = QApplication(sys.argv)
+window = MainWindow()
+window.show()
+
+def shown():
+    t_shown = time.perf_counter()
+    print(json.dumps({
+        "qt_import": t_qt - t0,
+        "ui_import": t_import - t_qt,
+        "first_window": t_shown - t0,
+        "heavy_loaded": [m for m in HEAVY if m in sys.modules],
+    }))
+    app.quit()
+
+# Срабатывает после того, как цикл событий обработал показ окна
+QTimer.singleShot(0, shown)
+app.exec()
+"""
+
+
+def run_once():
+    started = time.perf_counter()
+    code = f"HEAVY = {HEAVY_MODULES!r}\n" + CHILD_CODE
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    elapsed = time.perf_counter() - started
+    sample = json.loads(result.stdout.strip().splitlines()[-1])
+    sample["process_to_window"] = elapsed
+    return sample
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк запуска GUI")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="куда сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    samples = [run_once() for _ in range(args.runs)]
+    summary = {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in ("qt_import", "ui_import", "first_window", "process_to_window")
+    }
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "median_seconds": summary,
+        "heavy_loaded": sorted({m for sample in samples for m in sample["heavy_loaded"]}),
+        "samples": samples,
+    }
+    for key, value in summary.items():
+        print(f"{key:>18}: {value * 1000:8.1f} мс")
+    if report["heavy_loaded"]:
+        print(f"Внимание: при запуске загружены тяжёлые модули: {', '.join(report['heavy_loaded'])}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
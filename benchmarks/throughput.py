@@ -0,0 +1,271 @@
+"""
+Бенчмарк пропускной способности чекеров на локальных заглушках узлов — без расхода квоты RPC.
+
+    python benchmarks/throughput.py --engine batch,multicall --output eth.json
+    python benchmarks/throughput.py --checker atom --sizes 1000 --error-rate 0.02 --rate-limit 200
+    python benchmarks/throughput.py --checker atom --cosmos-backend rest,rpc --latency 0.05
+    python benchmarks/throughput.py --sizes 10000 --compare eth.json
+
+Заглушки (benchmarks/mock_nodes.py) работают в этом процессе, а каждый прогон
+чекера — в отдельном: там измеряются время, задержки HTTP-запросов на стороне
+клиента и пиковый RSS, а число запросов, ошибок и 429 считают заглушки.
+Кэш и журнал в прогонах выключены, итоговые файлы пишутся во временный каталог.
+"""
+import argparse
+import configparser
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_nodes import MockNodes, add_profile_arguments, profile_from_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Символы данных bech32: синтетические адреса Cosmos выглядят как настоящие
+BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+
+
+def synthetic_addresses(checker, size):
+    if checker == "eth":
+        # web3 принимает только адреса с контрольной суммой EIP-55
+        from eth_utils import to_checksum_address
+
+        return [to_checksum_address(f"0x{i:040x}") for i in range(1, size + 1)]
+    addresses = []
+    for i in range(1, size + 1):
+        data = ""
+        while i:
+            i, digit = divmod(i, 32)
+            data += BECH32_CHARSET[digit]
+        addresses.append("cosmos1" + data.ljust(38, "q"))
+    return addresses
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def install_timers(latencies):
+    """Замеряет длительность каждого HTTP-запроса клиента (requests и aiohttp)."""
+    try:
+        import requests
+    except ImportError:
+        requests = None
+    if requests is not None:
+        send = requests.Session.send
+
+        def timed_send(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return send(self, *args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+        requests.Session.send = timed_send
+
+    try:
+        import aiohttp
+    except ImportError:
+        aiohttp = None
+    if aiohttp is not None:
+        request = aiohttp.ClientSession._request
+
+        async def timed_request(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await request(self, *args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+        aiohttp.ClientSession._request = timed_request
+
+
+def child_config(params):
+    from utils.eth_balance_check import NETWORK_COLUMNS
+
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "Networks": {network: str(network in params["networks"]) for network in NETWORK_COLUMNS},
+        "RPCs": {network: params["evm_url"] + network for network in NETWORK_COLUMNS},
+        "Performance": {"engine": params["engine"]},
+        "Output": {"output_dir": params["output_dir"], "format": params["format"]},
+        "Cache": {"enabled": "False"},
+        "Journal": {"enabled": "False"},
+        # rpc — батчи abci_query к CometBFT RPC заглушки вместо REST
+        "CosmosRPC": {"cosmoshub": params["cosmos_rpc_url"] if params["cosmos_backend"] == "rpc" else ""},
+    })
+    for override in params["overrides"]:
+        key, value = override.split("=", 1)
+        section, option = key.split(".", 1)
+        if not config.has_section(section):
+            config.add_section(section)
+        config.set(section, option, value)
+    return config
+
+
+def child_main(params):
+    """Один прогон чекера; последняя строка вывода — результаты в JSON."""
+    sys.path.insert(0, ROOT)
+    latencies = []
+    install_timers(latencies)
+    config = child_config(params)
+    addresses = synthetic_addresses(params["checker"], params["size"])
+
+    started = time.perf_counter()
+    if params["checker"] == "eth":
+        from utils.eth_balance_check import run_balance_check
+        output = run_balance_check(addresses, config=config)
+    else:
+        from utils import atom_balance_check
+        atom_balance_check.BASE_URL = params["cosmos_url"]
+        output = atom_balance_check.run_atom_check(addresses, config=config)
+    elapsed = time.perf_counter() - started
+
+    from utils.failure_report import failure_report_path
+    failures_path = failure_report_path(output)
+    failures = 0
+    if os.path.exists(failures_path):
+        with open(failures_path, encoding="utf-8") as f:
+            failures = max(0, sum(1 for _ in f) - 1)
+
+    print(json.dumps({
+        "seconds": round(elapsed, 3),
+        "client_requests": len(latencies),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+            "p99": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "failures": failures,
+    }))
+
+
+def run_once(nodes, checker, size, engine, args):
+    nodes.stats.reset()
+    with tempfile.TemporaryDirectory() as output_dir:
+        params = {
+            "checker": checker,
+            "size": size,
+            "engine": (engine if checker == "eth" else None) or "batch",
+            "cosmos_backend": engine if checker == "atom" else None,
+            "networks": args.networks.split(","),
+            "evm_url": nodes.evm_url(""),
+            "cosmos_url": nodes.cosmos_url,
+            "cosmos_rpc_url": nodes.cosmos_rpc_url,
+            "output_dir": output_dir,
+            "format": args.format,
+            "overrides": args.set,
+        }
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", json.dumps(params)],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+    sample = {"checker": checker, "engine": engine, "size": size}
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        sample["error"] = lines[-1] if lines else f"код выхода {result.returncode}"
+        return sample
+    sample.update(json.loads(result.stdout.strip().splitlines()[-1]))
+    sample.update(nodes.stats.snapshot())
+    sample["addresses_per_second"] = round(size / sample["seconds"], 1) if sample["seconds"] else None
+    return sample
+
+
+def run_key(sample):
+    # В результатах прежних версий режим Cosmos не записывался — это был REST
+    engine = sample["engine"] or ("rest" if sample["checker"] == "atom" else None)
+    return sample["checker"], engine, sample["size"]
+
+
+def print_sample(sample, baseline=None):
+    name = f"{sample['checker']:>4} {sample['engine'] or '-':>9} {sample['size']:>7}"
+    if "error" in sample:
+        print(f"{name}  ошибка: {sample['error']}")
+        return
+    line = (f"{name}  {sample['addresses_per_second']:>9} адр/с  запросов {sample['http_requests']:>7}"
+            f"  p50 {sample['latency_ms']['p50']} мс  p99 {sample['latency_ms']['p99']} мс"
+            f"  RSS {sample['peak_rss_mb']} МБ  ошибок {sample['failures']}")
+    if baseline and baseline.get("addresses_per_second"):
+        change = sample["addresses_per_second"] / baseline["addresses_per_second"] - 1
+        line += f"  ({change:+.1%} к базовому)"
+    print(line)
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк пропускной способности чекеров на заглушках узлов")
+    parser.add_argument("--checker", default="eth,atom", help="eth, atom или оба через запятую")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="размеры списков адресов через запятую")
+    parser.add_argument("--engine", default="batch", help="режимы ETH-чекера: single, batch, multicall")
+    parser.add_argument("--cosmos-backend", default="rest", help="режимы Cosmos-чекера: rest, rpc")
+    parser.add_argument("--networks", default="ethereum", help="включённые сети ETH-чекера через запятую")
+    parser.add_argument("--format", default="csv", help="формат итогового файла")
+    parser.add_argument("--set", action="append", default=[], metavar="Секция.ключ=значение",
+                        help="переопределить параметр config.ini, например Performance.batch_size=200")
+    parser.add_argument("--output", help="куда сохранить результаты в JSON")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения адресов в секунду")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child_main(json.loads(args.child))
+        return None
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {run_key(sample): sample for sample in json.load(f)["runs"]}
+
+    profile = profile_from_args(args)
+    samples = []
+    with MockNodes(profile) as nodes:
+        for checker in args.checker.split(","):
+            engines = (args.engine if checker == "eth" else args.cosmos_backend).split(",")
+            for engine in engines:
+                for size in (int(value) for value in args.sizes.split(",")):
+                    sample = run_once(nodes, checker, size, engine, args)
+                    print_sample(sample, baseline.get(run_key(sample)))
+                    samples.append(sample)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "profile": profile.as_dict(),
+        "networks": args.networks.split(","),
+        "overrides": args.set,
+        "runs": samples,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# cli.py
+"""
+Консольный запуск проверок без графического интерфейса (cron, серверы без дисплея).
+
+    python cli.py eth -i addresses.txt --networks ethereum,base --format csv
+    python cli.py eth -i wallets.xlsx
+    python cli.py eth -i addresses.txt --history 2024-01..2024-12
+    cat addresses.txt | python cli.py atom --output-dir results
+
+Тяжёлые модули (web3, aiohttp) импортируются только для выбранной команды,
+PyQt6 не импортируется вовсе.
+"""
+import argparse
+import configparser
+import multiprocessing
+import sys
+
+from utils.address_import import COSMOS, EVM, import_addresses, rejected_report_path
+from utils.get_config_path import config_path
+from utils.writers import OUTPUT_FORMATS
+
+NETWORKS = ["ethereum", "arbitrum", "optimism", "linea", "zksync", "scroll", "base", "arbitrum_nova"]
+
+
+def read_addresses(source, kind, config, basename):
+    """
+    Читает адреса из файла txt/csv/xlsx или stdin: некорректные строки и повторы
+    отбрасываются, отклонённые строки попадают в отчёт рядом с итоговым файлом.
+    """
+    imported = import_addresses(sys.stdin if source in (None, "-") else source, kind,
+                                report_path=rejected_report_path(basename, config))
+    sys.stderr.write(imported.summary() + "\n")
+    if not imported.addresses:
+        raise ValueError("Нет корректных адресов для проверки")
+    return imported.addresses
+
+
+def make_progress(label):
+    last = -1
+
+    def progress(percent):
+        nonlocal last
+        if percent != last:
+            last = percent
+            sys.stderr.write(f"\r{label}: {percent}%")
+            sys.stderr.flush()
+            if percent >= 100:
+                sys.stderr.write("\n")
+
+    return progress
+
+
+def load_config(args):
+    config = configparser.ConfigParser()
+    config.read(args.config or config_path)
+    for section in ("Networks", "Output", "Performance", "Snapshot"):
+        if not config.has_section(section):
+            config.add_section(section)
+    if getattr(args, "networks", None):
+        selected = {name.strip() for name in args.networks.split(",") if name.strip()}
+        unknown = selected - set(NETWORKS)
+        if unknown:
+            raise SystemExit(f"Неизвестные сети: {', '.join(sorted(unknown))}")
+        for network in NETWORKS:
+            config.set("Networks", network, str(network in selected))
+    if args.format:
+        config.set("Output", "format", args.format)
+    if args.output_dir is not None:
+        config.set("Output", "output_dir", args.output_dir)
+    if getattr(args, "engine", None):
+        config.set("Performance", "engine", args.engine)
+    if getattr(args, "deadline", None) is not None:
+        config.set("Performance", "run_deadline", str(args.deadline))
+    if args.snapshot:
+        config.set("Snapshot", "enabled", "True")
+    return config
+
+
+def print_change(row):
+    print(", ".join(f"{key}={value}" for key, value in row.items()), flush=True)
+
+
+def run_eth(args):
+    config = load_config(args)
+    addresses = read_addresses(args.input, EVM, config, "ethereum_balances")
+    if args.watch:
+        from utils.eth_watch import run_eth_watch
+
+        run_eth_watch(addresses, on_change=print_change, config=config)
+        return
+    if args.history:
+        from utils.eth_history import run_eth_history
+
+        run_eth_history(addresses, args.history, progress_callback=make_progress("ETH"),
+                        bypass_cache=args.no_cache, config=config)
+        return
+
+    from utils.eth_balance_check import run_balance_check
+
+    run_balance_check(addresses, progress_callback=make_progress("ETH"),
+                      bypass_cache=args.no_cache, config=config)
+
+
+def run_atom(args):
+    config = load_config(args)
+    addresses = read_addresses(args.input, COSMOS, config, "atom_balances")
+    if args.watch:
+        from utils.atom_watch import run_atom_watch
+
+        run_atom_watch(addresses, on_change=print_change, config=config)
+        return
+
+    from utils.atom_balance_check import run_atom_check
+
+    run_atom_check(addresses, progress_callback=make_progress("ATOM"),
+                   bypass_cache=args.no_cache, config=config)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Checker app: проверка балансов без GUI")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(subparser):
+        subparser.add_argument("-i", "--input", help="файл с адресами: txt по одному на строке, csv или xlsx (по умолчанию stdin)")
+        subparser.add_argument("--format", choices=list(OUTPUT_FORMATS), help="формат итогового файла")
+        subparser.add_argument("--output-dir", help="директория для итогового файла")
+        subparser.add_argument("--config", help="путь к config.ini")
+        subparser.add_argument("--no-cache", action="store_true", help="не читать результаты из кэша")
+        subparser.add_argument("--snapshot", action="store_true",
+                               help="читать все адреса на одной закреплённой высоте блока")
+        subparser.add_argument("--watch", action="store_true",
+                               help="следить за адресами через websocket-подписку (endpoints в [Watch]), Ctrl+C — выход")
+
+    eth = subparsers.add_parser("eth", help="балансы ETH в EVM-сетях")
+    add_common(eth)
+    eth.add_argument("--networks", help=f"сети через запятую: {', '.join(NETWORKS)}")
+    eth.add_argument("--engine", choices=["single", "batch", "multicall"], help="режим запросов")
+    eth.add_argument("--deadline", type=float, metavar="СЕКУНДЫ",
+                     help="предел длительности запуска: по его истечении сохраняются готовые строки, "
+                          "журнал остаётся для продолжения")
+    eth.add_argument("--history", metavar="ДАТЫ",
+                     help="балансы на даты через запятую (2024-01-31, 2024-01-31T12:00, 2024-01, 2024-01..2024-06); "
+                          "нужен архивный узел")
+    eth.set_defaults(func=run_eth)
+
+    atom = subparsers.add_parser("atom", help="баланс, стейкинг и награды ATOM")
+    add_common(atom)
+    atom.set_defaults(func=run_atom)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        args.func(args)
+    except (ValueError, OSError) as e:
+        sys.stderr.write(f"Ошибка: {e}\n")
+        return 1
+    except KeyboardInterrupt:
+        # Выход из режима наблюдения: файл изменений уже закрыт в run_*_watch
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
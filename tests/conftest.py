@@ -0,0 +1,139 @@
+import configparser
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Заглушки узлов лежат в benchmarks/ и используются и бенчмарками, и тестами
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from mock_nodes import (  # noqa: E402
+    AGGREGATE3_SELECTOR, MockNodes, NodeProfile, RpcMethodError, decode_aggregate3_calls, evm_method
+)
+from utils.retry import RetryPolicy  # noqa: E402
+
+
+@pytest.fixture
+def nodes():
+    """Заглушки EVM и Cosmos без задержек и ошибок."""
+    with MockNodes(NodeProfile(latency=0, jitter=0)) as nodes:
+        yield nodes
+
+
+@pytest.fixture
+def policy():
+    """Повторы без заметных пауз, чтобы тесты с ошибками шли быстро."""
+    return RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.01)
+
+
+@pytest.fixture
+def eth_config(nodes, tmp_path):
+    """Конфигурация ETH-чекера против заглушек: включены ethereum и base, кэш и журнал выключены."""
+    from utils.eth_balance_check import NETWORK_COLUMNS
+
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "Networks": {network: str(network in ("ethereum", "base")) for network in NETWORK_COLUMNS},
+        "RPCs": {network: nodes.evm_url(network) for network in NETWORK_COLUMNS},
+        "Output": {"output_dir": str(tmp_path), "format": "csv"},
+        "Cache": {"enabled": "False"},
+        "Journal": {"enabled": "False"},
+        "Retry": {"max_attempts": "3", "base_delay": "0.001", "max_delay": "0.01"},
+    })
+    return config
+
+
+class ProviderStub:
+    """
+    EVM-провайдер с ограничениями, которых нет у MockNodes: лимит размера батча
+    (отказ одной ошибкой на весь батч), обрезанные ответы, временные ошибки
+    отдельных вызовов, лимит числа вызовов в aggregate3 и HTTP-ошибки из очереди
+    http_errors [(статус, заголовки)] — по одной на запрос. Ответы на сами
+    вызовы берутся из mock_nodes.evm_method. batches — размеры запросов с ответом 200,
+    times — моменты получения всех запросов (time.monotonic).
+    """
+
+    def __init__(self):
+        self.max_batch = None
+        self.truncate = None
+        self.max_aggregate = None
+        self.failures = {}  # {адрес: сколько раз ещё ответить ошибкой}
+        self.failure = {"code": -32603, "message": "internal error"}
+        self.http_errors = []
+        self.batches = []
+        self.times = []
+        self.lock = threading.Lock()
+
+    def reply(self, call):
+        params = call.get("params") or []
+        with self.lock:
+            key = params[0] if call["method"] == "eth_getBalance" else None
+            if self.failures.get(key):
+                self.failures[key] -= 1
+                return {"jsonrpc": "2.0", "id": call["id"], "error": self.failure}
+        if call["method"] == "eth_call" and self.max_aggregate is not None:
+            data = bytes.fromhex(params[0]["data"][2:])
+            if data[:4] == AGGREGATE3_SELECTOR and len(decode_aggregate3_calls(data[4:])) > self.max_aggregate:
+                return {"jsonrpc": "2.0", "id": call["id"], "error": {"code": -32000, "message": "out of gas"}}
+        try:
+            return {"jsonrpc": "2.0", "id": call["id"], "result": evm_method(call["method"], params)}
+        except RpcMethodError as e:
+            return {"jsonrpc": "2.0", "id": call["id"], "error": {"code": e.code, "message": str(e)}}
+
+    def http_error(self):
+        """Следующая HTTP-ошибка из очереди или None."""
+        with self.lock:
+            self.times.append(time.monotonic())
+            return self.http_errors.pop(0) if self.http_errors else None
+
+    def handle(self, payload):
+        calls = payload if isinstance(payload, list) else [payload]
+        with self.lock:
+            self.batches.append(len(calls))
+        if isinstance(payload, list) and self.max_batch is not None and len(calls) > self.max_batch:
+            return {"jsonrpc": "2.0", "id": None,
+                    "error": {"code": -32600, "message": f"batch size exceeds {self.max_batch}"}}
+        replies = [self.reply(call) for call in calls]
+        if isinstance(payload, list) and self.truncate is not None:
+            replies = replies[:self.truncate]
+        return replies if isinstance(payload, list) else replies[0]
+
+
+@pytest.fixture
+def provider():
+    """ProviderStub в фоновом потоке; url — адрес его JSON-RPC."""
+    stub = ProviderStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            error = stub.http_error()
+            status, headers = error if error else (200, {})
+            body = json.dumps(stub.handle(payload) if status == 200 else {"error": f"HTTP {status}"}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stub.url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        yield stub
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,90 @@
+import csv
+
+import eth_utils
+import pytest
+
+from utils.address_import import COSMOS, EVM, import_addresses, normalize_bech32, normalize_evm_chunk, text_lines
+
+# Примеры из EIP-55
+EIP55 = [
+    "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed",
+    "0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359",
+    "0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB",
+    "0xD1220A0cf47c7B9Be7A2E6BA89F429762e7b9aDb",
+]
+# Адрес Cosmos с байтами 0x01..0x14
+COSMOS_ADDRESS = "cosmos1qypqxpq9qcrsszg2pvxq6rs0zqg3yyc5lzv7xu"
+
+
+def test_eip55_checksums():
+    variants = EIP55 + [address.lower() for address in EIP55] + ["0x" + address[2:].upper() for address in EIP55]
+    results = normalize_evm_chunk(variants)
+    assert [address for address, _, _ in results] == EIP55 * 3
+    assert [key for _, key, _ in results] == [bytes.fromhex(address[2:]) for address in EIP55] * 3
+
+
+def test_eip55_rejects_wrong_checksum_and_malformed_values():
+    # Регистр одной буквы изменён
+    wrong_case = "0x5AAeb6053F3E94C9b9A09f33669435E7Ef1BeAed"
+    results = normalize_evm_chunk([wrong_case, EIP55[0][:-1], EIP55[0][:-1] + "g", "cosmos1abc"])
+    assert [reason for _, _, reason in results] == [
+        "неверная контрольная сумма EIP-55", "не EVM-адрес", "не EVM-адрес", "не EVM-адрес"]
+    # Без префикса 0x адрес принимается
+    assert normalize_evm_chunk([EIP55[1][2:].lower()])[0][0] == EIP55[1]
+
+
+def test_chunk_computes_checksum_once_per_address(monkeypatch):
+    calls = []
+    keccak = eth_utils.keccak
+    monkeypatch.setattr(eth_utils, "keccak", lambda data: calls.append(data) or keccak(data))
+    wrong_case = "0x5AAeb6053F3E94C9b9A09f33669435E7Ef1BeAed"
+    chunk = [EIP55[0], EIP55[0].lower(), wrong_case, EIP55[1], "0x123", EIP55[0]]
+    results = normalize_evm_chunk(chunk)
+    assert len(calls) == 2
+    # Общая контрольная сумма не смешивает вердикты: каждое значение проверяется само
+    assert [address or reason for address, _, reason in results] == [
+        EIP55[0], EIP55[0], "неверная контрольная сумма EIP-55", EIP55[1], "не EVM-адрес", EIP55[0]]
+
+
+def test_bech32_valid_address():
+    address, key, reason = normalize_bech32(COSMOS_ADDRESS)
+    assert (address, key, reason) == (COSMOS_ADDRESS, bytes(range(1, 21)), None)
+    # Адрес в верхнем регистре допустим и приводится к нижнему
+    assert normalize_bech32(COSMOS_ADDRESS.upper())[0] == COSMOS_ADDRESS
+
+
+@pytest.mark.parametrize("value, reason", [
+    (COSMOS_ADDRESS[:-1] + "q", "неверная контрольная сумма bech32"),
+    (COSMOS_ADDRESS[:10] + "b" + COSMOS_ADDRESS[11:], "недопустимые символы bech32"),
+    ("Cosmos" + COSMOS_ADDRESS[6:], "смешанный регистр в bech32"),
+    ("osmo" + COSMOS_ADDRESS[6:], "префикс osmo вместо cosmos"),
+    ("cosmosqypqxpq9", "не bech32-адрес"),
+    ("bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4", "префикс bc вместо cosmos"),
+])
+def test_bech32_rejections(value, reason):
+    assert normalize_bech32(value) == (None, None, reason)
+
+
+def test_bech32_payload_length_is_checked():
+    # Верная контрольная сумма BIP-173, но данные не 20/32 байта
+    assert normalize_bech32("bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4", "bc")[2] == "неверная длина адреса"
+
+
+def test_import_deduplicates_and_reports_rejected_lines(tmp_path):
+    report = tmp_path / "rejected.csv"
+    text = "\n".join([f' "{EIP55[0]}",', EIP55[0].lower(), "", "0x123", EIP55[1], EIP55[0].upper()])
+    result = import_addresses(text_lines(text), EVM, str(report), chunk_size=2)
+    assert result.addresses == EIP55[:2]
+    assert (result.total, result.duplicates, result.rejected) == (5, 2, 1)
+    with open(report, newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == [["line", "value", "reason"], ["4", "0x123", "не EVM-адрес"]]
+
+
+def test_import_csv_address_column(tmp_path):
+    path = tmp_path / "wallets.csv"
+    path.write_text("name,Address\nfirst,%s\nsecond,%s\nshort\n" % (COSMOS_ADDRESS, COSMOS_ADDRESS.upper()),
+                    encoding="utf-8")
+    result = import_addresses(str(path), COSMOS)
+    assert result.addresses == [COSMOS_ADDRESS]
+    # Строка без колонки адреса пустая и не считается
+    assert (result.total, result.duplicates, result.rejected) == (2, 1, 0)
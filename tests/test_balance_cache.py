@@ -0,0 +1,84 @@
+import types
+
+import pytest
+
+from utils import balance_cache
+from utils.balance_cache import BalanceCache, WriteOnlyCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Подменяет время модуля кэша: clock.now двигается тестом."""
+    clock = types.SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(balance_cache, "time", types.SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = BalanceCache(str(tmp_path / "cache.sqlite3"), ttl=60, flush_every=1)
+    yield cache
+    cache.close()
+
+
+def test_latest_values_expire_after_ttl(cache, clock):
+    cache.put("ethereum", "0xa", "balance", 10)
+    clock.now += 59
+    assert cache.get("ethereum", "0xa", "balance") == 10
+    clock.now += 2
+    assert cache.get("ethereum", "0xa", "balance") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_values_at_height_never_expire(cache, clock):
+    cache.put("ethereum", "0xa", "balance", 10, height=100)
+    clock.now += 10 ** 6
+    assert cache.get("ethereum", "0xa", "balance", height=100) == 10
+    assert cache.get("ethereum", "0xa", "balance", height="100") == 10
+
+
+def test_height_is_part_of_the_key(cache):
+    cache.put("ethereum", "0xa", "balance", 1)
+    cache.put("ethereum", "0xa", "balance", 2, height=100)
+    cache.put("ethereum", "0xa", "balance", 3, height=101)
+    assert cache.get("ethereum", "0xa", "balance") == 1
+    assert cache.get("ethereum", "0xa", "balance", height=100) == 2
+    assert cache.get("ethereum", "0xa", "balance", height=101) == 3
+    assert cache.get("ethereum", "0xa", "balance", height=102) is None
+    assert cache.get("base", "0xa", "balance", height=100) is None
+    assert cache.get("ethereum", "0xa", "staked", height=100) is None
+
+
+def test_pending_values_are_read_before_flush(tmp_path, clock):
+    cache = BalanceCache(str(tmp_path / "cache.sqlite3"), ttl=60, flush_every=100)
+    cache.put_many("cosmoshub", {"cosmos1a": {"amount": "5"}, "cosmos1b": None}, "rewards")
+    assert cache.get_many("cosmoshub", ["cosmos1a", "cosmos1c"], "rewards") == {"cosmos1a": {"amount": "5"}}
+    cache.close()
+    reopened = BalanceCache(str(tmp_path / "cache.sqlite3"), ttl=60)
+    assert reopened.get("cosmoshub", "cosmos1a", "rewards") == {"amount": "5"}
+    reopened.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = BalanceCache(str(tmp_path / "cache.sqlite3"), max_entries=2, flush_every=1)
+    for address in ("0xa", "0xb"):
+        cache.put("ethereum", address, "balance", 1, height=1)
+        clock.now += 1
+    cache.get("ethereum", "0xa", "balance", height=1)
+    clock.now += 1
+    cache.put("ethereum", "0xc", "balance", 1, height=1)
+    assert cache.get("ethereum", "0xb", "balance", height=1) is None
+    assert cache.get("ethereum", "0xa", "balance", height=1) == 1
+    assert cache.get("ethereum", "0xc", "balance", height=1) == 1
+    cache.close()
+
+
+def test_write_only_cache_misses_but_stores(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    bypass = WriteOnlyCache(path, flush_every=1)
+    bypass.put("ethereum", "0xa", "balance", 7, height=5)
+    assert bypass.get("ethereum", "0xa", "balance", height=5) is None
+    bypass.close()
+    cache = BalanceCache(path)
+    assert cache.get("ethereum", "0xa", "balance", height=5) == 7
+    cache.close()
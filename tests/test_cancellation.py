@@ -0,0 +1,105 @@
+import configparser
+import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from eth_utils import to_checksum_address
+
+from mock_nodes import MockNodes, NodeProfile, amount
+from utils import eth_balance_check, transport
+from utils.eth_balance_check import NETWORK_COLUMNS, run_balance_check
+from utils.result_store import format_amount
+
+ADDRESSES = [to_checksum_address(f"0x{i:040x}") for i in range(1, 41)]
+LATENCY = 0.2
+
+
+@pytest.fixture
+def slow_nodes():
+    """Узлы с задержкой LATENCY на каждый запрос: полный запуск занимает секунды."""
+    with MockNodes(NodeProfile(latency=LATENCY, jitter=0)) as nodes:
+        yield nodes
+
+
+@pytest.fixture
+def executors(monkeypatch):
+    """Пулы потоков, созданные чекером за запуск."""
+    created = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(eth_balance_check, "ThreadPoolExecutor", RecordingExecutor)
+    return created
+
+
+def slow_config(nodes, tmp_path, engine, **performance):
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "Networks": {network: str(network == "ethereum") for network in NETWORK_COLUMNS},
+        "RPCs": {network: nodes.evm_url(network) for network in NETWORK_COLUMNS},
+        "Output": {"output_dir": str(tmp_path), "format": "csv"},
+        "Cache": {"enabled": "False"},
+        "Journal": {"enabled": "True"},
+        "Retry": {"max_attempts": "3", "base_delay": "0.001", "max_delay": "0.01"},
+        "Performance": {"engine": engine, "max_concurrency": "2", "network_concurrency": "2",
+                        "segment_size": "4", "batch_size": "4", **performance},
+    })
+    return config
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row["Address"]: row["ETH"] for row in csv.DictReader(f)}
+
+
+def assert_stopped_cleanly(nodes, path, executors, elapsed, limit):
+    # Запуск завершился вскоре после остановки, а не после всех адресов (40 * LATENCY / 2 = 4 с)
+    assert elapsed < limit
+    rows = read_rows(path)
+    assert 0 < len(rows) < len(ADDRESSES)
+    # В файл попали только готовые строки — с настоящими балансами, без пустых ячеек
+    for address, balance in rows.items():
+        assert balance == str(format_amount(amount(address), 18, 5))
+    # Пул потоков остановлен, keep-alive сессия узла закрыта
+    assert executors and all(executor._shutdown for executor in executors)
+    assert transport._host_key(nodes.url) not in transport._sessions
+    # Журнал оставлен для продолжения
+    with open(path + ".journal", encoding="utf-8") as f:
+        assert len(f.readlines()) > len(rows)
+
+
+@pytest.mark.parametrize("engine", ["single", "batch"])
+def test_run_deadline_stops_run(slow_nodes, tmp_path, executors, engine):
+    config = slow_config(slow_nodes, tmp_path, engine, run_deadline="1.5")
+    started = time.monotonic()
+    path = run_balance_check(ADDRESSES, config=config)
+    assert_stopped_cleanly(slow_nodes, path, executors, time.monotonic() - started, 1.5 + 4 * LATENCY)
+
+
+@pytest.mark.parametrize("engine", ["single", "batch"])
+def test_interrupt_stops_run(slow_nodes, tmp_path, executors, engine):
+    config = slow_config(slow_nodes, tmp_path, engine)
+    rows = []
+    stopped_at = []
+
+    def is_interrupted():
+        if len(rows) >= 4 and not stopped_at:
+            stopped_at.append(time.monotonic())
+        return bool(stopped_at)
+
+    path = run_balance_check(ADDRESSES, config=config, on_row=rows.append, is_interrupted=is_interrupted)
+    assert_stopped_cleanly(slow_nodes, path, executors, time.monotonic() - stopped_at[0], 4 * LATENCY)
+
+    # Повторный запуск продолжает с необработанных адресов и собирает полный файл
+    done = len(read_rows(path))
+    requests_before = slow_nodes.stats.snapshot()["rpc_calls"]
+    path = run_balance_check(ADDRESSES, config=slow_config(slow_nodes, tmp_path, engine, max_concurrency="16",
+                                                           network_concurrency="16", segment_size="40",
+                                                           batch_size="40"))
+    assert len(read_rows(path)) == len(ADDRESSES)
+    if engine == "single":
+        assert slow_nodes.stats.snapshot()["rpc_calls"] - requests_before <= len(ADDRESSES) - done + 2
@@ -0,0 +1,226 @@
+import base64
+import configparser
+
+import pytest
+
+import mock_nodes
+from utils import atom_balance_check, cosmos_rpc
+from utils.atom_balance_check import breakdown_path, run_atom_check
+from utils.cosmos_rpc import (
+    ABCI_QUERIES, _read_varint, _varint, abci_value, decode_fields, encode_page, fetch_abci_queries, field_bytes,
+    field_varint, format_dec
+)
+from utils.eth_batch import RpcError
+from utils.cosmos_staking import BOND_DENOM
+
+ADDRESS = "cosmos1roundtrip"
+ADDRESSES = [f"cosmos1parity{i:02d}" for i in range(12)]
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2 ** 32, 2 ** 64 - 1])
+def test_varint_round_trip(value):
+    encoded = _varint(value)
+    assert _read_varint(encoded + b"\x01", 0) == (value, len(encoded))
+
+
+def test_fields_round_trip():
+    message = field_bytes(1, "denom") + field_varint(2, 5) + field_varint(3, 0) + field_bytes(4, field_varint(1, 7))
+    fields = decode_fields(message)
+    # Значение по умолчанию в proto3 не кодируется
+    assert fields == {1: [b"denom"], 2: [5], 4: [field_varint(1, 7)]}
+    assert decode_fields(fields[4][0]) == {1: [7]}
+
+
+def test_truncated_message_is_rejected():
+    with pytest.raises(ValueError):
+        decode_fields(field_bytes(1, "uatom")[:-1])
+    with pytest.raises(ValueError):
+        decode_fields(b"\x08\x80")
+
+
+def test_encode_page():
+    assert decode_fields(encode_page(key=b"\x00\x01", offset=200, limit=100, count_total=True)) == {
+        1: [b"\x00\x01"], 2: [200], 3: [100], 4: [1]}
+    assert encode_page() == b""
+
+
+def test_request_encoders():
+    page = encode_page(limit=100, count_total=True)
+    assert decode_fields(ABCI_QUERIES["balance"][1](ADDRESS)) == {1: [ADDRESS.encode()], 2: [BOND_DENOM.encode()]}
+    for query in ("staked", "unbonding"):
+        assert decode_fields(ABCI_QUERIES[query][1](ADDRESS, page)) == {1: [ADDRESS.encode()], 2: [page]}
+    assert decode_fields(ABCI_QUERIES["rewards"][1](ADDRESS)) == {1: [ADDRESS.encode()]}
+    assert decode_fields(ABCI_QUERIES["validators"][1](None, page)) == {2: [page]}
+
+
+def test_format_dec():
+    assert format_dec(0) == "0.000000000000000000"
+    assert format_dec(1) == "0.000000000000000001"
+    assert format_dec(12 * 10 ** 18 + 5 * 10 ** 17) == "12.500000000000000000"
+
+
+def abci_response(query, address, page=None):
+    """Ответ заглушки на abci_query, разобранный декодером cosmos_rpc."""
+    path, encode, decode, _ = ABCI_QUERIES[query]
+    value, height = abci_value(mock_nodes.abci_query(path, encode(address, page).hex()))
+    assert height == mock_nodes.COSMOS_HEIGHT
+    return decode(value)
+
+
+def rest_pagination(pagination):
+    # REST отдаёт next_key в base64, декодер — сырыми байтами
+    next_key = pagination["next_key"]
+    return {"next_key": base64.b64decode(next_key) if next_key else None, "total": pagination["total"]}
+
+
+def address_with_unbonding():
+    return next(address for address in (f"cosmos1mock{i}" for i in range(100))
+                if mock_nodes.amount(address, "unbonds", modulus=4) == 0)
+
+
+def test_decoders_match_rest_responses():
+    address = address_with_unbonding()
+    page = encode_page(limit=100, count_total=True)
+    rest_page = {"pagination.limit": ["100"], "pagination.count_total": ["true"]}
+
+    assert abci_response("balance", address) == {
+        "balances": mock_nodes.cosmos_response("balance", address)["balances"]}
+
+    rest = mock_nodes.cosmos_response("staked", address, rest_page)
+    assert abci_response("staked", address, page) == {
+        "delegation_responses": [{"delegation": {key: item["delegation"][key]
+                                                 for key in ("delegator_address", "validator_address")},
+                                  "balance": item["balance"]} for item in rest["delegation_responses"]],
+        "pagination": rest_pagination(rest["pagination"]),
+    }
+
+    rest = mock_nodes.cosmos_response("unbonding", address, rest_page)
+    assert rest["unbonding_responses"]
+    assert abci_response("unbonding", address, page) == {
+        "unbonding_responses": [{"delegator_address": item["delegator_address"],
+                                 "validator_address": item["validator_address"],
+                                 "entries": [{"balance": entry["balance"]} for entry in item["entries"]]}
+                                for item in rest["unbonding_responses"]],
+        "pagination": rest_pagination(rest["pagination"]),
+    }
+
+    assert abci_response("rewards", address) == mock_nodes.cosmos_response("rewards", address)
+
+
+def test_validators_pagination_by_key_and_offset():
+    rest = mock_nodes.cosmos_response("validators", None, {"pagination.limit": ["100"],
+                                                           "pagination.count_total": ["true"]})
+    first = abci_response("validators", None, encode_page(limit=100, count_total=True))
+    assert first == {"validators": rest["validators"], "pagination": rest_pagination(rest["pagination"])}
+    assert first["pagination"]["total"] == str(mock_nodes.COSMOS_VALIDATORS)
+
+    by_key = abci_response("validators", None, encode_page(key=first["pagination"]["next_key"], limit=100))
+    by_offset = abci_response("validators", None, encode_page(offset=100, limit=100))
+    assert by_key == by_offset
+    assert by_key["pagination"] == {"next_key": None, "total": "0"}
+    assert len(first["validators"]) + len(by_key["validators"]) == mock_nodes.COSMOS_VALIDATORS
+
+
+class FakeBatches:
+    """
+    Подмена run_batched_calls поверх abci_query заглушки: запоминает раунды
+    [(страница, высота), ...], может убирать count_total из запросов справочника
+    валидаторов (узел без total) и терять вызовы с номерами из lose.
+    """
+
+    def __init__(self, count_total=True, lose=()):
+        self.count_total = count_total
+        self.lose = set(lose)
+        self.rounds = []
+
+    def __call__(self, session, rpc_url, calls, batch_size=100, policy=None):
+        self.rounds.append([])
+        results = {}
+        for number, method, params in calls:
+            path, data = params["path"], params["data"]
+            page = decode_fields(decode_fields(bytes.fromhex(data)).get(2, [b""])[0])
+            if not self.count_total:
+                page.pop(4, None)
+                data = field_bytes(2, encode_page(key=page.get(1, [None])[0], offset=page.get(2, [0])[0],
+                                                  limit=page.get(3, [0])[0])).hex()
+            self.rounds[-1].append((page, params["height"]))
+            if number not in self.lose:
+                results[number] = mock_nodes.abci_query(path, data)
+        return results
+
+
+def validator_names(items):
+    return [item["operator_address"] for item in items]
+
+
+VALIDATORS = [mock_nodes.validator_address(index) for index in range(mock_nodes.COSMOS_VALIDATORS)]
+
+
+def test_abci_pages_fan_out_by_offset_at_first_page_height(monkeypatch):
+    batches = FakeBatches()
+    monkeypatch.setattr(cosmos_rpc, "run_batched_calls", batches)
+    results = fetch_abci_queries(None, "http://rpc.test", [(None, "validators")], page_limit=50)
+    assert validator_names(results[None, "validators"]) == VALIDATORS
+
+    first, rest = batches.rounds
+    assert first == [({3: [50], 4: [1]}, "0")]
+    # Все остальные страницы — одним раундом по смещению на высоте первой страницы
+    assert sorted(page[2][0] for page, _ in rest) == [50, 100, 150]
+    assert {height for _, height in rest} == {str(mock_nodes.COSMOS_HEIGHT)}
+
+
+def test_abci_pages_follow_next_key_without_total(monkeypatch):
+    batches = FakeBatches(count_total=False)
+    monkeypatch.setattr(cosmos_rpc, "run_batched_calls", batches)
+    results = fetch_abci_queries(None, "http://rpc.test", [(None, "validators")], height=777, page_limit=80)
+    assert validator_names(results[None, "validators"]) == VALIDATORS
+    # Раунд на страницу, продолжение по ключу на заданной высоте
+    assert [len(calls) for calls in batches.rounds] == [1, 1, 1]
+    assert [1 in page for calls in batches.rounds for page, _ in calls] == [False, True, True]
+    assert {height for calls in batches.rounds for _, height in calls} == {"777"}
+
+
+def test_abci_lost_page_is_reported(monkeypatch):
+    # Вызов 2 — одна из страниц по смещению: узел её не вернул
+    batches = FakeBatches(lose=[2])
+    monkeypatch.setattr(cosmos_rpc, "run_batched_calls", batches)
+    address = ADDRESSES[0]
+    results = fetch_abci_queries(None, "http://rpc.test", [(None, "validators"), (address, "balance")],
+                                 page_limit=50)
+    error = results[None, "validators"]
+    assert isinstance(error, RpcError) and "не все страницы" in str(error)
+    assert results[address, "balance"]["balances"] == mock_nodes.cosmos_response("balance", address)["balances"]
+
+
+def read_output(path):
+    # Строки пишутся в порядке готовности адресов — сравниваем без учёта порядка
+    with open(path, encoding="utf-8") as f:
+        header, *rows = f.read().splitlines()
+    return [header] + sorted(rows)
+
+
+def run_check(tmp_path, name, rpc_url):
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "Output": {"output_dir": str(tmp_path / name), "format": "csv"},
+        "Cosmos": {"breakdown": "True"},
+        "CosmosRPC": {"cosmoshub": rpc_url},
+        "Cache": {"enabled": "False"},
+        "Journal": {"enabled": "False"},
+        "Retry": {"max_attempts": "3", "base_delay": "0.001", "max_delay": "0.01"},
+    })
+    (tmp_path / name).mkdir()
+    path = run_atom_check(ADDRESSES, config=config)
+    return read_output(path), read_output(breakdown_path(path))
+
+
+def test_rest_and_rpc_backends_produce_same_rows(nodes, tmp_path, monkeypatch):
+    monkeypatch.setattr(atom_balance_check, "BASE_URL", nodes.cosmos_url)
+    rest = run_check(tmp_path, "rest", "")
+    assert nodes.stats.snapshot()["rpc_calls"] == 0
+    rpc = run_check(tmp_path, "rpc", nodes.cosmos_rpc_url)
+    assert nodes.stats.snapshot()["rpc_calls"] > 0
+    assert rest == rpc
+    # Строка на адрес и разбивка по валидаторам с постраничными делегациями (больше PAGE_LIMIT)
+    assert len(rest[0]) == len(ADDRESSES) + 1
+    assert len(rest[1]) > len(ADDRESSES)
@@ -0,0 +1,87 @@
+import asyncio
+
+import mock_nodes
+from utils.cosmos_staking import HEIGHT_HEADER, RESPONSE_HEIGHT_HEADER, fetch_all_pages
+
+URL = "http://rest.test/cosmos/staking/v1beta1/validators"
+VALIDATORS = [mock_nodes.validator_address(index) for index in range(mock_nodes.COSMOS_VALIDATORS)]
+
+
+class FakeResponse:
+    def __init__(self, payload, height):
+        self.status = 200
+        self.headers = {RESPONSE_HEIGHT_HEADER: str(height)}
+        self._payload = payload
+
+    async def json(self, content_type=None):
+        return self._payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """
+    aiohttp-сессия поверх списка валидаторов заглушки: урезает limit до max_limit
+    (как публичные узлы), отдаёт total только при count_total=True и запоминает
+    параметры и заголовки каждого запроса.
+    """
+
+    def __init__(self, max_limit=mock_nodes.PAGE_LIMIT, count_total=True, height=1234):
+        self.max_limit = max_limit
+        self.count_total = count_total
+        self.height = height
+        self.requests = []
+
+    def get(self, url, params=None, headers=None):
+        self.requests.append((dict(params or {}), dict(headers or {})))
+        params = {name: [value] for name, value in (params or {}).items()}
+        params["pagination.limit"] = [str(min(int(params["pagination.limit"][0]), self.max_limit))]
+        if not self.count_total:
+            params.pop("pagination.count_total", None)
+        height, self.height = self.height, self.height + 1
+        return FakeResponse(mock_nodes.cosmos_response("validators", None, params), height)
+
+
+def operators(items):
+    return [item["operator_address"] for item in items]
+
+
+def test_pages_fan_out_by_offset_at_first_page_height():
+    session = FakeSession(max_limit=40)
+    items = asyncio.run(fetch_all_pages(session, URL, "validators"))
+    assert operators(items) == VALIDATORS
+
+    (first_params, first_headers), *rest = session.requests
+    assert first_params == {"pagination.limit": "100", "pagination.count_total": "true"}
+    assert first_headers == {}
+    # Шаг смещения — фактический размер первой страницы, высота — высота первой страницы
+    assert sorted(int(params["pagination.offset"]) for params, _ in rest) == [40, 80, 120, 160]
+    assert {params["pagination.limit"] for params, _ in rest} == {"40"}
+    assert all(headers == {HEIGHT_HEADER: "1234"} for _, headers in rest)
+
+
+def test_pinned_height_is_kept_for_all_pages():
+    session = FakeSession(max_limit=50)
+    items = asyncio.run(fetch_all_pages(session, URL, "validators", headers={HEIGHT_HEADER: "99"}))
+    assert operators(items) == VALIDATORS
+    assert [headers for _, headers in session.requests] == [{HEIGHT_HEADER: "99"}] * 4
+
+
+def test_pages_follow_next_key_without_total():
+    session = FakeSession(count_total=False)
+    items = asyncio.run(fetch_all_pages(session, URL, "validators", page_limit=60))
+    assert operators(items) == VALIDATORS
+    assert len(session.requests) == 3
+    assert ["pagination.key" in params for params, _ in session.requests] == [False, True, True]
+    assert not any("pagination.offset" in params for params, _ in session.requests)
+
+
+def test_single_page_makes_one_request():
+    session = FakeSession(max_limit=500)
+    items = asyncio.run(fetch_all_pages(session, URL, "validators", page_limit=500))
+    assert operators(items) == VALIDATORS
+    assert len(session.requests) == 1
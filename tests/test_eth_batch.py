@@ -0,0 +1,83 @@
+import requests
+
+from mock_nodes import amount
+from utils.eth_batch import BatchRejected, RpcError, get_balances_batch, run_batched_calls
+
+ADDRESSES = [f"0x{i:040x}" for i in range(1, 31)]
+
+
+def expected(addresses):
+    return {address: amount(address) for address in addresses}
+
+
+def test_batches_against_mock_nodes(nodes, policy):
+    progress = []
+    balances = get_balances_batch(requests.Session(), nodes.evm_url("ethereum"), ADDRESSES + ADDRESSES[:3],
+                                  batch_size=8, on_chunk=progress.append, policy=policy)
+    assert balances == expected(ADDRESSES)
+    assert sum(progress) == len(ADDRESSES)
+    # Повторяющиеся адреса не запрашиваются дважды: 30 вызовов — 4 батча
+    assert nodes.stats.snapshot()["http_requests"] == 4
+
+
+def test_rejected_batch_is_split_until_accepted(provider, policy):
+    provider.max_batch = 8
+    progress = []
+    balances = get_balances_batch(requests.Session(), provider.url, ADDRESSES, batch_size=30,
+                                  on_chunk=progress.append, policy=policy)
+    assert balances == expected(ADDRESSES)
+    assert sum(progress) == len(ADDRESSES)
+    # 30 -> 15 + 15 -> по 7 и 8: отказ на весь батч не повторяется, а делит его пополам
+    assert provider.batches == [30, 15, 7, 8, 15, 7, 8]
+
+
+def test_truncated_batch_resends_only_missing_calls(provider, policy):
+    provider.truncate = 7
+    balances = get_balances_batch(requests.Session(), provider.url, ADDRESSES, batch_size=30, policy=policy)
+    assert balances == expected(ADDRESSES)
+    assert provider.batches == [30, 23, 16, 9, 2]
+
+
+def test_batch_limit_error_inside_reply_counts_as_missing(provider, policy):
+    provider.failures = {ADDRESSES[0]: 1}
+    provider.failure = {"code": -32005, "message": "batch limit exceeded"}
+    balances = get_balances_batch(requests.Session(), provider.url, ADDRESSES[:5], batch_size=5, policy=policy)
+    assert balances == expected(ADDRESSES[:5])
+    assert provider.batches == [5, 1]
+
+
+def test_retryable_call_errors_are_retried(provider, policy):
+    provider.failures = {ADDRESSES[0]: 1, ADDRESSES[1]: 2}
+    progress = []
+    balances = get_balances_batch(requests.Session(), provider.url, ADDRESSES[:10], batch_size=10,
+                                  on_chunk=progress.append, policy=policy)
+    assert balances == expected(ADDRESSES[:10])
+    # Переотправляются только вызовы с ошибкой; прогресс не считается дважды
+    assert provider.batches == [10, 2, 1]
+    assert sum(progress) == 10
+
+
+def test_retryable_call_error_is_returned_after_max_attempts(provider, policy):
+    provider.failures = {ADDRESSES[0]: policy.max_attempts}
+    balances = get_balances_batch(requests.Session(), provider.url, ADDRESSES[:3], batch_size=3, policy=policy)
+    assert isinstance(balances[ADDRESSES[0]], RpcError)
+    assert balances[ADDRESSES[0]].code == -32603
+    assert {address: balances[address] for address in ADDRESSES[1:3]} == expected(ADDRESSES[1:3])
+    assert provider.batches == [3] + [1] * (policy.max_attempts - 1)
+
+
+def test_fatal_call_errors_are_not_retried(provider, policy):
+    calls = [("ok", "eth_blockNumber", []), ("bad", "eth_unknown", [])]
+    results = run_batched_calls(requests.Session(), provider.url, calls, policy=policy)
+    assert isinstance(results["bad"], RpcError)
+    assert results["bad"].code == -32601
+    assert results["ok"].startswith("0x")
+    assert provider.batches == [2]
+
+
+def test_single_rejected_call_reports_batch_rejected(provider, policy):
+    provider.max_batch = 0
+    results = run_batched_calls(requests.Session(), provider.url, [("a", "eth_blockNumber", []),
+                                                                  ("b", "eth_blockNumber", [])], policy=policy)
+    assert all(isinstance(error, BatchRejected) for error in results.values())
+    assert provider.batches == [2, 1, 1]
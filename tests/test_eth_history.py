@@ -0,0 +1,63 @@
+import calendar
+import datetime
+
+import requests
+
+from mock_nodes import BLOCK_TIME, HEAD_BLOCK, HEAD_TIMESTAMP
+from utils.balance_cache import BalanceCache
+from utils.eth_history import FINAL_DEPTH, find_blocks, parse_dates
+
+GENESIS_TIMESTAMP = HEAD_TIMESTAMP - HEAD_BLOCK * BLOCK_TIME
+
+
+def block_at(timestamp):
+    """Эталон для заглушки: последний блок с временем не позже timestamp."""
+    return HEAD_BLOCK - (HEAD_TIMESTAMP - timestamp + BLOCK_TIME - 1) // BLOCK_TIME
+
+
+def test_find_blocks_against_mock_node(nodes, policy):
+    timestamps = [
+        GENESIS_TIMESTAMP,                      # первый блок
+        GENESIS_TIMESTAMP + 1,                  # между блоками 0 и 1
+        GENESIS_TIMESTAMP + 12_345 * BLOCK_TIME,  # ровно время блока
+        HEAD_TIMESTAMP - 1_000_000 * BLOCK_TIME - 5,
+        HEAD_TIMESTAMP - 1,
+    ]
+    outside = [HEAD_TIMESTAMP + 100, GENESIS_TIMESTAMP - 1]
+    blocks = find_blocks(requests.Session(), nodes.evm_url("ethereum"), timestamps + outside, policy=policy)
+    assert blocks == {**{timestamp: block_at(timestamp) for timestamp in timestamps},
+                      HEAD_TIMESTAMP + 100: HEAD_BLOCK, GENESIS_TIMESTAMP - 1: None}
+    assert blocks[GENESIS_TIMESTAMP + 1] == 0
+    assert blocks[GENESIS_TIMESTAMP + 12_345 * BLOCK_TIME] == 12_345
+    # Интерполяция при ровном времени блока: все даты ищутся за несколько батчей, а не за log2(высоты)
+    assert nodes.stats.snapshot()["http_requests"] <= 6
+
+
+def test_found_blocks_are_cached_only_when_final(nodes, policy, tmp_path):
+    cache = BalanceCache(str(tmp_path / "cache.sqlite3"), flush_every=1)
+    old = HEAD_TIMESTAMP - 1000 * BLOCK_TIME
+    fresh = HEAD_TIMESTAMP - (FINAL_DEPTH // 2) * BLOCK_TIME
+    session = requests.Session()
+    url = nodes.evm_url("ethereum")
+    first = find_blocks(session, url, [old, fresh], policy=policy, cache=cache, network="ethereum")
+    assert first == {old: HEAD_BLOCK - 1000, fresh: HEAD_BLOCK - FINAL_DEPTH // 2}
+
+    requests_before = nodes.stats.snapshot()["http_requests"]
+    assert find_blocks(session, url, [old], policy=policy, cache=cache, network="ethereum") == {
+        old: HEAD_BLOCK - 1000}
+    assert nodes.stats.snapshot()["http_requests"] == requests_before
+    # Блок у вершины цепочки не кэшируется и ищется заново
+    assert find_blocks(session, url, [fresh], policy=policy, cache=cache, network="ethereum") == {
+        fresh: HEAD_BLOCK - FINAL_DEPTH // 2}
+    assert nodes.stats.snapshot()["http_requests"] > requests_before
+    cache.close()
+
+
+def test_parse_dates():
+    end_of_day = calendar.timegm(datetime.date(2024, 2, 29).timetuple()) + 86399
+    assert parse_dates("2024-02, 2024-02-29, 2024-01-31T12:00") == [
+        ("2024-01-31T12:00", calendar.timegm(datetime.datetime(2024, 1, 31, 12).timetuple())),
+        ("2024-02-29", end_of_day),
+    ]
+    assert [label for label, _ in parse_dates("2023-11..2024-02")] == [
+        "2023-11-30", "2023-12-31", "2024-01-31", "2024-02-29"]
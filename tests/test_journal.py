@@ -0,0 +1,86 @@
+import configparser
+from decimal import Decimal
+
+from utils.journal import RunJournal, input_fingerprint, open_journal, scale_progress
+
+ADDRESSES = ["0xa", "0xb", "0xc"]
+
+
+def test_fingerprint_depends_on_addresses_order_and_context():
+    fingerprint = input_fingerprint(ADDRESSES, "eth", "ethereum")
+    assert fingerprint == input_fingerprint(list(ADDRESSES), "eth", "ethereum")
+    assert fingerprint != input_fingerprint(ADDRESSES[::-1], "eth", "ethereum")
+    assert fingerprint != input_fingerprint(ADDRESSES, "eth", "ethereum", "base")
+    # Разделители не дают склеить соседние части
+    assert input_fingerprint(["0xab"], "c") != input_fingerprint(["0xa", "b"], "c")
+    assert input_fingerprint([], "ab", "c") != input_fingerprint([], "a", "bc")
+
+
+def test_resume_skips_done_addresses_and_keeps_meta(tmp_path):
+    path = str(tmp_path / "run.journal")
+    journal = RunJournal(path, "f1", meta={"height": 100})
+    journal.append("0xa", ["0xa", Decimal("1.50")])
+    journal.append("0xb", ["0xb", None], complete=False)
+    journal.close()
+
+    resumed = RunJournal(path, "f1", meta={"height": 200})
+    assert resumed.meta == {"height": 100}
+    assert resumed.is_done("0xa") and not resumed.is_done("0xb")
+    assert resumed.done_count == 1
+    resumed.append("0xb", ["0xb", Decimal("2")])
+    # Для перезапрошенного адреса остаётся последняя запись; Decimal восстанавливается без потерь
+    assert list(resumed.rows()) == [["0xa", Decimal("1.50")], ["0xb", Decimal("2")]]
+    resumed.close()
+
+
+def test_other_fingerprint_starts_over(tmp_path):
+    path = str(tmp_path / "run.journal")
+    journal = RunJournal(path, "f1")
+    journal.append("0xa", ["0xa", 1])
+    journal.close()
+
+    restarted = RunJournal(path, "f2", meta={"height": 5})
+    assert restarted.done_count == 0
+    assert restarted.meta == {"height": 5}
+    assert list(restarted.rows()) == []
+    restarted.close()
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    path = str(tmp_path / "run.journal")
+    journal = RunJournal(path, "f1")
+    journal.append("0xa", ["0xa", 1])
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "0xb", "row": ["0x')
+
+    resumed = RunJournal(path, "f1")
+    assert resumed.is_done("0xa") and not resumed.is_done("0xb")
+    resumed.append("0xb", ["0xb", 2])
+    assert list(resumed.rows()) == [["0xa", 1], ["0xb", 2]]
+    resumed.discard()
+
+
+def test_open_journal_uses_fingerprint_of_run(tmp_path):
+    config = configparser.ConfigParser()
+    output = str(tmp_path / "balances.csv")
+    journal = open_journal(config, output, ADDRESSES, "eth", meta={"blocks": {"ethereum": 1}})
+    journal.append("0xa", ["0xa", 1])
+    journal.close()
+    resumed = open_journal(config, output, ADDRESSES, "eth")
+    assert resumed.is_done("0xa") and resumed.meta == {"blocks": {"ethereum": 1}}
+    resumed.close()
+    other = open_journal(config, output, ADDRESSES, "eth", "base")
+    assert not other.is_done("0xa")
+    other.close()
+    config.read_dict({"Journal": {"enabled": "False"}})
+    assert open_journal(config, output, ADDRESSES, "eth") is None
+
+
+def test_scale_progress():
+    reported = []
+    progress = scale_progress(reported.append, 50, 50, 200)
+    progress(0)
+    progress(100)
+    assert reported == [25, 50]
+    assert scale_progress(None, 0, 1, 1) is None
@@ -0,0 +1,89 @@
+import pickle
+
+import pytest
+
+from utils import metrics
+
+URL = "http://metrics.test/rpc"
+BATCH_BODY = b'[{"jsonrpc": "2.0", "id": 0, "method": "eth_getBalance", "params": []}]'
+
+
+@pytest.fixture
+def registry():
+    """Чистый реестр метрик с одной зарегистрированной сетью."""
+    metrics.take_delta()
+    metrics.register_endpoints("metricsnet", [URL])
+    yield
+    metrics.take_delta()
+
+
+def test_query_of():
+    assert metrics.query_of(URL, BATCH_BODY) == "batch:eth_getBalance"
+    assert metrics.query_of(URL, '{"method": "eth_call"}') == "eth_call"
+    address = "cosmos1" + "q" * 38
+    assert metrics.query_of(f"http://rest.test/cosmos/bank/v1beta1/balances/{address}") == \
+        "/cosmos/bank/v1beta1/balances/{address}"
+
+
+def test_histogram_quantiles():
+    histogram = metrics.Histogram()
+    assert histogram.quantile(0.5) is None
+    for value in [0.005] * 50 + [0.2] * 49 + [100]:
+        histogram.observe(value)
+    assert histogram.counts[0] == 50 and histogram.counts[-1] == 1
+    assert histogram.quantile(0.5) == pytest.approx(0.01)
+    assert 0.1 < histogram.quantile(0.95) <= 0.25
+    # Значения выше последней границы оцениваются последней границей
+    assert histogram.quantile(1.0) == metrics.LATENCY_BUCKETS[-1]
+
+
+def test_delta_round_trip_matches_local_stats(registry):
+    observations = [(0.02, True, 100), (0.3, True, 200), (1.5, False, 0)]
+    metrics.begin_run("local", ["metricsnet"])
+    for seconds, ok, received in observations:
+        metrics.observe(URL, seconds, ok, BATCH_BODY, received)
+    metrics.count_retry("metricsnet", "batch:eth_getBalance", 2)
+    local = metrics.run_stats("local")
+
+    # Шард забирает приращение (как ShardChannel.flush) и передаёт его через очередь процессов
+    metrics.begin_run("merged", ["metricsnet"])
+    for seconds, ok, received in observations:
+        metrics.observe(URL, seconds, ok, BATCH_BODY, received)
+    metrics.count_retry("metricsnet", "batch:eth_getBalance", 2)
+    series, retries = pickle.loads(pickle.dumps(metrics.take_delta()))
+    assert metrics.run_stats("merged") == {}
+    metrics.merge_delta(series, retries)
+    metrics.merge_delta({}, {})
+    merged = metrics.run_stats("merged")
+
+    for stats in (local, merged):
+        row = stats["metricsnet"]
+        assert (row["requests"], row["errors"], row["retries"]) == (3, 1, 2)
+        assert row["bytes_sent"] == 3 * len(BATCH_BODY) and row["bytes_received"] == 300
+    without_rate = lambda stats: {key: value for key, value in stats["metricsnet"].items()
+                                  if key != "requests_per_second"}
+    assert without_rate(merged) == without_rate(local)
+
+    text = metrics.format_stats(merged)
+    assert text.startswith("metricsnet: 3 запросов (")
+    assert "ошибок 1, повторов 2" in text
+    assert f"p50 {merged['metricsnet']['p50_ms']} мс, p99 {merged['metricsnet']['p99_ms']} мс" in text
+    assert text.endswith("получено 0.0 МБ")
+
+
+def test_merge_delta_adds_to_existing_series(registry):
+    metrics.begin_run("sum", ["metricsnet"])
+    metrics.observe(URL, 0.02, True, BATCH_BODY, 1_048_576)
+    delta = metrics.take_delta()
+    for _ in range(2):
+        metrics.merge_delta(*pickle.loads(pickle.dumps(delta)))
+    metrics.observe(URL, 0.02, True, BATCH_BODY, 1_048_576)
+    row = metrics.run_stats("sum")["metricsnet"]
+    assert row["requests"] == 3 and row["bytes_received"] == 3 * 1_048_576
+    assert "получено 3.0 МБ" in metrics.format_stats({"metricsnet": row})
+
+
+def test_format_stats_sorts_networks():
+    row = {"requests": 1, "errors": 0, "retries": 0, "p50_ms": 1.0, "p99_ms": 2.0, "bytes_received": 0}
+    assert [line.split(":")[0] for line in metrics.format_stats({"b": row, "a": row}).splitlines()] == ["a", "b"]
+    assert metrics.format_stats({}) == ""
@@ -0,0 +1,46 @@
+import requests
+
+from mock_nodes import amount
+from utils.multicall import (
+    GET_ETH_BALANCE_SELECTOR, MULTICALL3_ADDRESS, decode_uint, get_balances_multicall, run_aggregate3
+)
+
+ADDRESSES = [f"0x{i:040x}" for i in range(1, 21)]
+
+
+def balance_call(address):
+    return GET_ETH_BALANCE_SELECTOR + bytes.fromhex(address[2:]).rjust(32, b"\0")
+
+
+def test_run_aggregate3_returns_results_per_key(nodes, policy):
+    calls = [(address, MULTICALL3_ADDRESS, balance_call(address)) for address in ADDRESSES[:3]]
+    # Неизвестный селектор: вызов внутри aggregate3 неуспешен, остальные не затронуты
+    calls.append(("unknown", MULTICALL3_ADDRESS, bytes.fromhex("deadbeef")))
+    progress = []
+    results = run_aggregate3(requests.Session(), nodes.evm_url("ethereum"), MULTICALL3_ADDRESS, calls, 10,
+                             on_chunk=progress.append, policy=policy)
+    assert {key: decode_uint(*results[key]) for key in ADDRESSES[:3]} == {a: amount(a) for a in ADDRESSES[:3]}
+    assert results["unknown"] == (False, b"")
+    assert progress == [4]
+    assert nodes.stats.snapshot()["rpc_calls"] == 1
+
+
+def test_get_balances_multicall_chunks_and_reports_bad_addresses(nodes, policy):
+    progress = []
+    balances = get_balances_multicall(requests.Session(), nodes.evm_url("ethereum"), MULTICALL3_ADDRESS,
+                                      ADDRESSES + ["0x1234", ADDRESSES[0]], chunk_size=7,
+                                      on_chunk=progress.append, policy=policy)
+    assert {address: balances[address] for address in ADDRESSES} == {a: amount(a) for a in ADDRESSES}
+    assert isinstance(balances["0x1234"], ValueError)
+    assert sum(progress) == len(ADDRESSES) + 1
+    # 20 адресов чанками по 7 — три eth_call
+    assert nodes.stats.snapshot()["rpc_calls"] == 3
+
+
+def test_chunk_over_node_limit_is_split(provider, policy):
+    provider.max_aggregate = 6
+    balances = get_balances_multicall(requests.Session(), provider.url, MULTICALL3_ADDRESS, ADDRESSES,
+                                      chunk_size=20, policy=policy)
+    assert balances == {a: amount(a) for a in ADDRESSES}
+    # 20 -> 10 + 10 -> 5 + 5 + 5 + 5: ошибка выполнения не повторяется, а делит чанк
+    assert provider.batches == [1] * 7
@@ -0,0 +1,102 @@
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import pytest
+
+from utils.result_store import ResultStore, format_amount, format_row
+
+
+class ListWriter:
+    """ResultWriter в памяти: строки копятся в rows."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.path = "memory"
+        self.rows = []
+        self.closed = False
+
+    @property
+    def rows_written(self):
+        return len(self.rows)
+
+    def write(self, row):
+        self.rows.append(row)
+
+    def close(self):
+        self.closed = True
+
+
+def exact(value, decimals, places):
+    """Эталон: точное деление в Decimal с банковским округлением."""
+    return (Decimal(value).scaleb(-decimals)).quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_EVEN)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (0, "0"),
+    (1, "0.00000"),
+    (5 * 10 ** 12, "0.00000"),       # ровно половина, чётное — вниз
+    (15 * 10 ** 12, "0.00002"),      # ровно половина, нечётное — вверх
+    (5 * 10 ** 12 + 1, "0.00001"),
+    (25 * 10 ** 12, "0.00002"),
+    (123456789012345678901234567, "123456789.01235"),
+])
+def test_format_amount_uses_bankers_rounding(value, expected):
+    assert format_amount(value, 18, 5) == Decimal(expected)
+
+
+def test_format_amount_scales_up_and_keeps_non_integers():
+    assert format_amount(1234567, 6, 6) == Decimal("1.234567")
+    assert format_amount(15, 2, 4) == Decimal("0.1500")
+    for value in (None, "-", Decimal("1.5"), True):
+        assert format_amount(value, 18, 5) is value
+
+
+def test_format_row():
+    amounts = {"balance": 6}
+    assert format_row({"address": "a", "balance": 2500000}, None, amounts, 6) == {
+        "address": "a", "balance": Decimal("2.500000")}
+    assert format_row(["a", 2500000], ["address", "balance"], amounts, 6) == ["a", Decimal("2.500000")]
+
+
+@pytest.mark.parametrize("values", [
+    # Суммы до 2^64 — векторный путь numpy, сверх — точная арифметика Python
+    [0, 1, 5 * 10 ** 12, 15 * 10 ** 12, 10 ** 18, 2 ** 64 - 1],
+    [2 ** 64, 10 ** 30, 2 ** 128 - 1, 12345],
+])
+def test_store_matches_exact_rounding(values):
+    writer = ListWriter(["address", "balance"])
+    store = ResultStore(writer, {"balance": 18}, 5, block_size=4)
+    store.write_many([[f"0x{i}", value] for i, value in enumerate(values)])
+    store.close()
+    assert writer.closed
+    assert writer.rows == [[f"0x{i}", exact(value, 18, 5)] for i, value in enumerate(values)]
+    assert store.totals == {"balance": sum(values)}
+    assert store.format_totals() == {"balance": format_amount(sum(values), 18, 5)}
+
+
+def test_store_keeps_special_cells_out_of_totals():
+    writer = ListWriter(["address", "balance", "staked", "height"])
+    store = ResultStore(writer, {"balance": 6, "staked": 6, "missing": 6}, 6)
+    store.write({"address": "a", "balance": 1_500_000, "staked": None, "height": 7})
+    store.write(["b", "-", 2 ** 130, 7])
+    store.write(["c", Decimal("3.000001"), -5, 7])
+    store.close()
+    assert writer.rows == [
+        ["a", Decimal("1.500000"), None, 7],
+        ["b", "-", format_amount(2 ** 130, 6, 6), 7],
+        ["c", Decimal("3.000001"), format_amount(-5, 6, 6), 7],
+    ]
+    # Колонки сумм, которых нет в файле, не учитываются; итоги — только по целым суммам
+    assert store.totals == {"balance": 1_500_000, "staked": 2 ** 130 - 5}
+
+
+@pytest.mark.parametrize("decimals", [19, 24, 25, 30, 40])
+def test_store_handles_tokens_with_many_decimals(decimals):
+    # Все суммы до 2^64, но делитель 10^(decimals - places) не укладывается в uint64
+    # или остаток * 2 переполняется
+    values = [9_999_999_999_999_999_999, 2 ** 64 - 1, 5 * 10 ** 18, 1, 0]
+    writer = ListWriter(["address", "amount"])
+    store = ResultStore(writer, {"amount": decimals}, 5)
+    store.write_many([[str(i), value] for i, value in enumerate(values)])
+    store.close()
+    assert writer.rows == [[str(i), exact(value, decimals, 5)] for i, value in enumerate(values)]
+    assert [row[1] for row in writer.rows] == [format_amount(value, decimals, 5) for value in values]
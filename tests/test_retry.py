@@ -0,0 +1,189 @@
+import asyncio
+import configparser
+import csv
+import email.utils
+import time
+
+import pytest
+import requests
+
+from mock_nodes import amount
+from utils.eth_balance_check import NETWORK_COLUMNS, run_balance_check
+from utils.eth_batch import BatchRejected, RpcError, run_batched_calls
+from utils.result_store import format_amount
+from utils.retry import (
+    AdaptiveLimiter, HTTPStatusError, RetryPolicy, is_retryable, is_throttled, parse_retry_after, retry_async,
+    retry_blocking
+)
+
+BLOCK_NUMBER = [("head", "eth_blockNumber", [])]
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (HTTPStatusError(429), True),
+    (HTTPStatusError(503), True),
+    (HTTPStatusError(500), True),
+    (HTTPStatusError(400), False),
+    (HTTPStatusError(404), False),
+    (RpcError({"code": -32603, "message": "internal error"}), True),
+    (RpcError({"code": -32005, "message": "limit exceeded"}), True),
+    (RpcError({"code": -32602, "message": "invalid params"}), False),
+    (RpcError({"code": 3, "message": "execution reverted"}), False),
+    (requests.Timeout(), True),
+    (requests.ConnectionError(), True),
+    (ValueError("bad value"), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_wrapped_errors_are_classified_by_cause():
+    try:
+        try:
+            raise requests.Timeout()
+        except requests.Timeout as e:
+            raise BatchRejected("timeout") from e
+    except BatchRejected as e:
+        assert is_retryable(e)
+    assert is_throttled(BatchRejected("HTTP 429", status=429))
+    assert not is_throttled(HTTPStatusError(503))
+
+
+def test_retry_after_header():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("soon") is None
+    moment = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 <= parse_retry_after(moment) <= 30
+    policy = RetryPolicy(base_delay=0.001, max_delay=10)
+    # Retry-After важнее экспоненциальной задержки, но не больше max_delay
+    assert policy.delay(0, HTTPStatusError(429, retry_after=3)) == 3
+    assert policy.delay(0, HTTPStatusError(429, retry_after=60)) == 10
+    assert policy.delay(0, HTTPStatusError(503)) <= 0.001
+
+
+def test_throttling_and_server_errors_are_retried(provider):
+    provider.http_errors = [(503, {}), (429, {"Retry-After": "0.3"})]
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=1)
+    results = run_batched_calls(requests.Session(), provider.url, BLOCK_NUMBER, policy=policy)
+    assert results["head"].startswith("0x")
+    assert len(provider.times) == 3
+    # Пауза после 429 — по Retry-After, а не по base_delay политики
+    assert provider.times[2] - provider.times[1] >= 0.3
+
+
+def test_client_errors_are_not_retried(provider, policy):
+    provider.http_errors = [(400, {})]
+    results = run_batched_calls(requests.Session(), provider.url, BLOCK_NUMBER, policy=policy)
+    assert isinstance(results["head"], BatchRejected) and results["head"].status == 400
+    assert len(provider.times) == 1
+
+
+def test_retries_stop_after_max_attempts(provider, policy):
+    provider.http_errors = [(503, {})] * 10
+    results = run_batched_calls(requests.Session(), provider.url, BLOCK_NUMBER, policy=policy)
+    assert isinstance(results["head"], BatchRejected) and results["head"].status == 503
+    assert len(provider.times) == policy.max_attempts
+
+
+def test_retry_blocking_reports_retries():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise HTTPStatusError(502)
+        return "ok"
+
+    retried = []
+    assert retry_blocking(flaky, RetryPolicy(max_attempts=3, base_delay=0.001),
+                          lambda e, attempt: retried.append(attempt)) == "ok"
+    assert retried == [0, 1]
+    with pytest.raises(HTTPStatusError):
+        retry_blocking(lambda: (_ for _ in ()).throw(HTTPStatusError(404)), RetryPolicy(base_delay=0.001))
+
+
+def test_adaptive_limiter_halves_on_throttle_and_recovers():
+    limiter = AdaptiveLimiter(8, cooldown=60)
+    limiter.on_throttle()
+    assert limiter.limit == 4
+    # Пачка одновременных 429 уменьшает лимит один раз за cooldown
+    limiter.on_throttle()
+    assert limiter.limit == 4
+    limiter.cooldown = 0
+    limiter.on_throttle()
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.limit == 1
+    # Аддитивный рост: +1/limit за успешный ответ, не выше исходного лимита
+    successes = 0
+    while limiter.limit < 8:
+        limiter.on_success()
+        successes += 1
+    assert limiter.limit == 8
+    assert 20 < successes < 40
+    limiter.on_success()
+    assert limiter.limit == 8
+
+
+def test_retry_async_throttles_limiter_and_caps_concurrency():
+    limits = []
+
+    class RecordingLimiter(AdaptiveLimiter):
+        def on_throttle(self):
+            super().on_throttle()
+            limits.append(self.limit)
+
+    limiter = RecordingLimiter(4, cooldown=0)
+    policy = RetryPolicy(max_attempts=5, base_delay=0.001, max_delay=0.01)
+    in_flight = []
+    peak = []
+    throttled = {"left": 2}
+
+    async def request():
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        if throttled["left"]:
+            throttled["left"] -= 1
+            raise HTTPStatusError(429)
+        return "ok"
+
+    async def main():
+        return await asyncio.gather(*(retry_async(request, policy, limiter) for _ in range(8)))
+
+    assert asyncio.run(main()) == ["ok"] * 8
+    assert max(peak) <= 4
+    # Два 429 подряд: 4 -> 2 -> 1, затем лимит растёт с каждым успешным ответом
+    assert limits == [2, 1]
+    assert limiter.limit > 2
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.parametrize("engine", ["single", "batch"])
+def test_failed_addresses_go_to_failure_report(provider, tmp_path, engine):
+    addresses = [f"0x{i:040x}" for i in range(1, 4)]
+    provider.failures = {addresses[1]: 100}
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "Networks": {network: str(network == "ethereum") for network in NETWORK_COLUMNS},
+        "RPCs": {network: provider.url for network in NETWORK_COLUMNS},
+        "Output": {"output_dir": str(tmp_path), "format": "csv"},
+        "Cache": {"enabled": "False"},
+        "Journal": {"enabled": "False"},
+        "Retry": {"max_attempts": "3", "base_delay": "0.001", "max_delay": "0.01"},
+        "Performance": {"engine": engine},
+    })
+    path = run_balance_check(addresses, config=config)
+    with open(path, newline="", encoding="utf-8") as f:
+        balances = {row["Address"].lower(): row["ETH"] for row in csv.DictReader(f)}
+    # Неполученный баланс — пустая ячейка, а не ноль или текст ошибки
+    assert balances[addresses[1]] == ""
+    for address in (addresses[0], addresses[2]):
+        assert balances[address] == str(format_amount(amount(address), 18, 5))
+    with open(tmp_path / "ethereum_balances_failures.csv", newline="", encoding="utf-8") as f:
+        failures = list(csv.DictReader(f))
+    assert [(row["address"].lower(), row["chain"], row["query"]) for row in failures] == [
+        (addresses[1], "ethereum", "native")]
+    assert "-32603" in failures[0]["error"]
@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.rpc_pool import EndpointPool, format_endpoints, parse_endpoints
+
+
+def test_parse_and_format_endpoints():
+    endpoints = parse_endpoints(" https://a.example|3 , https://b.example,, https://c.example|0 ")
+    assert endpoints == [("https://a.example", 3.0), ("https://b.example", 1.0), ("https://c.example", 0.01)]
+    assert format_endpoints(endpoints[:2]) == "https://a.example|3, https://b.example"
+    assert parse_endpoints("") == []
+    with pytest.raises(ValueError):
+        parse_endpoints("https://a.example|fast")
+
+
+def test_empty_pool_is_rejected():
+    with pytest.raises(ValueError):
+        EndpointPool("ethereum", [])
+
+
+def test_choose_prefers_faster_endpoint():
+    pool = EndpointPool("ethereum", [("fast", 1.0), ("slow", 1.0)])
+    fast, slow = pool.endpoints
+    for _ in range(10):
+        pool.record(fast, 0.01, True)
+        pool.record(slow, 0.5, True)
+    # Из двух случайных кандидатов берётся лучший: медленный выбирается, только если выпал дважды
+    picks = [pool.choose() for _ in range(400)]
+    assert picks.count(fast) > 250
+
+
+def test_errors_lower_the_score():
+    pool = EndpointPool("ethereum", [("a", 1.0), ("b", 1.0)], eject_after=100)
+    a, b = pool.endpoints
+    for ok in (True, False, False, True):
+        pool.record(a, 0.01, ok)
+        pool.record(b, 0.01, True)
+    assert a.error_rate == 0.5
+    assert a.score() > b.score()
+
+
+def test_endpoint_is_ejected_after_consecutive_failures():
+    pool = EndpointPool("ethereum", [("a", 1.0), ("b", 1.0)], eject_after=3, eject_seconds=60)
+    a, b = pool.endpoints
+    pool.record(a, 0.1, False)
+    pool.record(a, 0.1, False)
+    pool.record(a, 0.1, True)
+    pool.record(a, 0.1, False)
+    pool.record(a, 0.1, False)
+    # Успех сбрасывает счётчик ошибок подряд
+    assert a.ejected_until == 0
+    pool.record(a, 0.1, False)
+    assert a.ejected_until > time.monotonic()
+    assert {pool.choose() for _ in range(50)} == {b}
+
+
+def test_all_ejected_falls_back_to_earliest_return():
+    pool = EndpointPool("ethereum", [("a", 1.0), ("b", 1.0)])
+    a, b = pool.endpoints
+    a.ejected_until = time.monotonic() + 30
+    b.ejected_until = time.monotonic() + 10
+    assert pool.choose() is b
+    assert pool.choose(exclude=(b,)) is a
+
+
+def test_call_records_outcome():
+    pool = EndpointPool("ethereum", [("a", 1.0)])
+    (a,) = pool.endpoints
+    assert pool.call(lambda url: url.upper()) == "A"
+
+    def fail(url):
+        raise OSError("connection reset")
+
+    with pytest.raises(OSError):
+        pool.call(fail)
+    assert list(a.outcomes) == [True, False]
+    assert len(a.latencies) == 1
+
+
+def test_hedged_request_goes_to_second_endpoint():
+    pool = EndpointPool("ethereum", [("slow", 1.0), ("fast", 1.0)], hedge=True, hedge_min_samples=2)
+    slow, fast = pool.endpoints
+    for _ in range(5):
+        pool.record(slow, 0.01, True)
+        pool.record(fast, 0.5, True)
+    calls = []
+
+    def func(url):
+        calls.append(url)
+        time.sleep(0.5 if url == "slow" else 0)
+        return url
+
+    async def run(call, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, call, *args)
+
+    async def main():
+        pool.choose = lambda exclude=(): fast if slow in exclude else slow
+        return await pool.call_async(func, run)
+
+    # Основной эндпоинт не ответил за свою p95 — побеждает дублирующий запрос
+    assert asyncio.run(main()) == "fast"
+    assert calls == ["slow", "fast"]
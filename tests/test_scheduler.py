@@ -0,0 +1,124 @@
+import asyncio
+import configparser
+import threading
+import time
+
+import pytest
+
+from utils.scheduler import RunCancelled, Scheduler, TokenBucket, load_rate_limits
+
+
+def test_bucket_allows_burst_then_waits_for_refill():
+    bucket = TokenBucket(rate=10, burst=3)
+    assert [bucket._reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Токены кончились: следующий появится через 1/rate секунды, за ним — через 2/rate
+    assert bucket._reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket._reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_bucket_refills_up_to_burst():
+    bucket = TokenBucket(rate=50, burst=2)
+    bucket._reserve()
+    bucket._reserve()
+    time.sleep(0.1)
+    # За 0.1 с набралось бы 5 токенов, но бакет вмещает только burst
+    assert [bucket._reserve() for _ in range(2)] == [0.0, 0.0]
+    assert bucket._reserve() > 0
+
+
+def test_bucket_default_burst_is_rate():
+    assert TokenBucket(5).burst == 5
+    assert TokenBucket(0.5).burst == 1
+
+
+def test_bucket_holds_rate():
+    bucket = TokenBucket(rate=100, burst=1)
+    started = time.monotonic()
+    for _ in range(21):
+        bucket.acquire_blocking()
+    assert 0.18 <= time.monotonic() - started < 0.5
+
+    async def acquire_all():
+        await asyncio.gather(*(bucket.acquire() for _ in range(20)))
+
+    started = time.monotonic()
+    asyncio.run(acquire_all())
+    assert 0.18 <= time.monotonic() - started < 0.5
+
+
+def test_scheduler_limits_concurrency():
+    active = {"all": 0, "ethereum": 0}
+    peak = {"all": 0, "ethereum": 0}
+    lock = threading.Lock()
+
+    def work(network):
+        with lock:
+            for key in ("all", network):
+                if key in active:
+                    active[key] += 1
+                    peak[key] = max(peak[key], active[key])
+        time.sleep(0.02)
+        with lock:
+            for key in ("all", network):
+                if key in active:
+                    active[key] -= 1
+
+    async def main():
+        scheduler = Scheduler(max_concurrency=3, network_concurrency=2)
+        await asyncio.gather(*(scheduler.run(network, work, network)
+                               for network in ["ethereum", "base"] * 6))
+
+    asyncio.run(main())
+    assert peak == {"all": 3, "ethereum": 2}
+
+
+class RecordingSession:
+    def __init__(self):
+        self.posts = 0
+
+    def post(self, *args, **kwargs):
+        self.posts += 1
+        time.sleep(0.01)
+        return "ok"
+
+
+def test_cancel_stops_batch_workers():
+    async def main():
+        scheduler = Scheduler(rate_limits={"ethereum": 1000})
+        session = RecordingSession()
+        throttled = scheduler.throttle("ethereum", session)
+        cancelled = []
+
+        def worker():
+            # Пакетный цикл в потоке executor'а: посылает запросы, пока запуск не остановлен
+            try:
+                while True:
+                    throttled.post("http://node.test")
+            except RunCancelled:
+                cancelled.append(True)
+
+        workers = [scheduler.run("ethereum", worker) for _ in range(3)]
+        tasks = [asyncio.ensure_future(coro) for coro in workers]
+        await asyncio.sleep(0.1)
+        scheduler.cancel()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=2)
+        posts = session.posts
+        await asyncio.sleep(0.05)
+        return cancelled, posts, session.posts, throttled
+
+    cancelled, posts, posts_later, throttled = asyncio.run(main())
+    assert cancelled == [True] * 3
+    assert posts > 0 and posts_later == posts
+    # После остановки запрос не отправляется, остальные атрибуты — от исходной сессии
+    with pytest.raises(RunCancelled):
+        throttled.post("http://node.test")
+    assert throttled.posts == posts
+
+
+def test_load_rate_limits():
+    config = configparser.ConfigParser()
+    assert load_rate_limits(config) == {}
+    config.read_dict({"RateLimits": {"ethereum": "25", "base": "0"}})
+    assert load_rate_limits(config) == {"ethereum": 25.0, "base": 0.0}
+    # Сеть без лимита не получает бакета
+    assert set(Scheduler(rate_limits=load_rate_limits(config))._buckets) == {"ethereum"}
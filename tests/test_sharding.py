@@ -0,0 +1,85 @@
+import configparser
+
+import pytest
+
+from utils import metrics
+from utils.sharding import MIN_SHARD_SIZE, run_shards, shard_config, split_shards
+
+
+def test_split_shards_keeps_min_shard_size():
+    assert split_shards([], 4) == []
+    small = list(range(MIN_SHARD_SIZE - 1))
+    assert split_shards(small, 4) == [small]
+    # На два шарда хватает, на четыре — нет
+    items = list(range(2 * MIN_SHARD_SIZE + 10))
+    shards = split_shards(items, 4)
+    assert [len(shard) for shard in shards] == [MIN_SHARD_SIZE + 5, MIN_SHARD_SIZE + 5]
+    assert [item for shard in shards for item in shard] == items
+    shards = split_shards(list(range(10 * MIN_SHARD_SIZE + 1)), 3)
+    assert len(shards) == 3
+    assert all(len(shard) >= MIN_SHARD_SIZE for shard in shards)
+    assert sum(len(shard) for shard in shards) == 10 * MIN_SHARD_SIZE + 1
+
+
+def test_shard_config_divides_limits():
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "RateLimits": {"ethereum": "10", "base": "0"},
+        "Performance": {"max_concurrency": "33", "shards": "4"},
+        "Cosmos": {"max_in_flight": "2"},
+        "Journal": {"enabled": "True"},
+    })
+    values = shard_config(config, 4)
+    assert float(values["RateLimits"]["ethereum"]) == 2.5
+    assert values["RateLimits"]["base"] == "0"
+    assert values["Performance"]["max_concurrency"] == "9"
+    # Значение по умолчанию тоже делится, но не опускается ниже одного
+    assert values["Performance"]["network_concurrency"] == "2"
+    assert values["Cosmos"]["max_in_flight"] == "1"
+    # Журнал, снимок и метрики остаются за основным процессом
+    assert values["Journal"] == {"enabled": "False"}
+    assert values["Snapshot"] == {"enabled": "False"}
+    assert values["Metrics"]["prometheus_port"] == "0"
+
+
+def echo_shard(payload, shard):
+    """Шард для тестов: строка и запрос на адрес, ошибка для адресов из payload["fail"]."""
+    metrics.register_endpoints("shardnet", ["http://shard.test"])
+    for address in payload["addresses"]:
+        if address in payload.get("fail", ()):
+            shard.add(address, "shardnet", "native", ValueError(f"bad {address}"))
+            continue
+        metrics.observe("http://shard.test/balance", 0.02, True, received=10)
+        shard.row([address, payload["index"]])
+    shard.progress(100)
+    if payload.get("crash"):
+        raise RuntimeError("shard crashed")
+
+
+def test_run_shards_merges_rows_progress_and_failures():
+    payloads = [
+        {"index": 0, "addresses": ["a0", "a1", "a2"], "fail": ["a1"]},
+        {"index": 1, "addresses": ["b0", "b1"]},
+    ]
+    rows, failures, progress = [], [], []
+    metrics.take_delta()
+    run_shards(echo_shard, payloads, rows.extend, lambda *failure: failures.append(failure), progress.append)
+
+    assert sorted(rows) == [["a0", 0], ["a2", 0], ["b0", 1], ["b1", 1]]
+    assert failures == [("a1", "shardnet", "native", "ValueError: bad a1")]
+    assert progress[-1] == 100
+    # Метрики шардов сложились в реестре основного процесса
+    series, _ = metrics.take_delta()
+    assert sum(item.requests for key, item in series.items() if key[0] == "shardnet") == 4
+
+
+def test_run_shards_raises_when_shard_fails():
+    payloads = [
+        {"index": 0, "addresses": ["a0"]},
+        {"index": 1, "addresses": ["b0"], "crash": True},
+    ]
+    rows = []
+    with pytest.raises(RuntimeError, match="шард 1: RuntimeError: shard crashed"):
+        run_shards(echo_shard, payloads, rows.extend)
+    # Строки, полученные до ошибки, не теряются
+    assert sorted(rows) == [["a0", 0], ["b0", 1]]
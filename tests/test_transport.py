@@ -0,0 +1,70 @@
+import socket
+
+import pytest
+import requests
+
+from utils.transport import CachedDnsAdapter, DnsCache
+
+
+class FakeResolver:
+    """getaddrinfo с заданными адресами для каждого имени; calls — число обращений."""
+
+    def __init__(self, addresses):
+        self.addresses = addresses
+        self.calls = 0
+
+    def __call__(self, host, port, family=0, type=0):
+        self.calls += 1
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port)) for address in self.addresses[host]]
+
+
+def session_with(resolver, ttl=300):
+    session = requests.Session()
+    adapter = CachedDnsAdapter(ttl, resolver=resolver)
+    session.mount("http://", adapter)
+    return session, adapter.dns
+
+
+def block_number(session, url):
+    response = session.post(url, json={"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []})
+    return response.json()["result"]
+
+
+def test_dns_cache_keeps_all_addresses_until_ttl():
+    resolver = FakeResolver({"node.example": ["10.0.0.1", "10.0.0.2", "10.0.0.1"]})
+    cache = DnsCache(300, resolver)
+    assert cache.resolve("node.example", 80) == ["10.0.0.1", "10.0.0.2"]
+    cache.demote("node.example", 80, "10.0.0.1")
+    assert cache.resolve("node.example", 80) == ["10.0.0.2", "10.0.0.1"]
+    assert resolver.calls == 1
+    cache.evict("node.example", 80)
+    cache.resolve("node.example", 80)
+    assert resolver.calls == 2
+    assert DnsCache(0, resolver).resolve("node.example", 80) and resolver.calls == 3
+
+
+def test_connection_fails_over_to_next_address(nodes):
+    port = nodes.url.rsplit(":", 1)[1]
+    # 127.0.0.2 никто не слушает: соединение отклоняется, и берётся следующий адрес
+    resolver = FakeResolver({"node.example": ["127.0.0.2", "127.0.0.1"]})
+    session, dns = session_with(resolver)
+    url = f"http://node.example:{port}/evm/ethereum"
+    assert block_number(session, url).startswith("0x")
+    assert dns.resolve("node.example", int(port)) == ["127.0.0.1", "127.0.0.2"]
+    # Новое соединение берёт адреса из кэша, начиная с рабочего; имя заново не разрешается
+    session.close()
+    assert block_number(session, url).startswith("0x")
+    assert resolver.calls == 1
+
+
+def test_unreachable_host_is_evicted(nodes):
+    port = nodes.url.rsplit(":", 1)[1]
+    resolver = FakeResolver({"node.example": ["127.0.0.2"]})
+    session, dns = session_with(resolver)
+    url = f"http://node.example:{port}/evm/ethereum"
+    with pytest.raises(requests.ConnectionError):
+        block_number(session, url)
+    # После смены записи DNS следующий запрос разрешает имя заново, а не ждёт истечения TTL
+    resolver.addresses["node.example"] = ["127.0.0.1"]
+    assert block_number(session, url).startswith("0x")
+    assert resolver.calls == 2
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import pytest
+
+from mock_nodes import amount
+from utils import atom_balance_check
+from utils.atom_watch import (
+    ADDRESS_QUERIES, TX_QUERY, address_queries, subscription_groups, subscription_plan, watch_addresses
+)
+from utils.eth_balance_check import load_performance_settings, open_connections
+from utils.eth_watch import watch_main
+from utils.result_store import format_amount
+
+ETH_ADDRESSES = [f"0x{i:040x}" for i in range(1, 6)]
+COSMOS_ADDRESSES = [f"cosmos1watch{i:02d}" for i in range(5)]
+
+
+class WsNode:
+    """
+    Websocket-заглушка узла: подтверждает каждый запрос подписки, запоминает
+    параметры подписок по соединениям и после подтверждения отправляет
+    уведомления из on_subscribed(ws, connection).
+    """
+
+    def __init__(self, confirmation, on_subscribed=None):
+        self.confirmation = confirmation
+        self.on_subscribed = on_subscribed
+        self.connections = []  # [[params подписки, ...] на каждое соединение]
+        self.url = None
+
+    async def handler(self, ws):
+        subscriptions = []
+        self.connections.append(subscriptions)
+        async for message in ws:
+            request = json.loads(message)
+            subscriptions.append(request["params"])
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": self.confirmation}))
+            if self.on_subscribed:
+                await self.on_subscribed(ws, subscriptions)
+
+    async def __aenter__(self):
+        from websockets.asyncio.server import serve
+
+        self.server = await serve(self.handler, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        self.url = f"ws://{host}:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def run_until(coro_factory, condition, timeout=15):
+    """Запускает наблюдение и останавливает его флагом, когда condition() выполнено."""
+    stop = False
+
+    async def stopper():
+        nonlocal stop
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition() and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.05)
+        stop = True
+
+    await asyncio.gather(coro_factory(lambda: stop), stopper())
+
+
+def head(number):
+    return json.dumps({"jsonrpc": "2.0", "method": "eth_subscription",
+                       "params": {"subscription": "0x1", "result": {"number": hex(number)}}})
+
+
+def test_eth_watch_reports_balances_on_new_heads_and_resubscribes(eth_config):
+    eth_config.read_dict({"Networks": {"base": "False"}, "Performance": {"engine": "batch"}})
+    connections = open_connections(eth_config)
+    settings = load_performance_settings(eth_config)
+    changes = []
+    nodes_started = []
+
+    async def on_subscribed(ws, subscriptions):
+        await ws.send(head(100))
+        await asyncio.sleep(0.3)
+        await ws.send(head(101))
+        if len(nodes_started[0].connections) == 1:
+            # Обрыв после двух блоков: наблюдение должно переподключиться и подписаться снова
+            await asyncio.sleep(0.3)
+            await ws.close()
+
+    async def main():
+        async with WsNode("0x1", on_subscribed) as ws_node:
+            nodes_started.append(ws_node)
+            await run_until(
+                lambda stop: watch_main(ETH_ADDRESSES, connections, {"ethereum": ws_node.url}, settings,
+                                        changes.extend, stop),
+                lambda: len(ws_node.connections) >= 2 and len(ws_node.connections[1]) == 1,
+            )
+            return ws_node.connections
+
+    subscriptions = asyncio.run(main())
+    assert subscriptions[:2] == [[["newHeads"]], [["newHeads"]]]
+    # Первый блок задаёт исходное состояние: по строке на адрес; баланс заглушки от блока не зависит,
+    # поэтому следующие блоки изменений не дают
+    assert sorted(row["Address"] for row in changes) == ETH_ADDRESSES
+    for row in changes:
+        assert row["Network"] == "ethereum"
+        assert row["Block"] == 100
+        assert row["Balance"] == format_amount(amount(row["Address"]), 18, 5)
+
+
+def test_subscription_groups_respect_per_connection_limit():
+    groups = subscription_groups(COSMOS_ADDRESSES, per_connection=5)
+    assert [len(group) * len(ADDRESS_QUERIES) <= 5 for group in groups] == [True] * len(groups)
+    assert [address for group in groups for address in group] == COSMOS_ADDRESSES
+    # Лимит меньше числа подписок на адрес — всё равно по адресу на соединение
+    assert subscription_groups(COSMOS_ADDRESSES, per_connection=1) == [[address] for address in COSMOS_ADDRESSES]
+
+
+def test_address_queries_filter_on_the_node():
+    queries = [params["query"] for params in address_queries("cosmos1abc")]
+    assert queries == ["tm.event='Tx' AND message.sender='cosmos1abc'",
+                       "tm.event='Tx' AND transfer.recipient='cosmos1abc'"]
+
+
+def test_subscription_plan_caps_connections():
+    plan = subscription_plan(COSMOS_ADDRESSES, per_connection=4, max_connections=3)
+    assert [group for group, _ in plan] == [COSMOS_ADDRESSES[0:2], COSMOS_ADDRESSES[2:4], COSMOS_ADDRESSES[4:]]
+    assert plan[0][1] == address_queries(COSMOS_ADDRESSES[0]) + address_queries(COSMOS_ADDRESSES[1])
+    # Адреса не помещаются в лимит соединений — одна подписка на все транзакции
+    many = [f"cosmos1many{i:05d}" for i in range(10_000)]
+    assert subscription_plan(many, per_connection=5, max_connections=4) == [(many, [{"query": TX_QUERY}])]
+    assert subscription_plan(COSMOS_ADDRESSES, per_connection=4, max_connections=2) == [
+        (COSMOS_ADDRESSES, [{"query": TX_QUERY}])]
+
+
+@pytest.fixture
+def cosmos_rest(nodes, monkeypatch):
+    monkeypatch.setattr(atom_balance_check, "BASE_URL", nodes.cosmos_url)
+    return nodes
+
+
+def test_atom_watch_subscribes_per_address_and_refreshes_touched_addresses(cosmos_rest, policy):
+    changes = []
+    requests_after_event = []
+    touched = COSMOS_ADDRESSES[3]
+
+    async def on_subscribed(ws, subscriptions):
+        if len(subscriptions) < 4 or touched not in json.dumps(subscriptions):
+            return
+        # Все подписки соединения подтверждены: ждём исходную сверку и шлём транзакцию адреса
+        while len(changes) < len(COSMOS_ADDRESSES):
+            await asyncio.sleep(0.05)
+        before = cosmos_rest.stats.snapshot()["http_requests"]
+        event = {"query": subscriptions[1]["query"], "data": {},
+                 "events": {"tx.height": ["777"], "transfer.recipient": [touched]}}
+        await ws.send(json.dumps({"jsonrpc": "2.0", "id": 2, "result": event}))
+        while cosmos_rest.stats.snapshot()["http_requests"] == before:
+            await asyncio.sleep(0.05)
+        requests_after_event.append(cosmos_rest.stats.snapshot()["http_requests"] - before)
+
+    async def main():
+        async with WsNode({}, on_subscribed) as ws_node:
+            await run_until(
+                lambda stop: watch_addresses(ws_node.url, COSMOS_ADDRESSES, changes.extend, stop, policy=policy,
+                                             subscriptions_per_connection=4),
+                lambda: bool(requests_after_event),
+            )
+            return ws_node.connections
+
+    connections = asyncio.run(main())
+    # По 2 адреса (4 подписки) на соединение, подписки только на свои адреса
+    assert sorted(len(subscriptions) for subscriptions in connections) == [2, 4, 4]
+    queries = [params["query"] for subscriptions in connections for params in subscriptions]
+    assert sorted(queries) == sorted(params["query"] for address in COSMOS_ADDRESSES
+                                     for params in address_queries(address))
+    # После подписки сверяются все адреса, транзакция вызывает перечитывание затронутого адреса
+    assert sorted(row["address"] for row in changes) == COSMOS_ADDRESSES
+    for row in changes:
+        assert row["balance"] == format_amount(amount(row["address"], "balance", modulus=10 ** 12), 6, 6)
+    assert requests_after_event[0] > 0
+
+
+def test_atom_watch_filters_all_transactions_above_connection_limit(cosmos_rest, policy):
+    changes = []
+    touched = COSMOS_ADDRESSES[1]
+
+    async def on_subscribed(ws, subscriptions):
+        while len(changes) < len(COSMOS_ADDRESSES):
+            await asyncio.sleep(0.05)
+        # Транзакция чужого адреса отбрасывается клиентом, наблюдаемого — перечитывает его
+        for recipient in ("cosmos1stranger", touched):
+            event = {"query": TX_QUERY, "data": {},
+                     "events": {"tx.height": ["778"], "transfer.recipient": [recipient]}}
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": 1, "result": event}))
+
+    refreshed = []
+
+    def on_change(rows):
+        changes.extend(rows)
+
+    async def main():
+        async with WsNode({}, on_subscribed) as ws_node:
+            before = []
+
+            def done():
+                if not before and len(changes) == len(COSMOS_ADDRESSES):
+                    before.append(cosmos_rest.stats.snapshot()["rest_calls"])
+                if before and cosmos_rest.stats.snapshot()["rest_calls"] > before[0]:
+                    refreshed.append(cosmos_rest.stats.snapshot()["rest_calls"] - before[0])
+                return bool(refreshed)
+
+            await run_until(
+                lambda stop: watch_addresses(ws_node.url, COSMOS_ADDRESSES, on_change, stop, policy=policy,
+                                             subscriptions_per_connection=4, max_connections=2),
+                done,
+            )
+            await asyncio.sleep(0.3)
+            refreshed.append(cosmos_rest.stats.snapshot()["rest_calls"] - before[0])
+            return ws_node.connections
+
+    connections = asyncio.run(main())
+    assert connections[:1] == [[{"query": TX_QUERY}]]
+    assert len(connections) == 1
+    assert sorted(row["address"] for row in changes) == COSMOS_ADDRESSES
+    # Перечитан только затронутый адрес: баланс, делегации (до двух страниц), анбондинг и награды,
+    # а не все пять адресов
+    assert 4 <= refreshed[-1] <= 5
@@ -0,0 +1,80 @@
+import configparser
+import csv
+from decimal import Decimal
+
+import pytest
+
+from utils.writers import CsvWriter, ParquetWriter, XlsxWriter, open_writer, output_path
+
+COLUMNS = ["Address", "ETH", "USDC"]
+AMOUNTS = {"ETH": 18, "USDC": 6}
+ROWS = [
+    ["0xa", Decimal("1.000000000000000001"), Decimal("12.5")],
+    {"Address": "0xb", "ETH": Decimal("0"), "USDC": None},
+    # Больше, чем помещается в float без потерь; "-" — выключенная сеть
+    ["0xc", Decimal("123456789012345678.123456789012345678"), "-"],
+]
+
+
+def write(writer_class, path, **kwargs):
+    with writer_class(str(path), COLUMNS, AMOUNTS, **kwargs) as writer:
+        writer.write_many(ROWS)
+    assert writer.rows_written == len(ROWS)
+    return str(path)
+
+
+def test_csv_round_trip(tmp_path):
+    path = write(CsvWriter, tmp_path / "out.csv")
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [
+        COLUMNS,
+        ["0xa", "1.000000000000000001", "12.5"],
+        ["0xb", "0", ""],
+        ["0xc", "123456789012345678.123456789012345678", "-"],
+    ]
+
+
+def test_xlsx_round_trip(tmp_path):
+    from openpyxl import load_workbook
+
+    path = write(XlsxWriter, tmp_path / "out.xlsx")
+    sheet = load_workbook(path)["Sheet1"]
+    rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+    assert rows[0] == COLUMNS
+    assert [row[0] for row in rows[1:]] == ["0xa", "0xb", "0xc"]
+    assert rows[2][2] is None and rows[3][2] == "-"
+    # Ячейки xlsx — числа с плавающей точкой: сравниваем с точностью double
+    assert rows[1][1] == pytest.approx(1.0) and rows[1][2] == 12.5
+    assert rows[3][1] == pytest.approx(1.2345678901234568e17)
+
+
+@pytest.mark.parametrize("row_group_size", [1, 50_000])
+def test_parquet_round_trip_keeps_exact_decimals(tmp_path, row_group_size):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    path = write(ParquetWriter, tmp_path / "out.parquet", row_group_size=row_group_size)
+    table = pyarrow.parquet.read_table(path)
+    assert table.schema.field("Address").type == pyarrow.string()
+    assert table.schema.field("ETH").type == pyarrow.decimal128(38, 18)
+    assert table.schema.field("USDC").type == pyarrow.decimal128(38, 6)
+    assert table.to_pydict() == {
+        "Address": ["0xa", "0xb", "0xc"],
+        "ETH": [Decimal("1.000000000000000001"), Decimal("0E-18"),
+                Decimal("123456789012345678.123456789012345678")],
+        "USDC": [Decimal("12.500000"), None, None],
+    }
+    assert pyarrow.parquet.ParquetFile(path).metadata.num_row_groups == (3 if row_group_size == 1 else 1)
+
+
+def test_open_writer_and_output_path(tmp_path):
+    config = configparser.ConfigParser()
+    config.read_dict({"Output": {"format": " CSV ", "output_dir": str(tmp_path)}})
+    path = output_path(config, "balances")
+    assert path == str(tmp_path / "balances.csv")
+    with open_writer(config, path, COLUMNS, AMOUNTS) as writer:
+        assert isinstance(writer, CsvWriter)
+    config.read_dict({"Output": {"format": "json"}})
+    with pytest.raises(ValueError, match="Неизвестный формат вывода"):
+        output_path(config, "balances")
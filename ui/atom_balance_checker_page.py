@@ -1,69 +1,101 @@
 import time
+from collections import deque
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QTextEdit, QPushButton, QProgressBar
+    QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QProgressBar, QCheckBox, QLabel, QFileDialog
 )
-from PyQt6.QtCore import QThread, pyqtSignal, QObject
-from utils.atom_balance_check import get_address_data
-import pandas as pd
-import configparser
-from utils.get_config_path import config_path
+from PyQt6.QtCore import QThread, QTimer, pyqtSignal, QObject
+from utils import metrics
+from .results_model import ResultsTableModel, create_results_view, reset_results
+
+# Как часто таблица забирает готовые строки у рабочего потока и сколько строк за раз
+RESULTS_INTERVAL_MS = 100
+MAX_ROWS_PER_UPDATE = 5000
+
+
+def load_addresses(input_data, import_path=None):
+    """Адреса из выбранного файла или введённого текста: без повторов и некорректных строк."""
+    from utils.address_import import COSMOS, import_addresses, rejected_report_path, text_lines
+
+    source = import_path or text_lines(input_data)
+    imported = import_addresses(source, COSMOS, report_path=rejected_report_path("atom_balances"))
+    print(imported.summary())
+    return imported.addresses
 
 # Этот класс отвечает за выполнение логики проверки баланса Cosmos в отдельном потоке.
 class AtomBalanceWorker(QObject):
     finished = pyqtSignal()
     progress = pyqtSignal(int)
+    error = pyqtSignal(str)
 
-    def __init__(self, input_data):
+    def __init__(self, input_data, bypass_cache=False, import_path=None):
         super().__init__()
         self.input_data = input_data
+        self.import_path = import_path
+        self.bypass_cache = bypass_cache
         self._is_interrupted = False
+        # Готовые строки: страница забирает их пачками по таймеру, а не сигналом на каждую строку
+        self.results = deque()
 
     def run(self):
-        addresses = []
-        balances = []
-        staked_values = []
-        rewards_values = []
-
-        config = configparser.ConfigParser()
-        config.read(config_path)
-
-        lines = self.input_data.splitlines()
-        total = len(lines)
-        for i, line in enumerate(lines):
-            if self._is_interrupted:
-                break
-            address_data = get_address_data(line.strip())
-            addresses.append(address_data[0])
-            balances.append(address_data[1])
-            staked_values.append(address_data[2])
-            rewards_values.append(address_data[3])
-
-            progress_percent = int((i + 1) / total * 100)
-            self.progress.emit(progress_percent)
-        
-        df = pd.DataFrame({
-            "address": addresses,
-            "balance": balances,
-            "staked": staked_values,
-            "rewards": rewards_values
-        })
-        output_dir = config.get("Output", "output_dir", fallback="").strip()
-        if output_dir:
-            # Если указан, добавляем "/" или используем os.path.join для формирования пути
-            import os
-            excel_filename = os.path.join(output_dir, "atom_balances.xlsx")
-        else:
-            excel_filename = "atom_balances.xlsx"
-
-        # Сохраняем в Excel-файл
-        df.to_excel(excel_filename, index=False)
-    
+        # aiohttp и остальной Cosmos-стек импортируем в рабочем потоке, а не при запуске приложения
+        from utils.atom_balance_check import ATOM_COLUMNS, run_atom_check
+
+        columns = ATOM_COLUMNS + ["height"]
+        last = -1
+
+        def progress_update(value):
+            # Сигнал прогресса — только при смене процента, а не на каждый адрес
+            nonlocal last
+            if value != last:
+                last = value
+                self.progress.emit(value)
+
+        try:
+            # Адреса из файла или введённого текста — после проверки и удаления повторов
+            lines = load_addresses(self.input_data, self.import_path)
+            if not lines:
+                raise ValueError("Нет корректных адресов для проверки")
+            run_atom_check(
+                lines,
+                progress_callback=progress_update,
+                is_interrupted=lambda: self._is_interrupted,
+                bypass_cache=self.bypass_cache,
+                on_row=lambda row: self.results.append(dict(zip(columns, row))),
+            )
+        except Exception as e:
+            # Любая ошибка (импорт адресов, сбой шарда, запись файла) не должна оставить страницу без finished
+            self.error.emit(str(e))
         self.finished.emit()
 
     def stop(self):
         """Метод для прерывания работы."""
         self._is_interrupted = True
 
+# Режим наблюдения: работает до stop() и передаёт в changed только изменившиеся строки.
+class AtomWatchWorker(QObject):
+    finished = pyqtSignal()
+    changed = pyqtSignal(dict)
+    error = pyqtSignal(str)
+
+    def __init__(self, input_data, import_path=None):
+        super().__init__()
+        self.input_data = input_data
+        self.import_path = import_path
+        self._is_interrupted = False
+
+    def run(self):
+        from utils.atom_watch import run_atom_watch
+
+        try:
+            lines = load_addresses(self.input_data, self.import_path)
+            run_atom_watch(lines, on_change=self.changed.emit, is_interrupted=lambda: self._is_interrupted)
+        except Exception as e:
+            self.error.emit(str(e))
+        self.finished.emit()
+
+    def stop(self):
+        self._is_interrupted = True
+
 # Страница интерфейса для проверки баланса Cosmos.
 class AtomBalanceCheckerPage(QWidget):
     def __init__(self, back_callback):
@@ -71,6 +103,8 @@ class AtomBalanceCheckerPage(QWidget):
         self.back_callback = back_callback
         self.thread = None
         self.worker = None
+        # Файл с адресами (txt/csv/xlsx) читается потоково в рабочем потоке, а не в поле ввода
+        self.import_path = None
         self.init_ui()
 
     def init_ui(self):
@@ -80,11 +114,25 @@ class AtomBalanceCheckerPage(QWidget):
         self.text_edit = QTextEdit(self)
         self.text_edit.setPlaceholderText("Введите адреса кошельков, по одному на строке")
         self.text_edit.setAcceptRichText(False)
+        self.text_edit.textChanged.connect(self.on_text_changed)
+
+        # Импорт адресов из файла вместо ввода
+        self.import_button = QPushButton("Импорт из файла…", self)
+        self.import_button.clicked.connect(self.choose_import_file)
+        self.import_label = QLabel(self)
+        self.import_label.hide()
+
+        # Переключатель обхода кэша: все адреса запрашиваются заново
+        self.bypass_cache_checkbox = QCheckBox("Не использовать кэш", self)
 
         # Кнопка для запуска проверки
         self.start_button = QPushButton("Запустить Atom balance checker", self)
         self.start_button.clicked.connect(self.start_worker)
 
+        # Кнопка режима наблюдения: изменения по транзакциям адресов
+        self.watch_button = QPushButton("Наблюдать за изменениями", self)
+        self.watch_button.clicked.connect(self.start_watch)
+
         # Кнопка для прерывания выполнения
         self.stop_button = QPushButton("Прервать выполнение", self)
         self.stop_button.clicked.connect(self.stop_worker)
@@ -94,51 +142,163 @@ class AtomBalanceCheckerPage(QWidget):
         self.progress_bar = QProgressBar(self)
         self.progress_bar.setRange(0, 100)
 
+        # Живая статистика запросов по сетям: обновляется раз в секунду во время проверки
+        self.stats_label = QLabel(self)
+        self.stats_label.setWordWrap(True)
+        self.stats_label.hide()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(1000)
+        self.stats_timer.timeout.connect(self.update_stats)
+
+        # Таблица результатов: строки приходят пачками раз в RESULTS_INTERVAL_MS
+        self.results_model = ResultsTableModel(self)
+        self.results_view = create_results_view(self.results_model, self)
+        self.results_view.hide()
+        self.results = None
+        self.results_timer = QTimer(self)
+        self.results_timer.setInterval(RESULTS_INTERVAL_MS)
+        self.results_timer.timeout.connect(self.drain_results)
+
+        # Лента изменений режима наблюдения
+        self.changes_view = QTextEdit(self)
+        self.changes_view.setReadOnly(True)
+        self.changes_view.setPlaceholderText("Изменения в режиме наблюдения")
+        self.changes_view.hide()
+
         # Кнопка возврата на главную страницу
         self.back_button = QPushButton("Назад", self)
         self.back_button.clicked.connect(self.back_callback)
 
+        import_layout = QHBoxLayout()
+        import_layout.addWidget(self.import_button)
+        import_layout.addWidget(self.import_label, 1)
+
         layout.addWidget(self.text_edit)
+        layout.addLayout(import_layout)
+        layout.addWidget(self.bypass_cache_checkbox)
         layout.addWidget(self.start_button)
+        layout.addWidget(self.watch_button)
         layout.addWidget(self.stop_button)
         layout.addWidget(self.progress_bar)
+        layout.addWidget(self.stats_label)
+        layout.addWidget(self.results_view)
+        layout.addWidget(self.changes_view)
         layout.addWidget(self.back_button)
 
         self.setLayout(layout)
 
+    def choose_import_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Файл с адресами", "", "Адреса (*.txt *.csv *.xlsx)")
+        if not path:
+            return
+        self.text_edit.clear()
+        self.import_path = path
+        self.import_label.setText(f"Файл: {path}")
+        self.import_label.show()
+
+    def on_text_changed(self):
+        # Введённые вручную адреса заменяют выбранный файл
+        if self.import_path and self.text_edit.toPlainText():
+            self.import_path = None
+            self.import_label.hide()
+
     def start_worker(self):
         input_text = self.text_edit.toPlainText().strip()
-        if not input_text:
+        if not input_text and not self.import_path:
             print("Нет введённых данных для проверки.")
             return
 
         # Создаем поток и рабочего объекта для выполнения долгой операции
         self.thread = QThread()
-        self.worker = AtomBalanceWorker(input_text)
+        self.worker = AtomBalanceWorker(input_text, self.bypass_cache_checkbox.isChecked(), self.import_path)
         self.worker.moveToThread(self.thread)
 
         # Соединяем сигналы и слоты
         self.thread.started.connect(self.worker.run)
         self.worker.progress.connect(self.progress_bar.setValue)
+        self.worker.error.connect(lambda err: print(f"Ошибка: {err}"))
         self.worker.finished.connect(self.on_finished)
         self.worker.finished.connect(self.thread.quit)
         self.worker.finished.connect(self.worker.deleteLater)
         self.thread.finished.connect(self.thread.deleteLater)
 
+        self.stats_label.clear()
+        self.stats_label.show()
+        self.stats_timer.start()
+        reset_results(self.results_view)
+        self.results = self.worker.results
+        self.results_view.show()
+        self.results_timer.start()
+
         # Запуск потока
         self.thread.start()
 
         # Блокируем кнопку запуска и активируем кнопку прерывания
         self.start_button.setEnabled(False)
+        self.watch_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+
+    def start_watch(self):
+        input_text = self.text_edit.toPlainText().strip()
+        if not input_text and not self.import_path:
+            print("Нет введённых данных для наблюдения.")
+            return
+
+        self.thread = QThread()
+        self.worker = AtomWatchWorker(input_text, self.import_path)
+        self.worker.moveToThread(self.thread)
+
+        self.thread.started.connect(self.worker.run)
+        self.worker.changed.connect(self.on_changed)
+        self.worker.error.connect(lambda err: print(f"Ошибка: {err}"))
+        self.worker.finished.connect(self.on_watch_finished)
+        self.worker.finished.connect(self.thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self.thread.deleteLater)
+
+        self.changes_view.clear()
+        self.changes_view.show()
+        self.thread.start()
+
+        self.start_button.setEnabled(False)
+        self.watch_button.setEnabled(False)
         self.stop_button.setEnabled(True)
 
+    def on_changed(self, row):
+        self.changes_view.append(
+            f"{row['time']}  высота {row['height']}  {row['address']}: "
+            f"баланс {row['balance']}, стейкинг {row['staked']}, анбондинг {row['unbonding']}, "
+            f"награды {row['rewards']}"
+        )
+
+    def on_watch_finished(self):
+        self.start_button.setEnabled(True)
+        self.watch_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        print("Наблюдение за адресами Cosmos остановлено.")
+
     def stop_worker(self):
         if self.worker:
             self.worker.stop()
             self.stop_button.setEnabled(False)
 
+    def drain_results(self):
+        batch = []
+        while self.results and len(batch) < MAX_ROWS_PER_UPDATE:
+            batch.append(self.results.popleft())
+        self.results_model.append_rows(batch)
+
+    def update_stats(self):
+        self.stats_label.setText(metrics.format_stats(metrics.run_stats("atom")) or "Запросов пока нет")
+
     def on_finished(self):
+        self.stats_timer.stop()
+        self.update_stats()
+        self.results_timer.stop()
+        while self.results:
+            self.drain_results()
         self.start_button.setEnabled(True)
+        self.watch_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.progress_bar.setValue(100)
-        print("Atom balance check завершён. XLSX файл сохранён в проекте как 'atom_results.xlsx'.")
+        print("Atom balance check завершён. Результаты сохранены в файл 'atom_balances'.")
@@ -0,0 +1,79 @@
+# ui/endpoints_dialog.py
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget, QTableWidgetItem,
+    QHeaderView, QDialogButtonBox, QMessageBox
+)
+from utils.rpc_pool import parse_endpoints, format_endpoints, DEFAULT_WEIGHT
+
+
+class EndpointsDialog(QDialog):
+    """Редактор списка RPC-эндпоинтов сети: адрес и вес для маршрутизации."""
+
+    def __init__(self, network, value, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"RPC-эндпоинты: {network}")
+        self.resize(600, 300)
+
+        self.table = QTableWidget(0, 2, self)
+        self.table.setHorizontalHeaderLabels(["URL", "Вес"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        try:
+            endpoints = parse_endpoints(value)
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            endpoints = []
+        for url, weight in endpoints:
+            self.add_row(url, weight)
+
+        add_button = QPushButton("Добавить")
+        add_button.clicked.connect(lambda: self.add_row("", DEFAULT_WEIGHT))
+        remove_button = QPushButton("Удалить")
+        remove_button.clicked.connect(self.remove_selected)
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addWidget(add_button)
+        buttons_layout.addWidget(remove_button)
+        buttons_layout.addStretch(1)
+
+        dialog_buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        dialog_buttons.accepted.connect(self.accept)
+        dialog_buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.table)
+        layout.addLayout(buttons_layout)
+        layout.addWidget(dialog_buttons)
+        self.setLayout(layout)
+
+    def add_row(self, url, weight):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        self.table.setItem(row, 0, QTableWidgetItem(url))
+        self.table.setItem(row, 1, QTableWidgetItem(f"{weight:g}"))
+
+    def remove_selected(self):
+        rows = sorted({index.row() for index in self.table.selectedIndexes()}, reverse=True)
+        for row in rows:
+            self.table.removeRow(row)
+
+    def endpoints(self):
+        endpoints = []
+        for row in range(self.table.rowCount()):
+            url_item = self.table.item(row, 0)
+            weight_item = self.table.item(row, 1)
+            url = url_item.text().strip() if url_item else ""
+            if not url:
+                continue
+            weight = float(weight_item.text()) if weight_item and weight_item.text().strip() else DEFAULT_WEIGHT
+            endpoints.append((url, weight))
+        return endpoints
+
+    def accept(self):
+        try:
+            self.value = format_endpoints(self.endpoints())
+        except ValueError:
+            QMessageBox.warning(self, "Ошибка", "Вес эндпоинта должен быть числом")
+            return
+        super().accept()
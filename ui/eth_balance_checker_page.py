@@ -1,33 +1,90 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QPushButton, QProgressBar
-from PyQt6.QtCore import QThread, pyqtSignal, QObject
-from utils.eth_balance_check import run_balance_check
+from collections import deque
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QProgressBar, QCheckBox, QLabel, QFileDialog
+)
+from PyQt6.QtCore import QThread, QTimer, pyqtSignal, QObject
+from utils import metrics
+from .results_model import ResultsTableModel, create_results_view, reset_results
+
+# Как часто таблица забирает готовые строки у рабочего потока и сколько строк за раз
+RESULTS_INTERVAL_MS = 100
+MAX_ROWS_PER_UPDATE = 5000
+
+
+def load_addresses(addresses_text, import_path=None):
+    """Адреса из выбранного файла или введённого текста: без повторов и некорректных строк."""
+    from utils.address_import import EVM, import_addresses, rejected_report_path, text_lines
+
+    source = import_path or text_lines(addresses_text)
+    imported = import_addresses(source, EVM, report_path=rejected_report_path("ethereum_balances"))
+    print(imported.summary())
+    return imported.addresses
 
 class EthBalanceWorker(QObject):
     finished = pyqtSignal()
     progress = pyqtSignal(int)
     error = pyqtSignal(str)
     
-    def __init__(self, addresses_text):
+    def __init__(self, addresses_text, bypass_cache=False, import_path=None):
         super().__init__()
         self.addresses_text = addresses_text
-        self._is_interrupted = False  # Если потребуется добавить возможность прерывания
+        self.import_path = import_path
+        self.bypass_cache = bypass_cache
+        self._is_interrupted = False
+        # Готовые строки: страница забирает их пачками по таймеру, а не сигналом на каждую строку
+        self.results = deque()
     
     def run(self):
-        # Преобразуем введённый текст (адреса, по одному на строке) в список
-        addresses = [line.strip() for line in self.addresses_text.splitlines() if line.strip()]
-        
+        # web3 и остальной ETH-стек импортируем в рабочем потоке, а не при запуске приложения
+        from utils.eth_balance_check import run_balance_check
+
         try:
-            # Определяем функцию для обновления прогресса
+            # Адреса из файла или введённого текста — после проверки и удаления повторов
+            addresses = load_addresses(self.addresses_text, self.import_path)
+            if not addresses:
+                raise ValueError("Нет корректных адресов для проверки")
+            # Сигнал прогресса — только при смене процента, а не на каждый адрес
+            last = -1
+
             def progress_update(value):
-                self.progress.emit(value)
+                nonlocal last
+                if value != last:
+                    last = value
+                    self.progress.emit(value)
             # Вызываем основную функцию проверки балансов из отдельного файла
-            run_balance_check(addresses, progress_callback=progress_update)
+            run_balance_check(addresses, progress_callback=progress_update, bypass_cache=self.bypass_cache,
+                              on_row=self.results.append, is_interrupted=lambda: self._is_interrupted)
         except Exception as e:
             self.error.emit(str(e))
         self.finished.emit()
     
     def stop(self):
-        # Механизм прерывания можно реализовать, если функция run_balance_check будет периодически проверять флаг
+        # run_balance_check проверяет флаг, отменяет запросы в полёте и сохраняет готовые строки
+        self._is_interrupted = True
+
+class EthWatchWorker(QObject):
+    """Режим наблюдения: работает до stop() и передаёт в changed только изменившиеся строки."""
+    finished = pyqtSignal()
+    changed = pyqtSignal(dict)
+    error = pyqtSignal(str)
+
+    def __init__(self, addresses_text, import_path=None):
+        super().__init__()
+        self.addresses_text = addresses_text
+        self.import_path = import_path
+        self._is_interrupted = False
+
+    def run(self):
+        from utils.eth_watch import run_eth_watch
+
+        try:
+            addresses = load_addresses(self.addresses_text, self.import_path)
+            run_eth_watch(addresses, on_change=self.changed.emit, is_interrupted=lambda: self._is_interrupted)
+        except Exception as e:
+            self.error.emit(str(e))
+        self.finished.emit()
+
+    def stop(self):
         self._is_interrupted = True
 
 class EthBalanceCheckerPage(QWidget):
@@ -36,6 +93,8 @@ class EthBalanceCheckerPage(QWidget):
         self.back_callback = back_callback
         self.thread = None
         self.worker = None
+        # Файл с адресами (txt/csv/xlsx) читается потоково в рабочем потоке, а не в поле ввода
+        self.import_path = None
         self.init_ui()
     
     def init_ui(self):
@@ -45,11 +104,25 @@ class EthBalanceCheckerPage(QWidget):
         self.text_edit = QTextEdit(self)
         self.text_edit.setPlaceholderText("Введите адреса кошельков, по одному на строке")
         self.text_edit.setAcceptRichText(False)
+        self.text_edit.textChanged.connect(self.on_text_changed)
+
+        # Импорт адресов из файла вместо ввода
+        self.import_button = QPushButton("Импорт из файла…", self)
+        self.import_button.clicked.connect(self.choose_import_file)
+        self.import_label = QLabel(self)
+        self.import_label.hide()
+        
+        # Переключатель обхода кэша: все адреса запрашиваются заново
+        self.bypass_cache_checkbox = QCheckBox("Не использовать кэш", self)
         
         # Кнопка для запуска проверки
         self.start_button = QPushButton("Запустить ETH balance checker", self)
         self.start_button.clicked.connect(self.start_worker)
         
+        # Кнопка режима наблюдения: изменения балансов по новым блокам
+        self.watch_button = QPushButton("Наблюдать за изменениями", self)
+        self.watch_button.clicked.connect(self.start_watch)
+
         # Кнопка для прерывания выполнения
         self.stop_button = QPushButton("Прервать выполнение", self)
         self.stop_button.clicked.connect(self.stop_worker)
@@ -58,26 +131,74 @@ class EthBalanceCheckerPage(QWidget):
         # Индикатор выполнения (progress bar)
         self.progress_bar = QProgressBar(self)
         self.progress_bar.setRange(0, 100)
+
+        # Живая статистика запросов по сетям: обновляется раз в секунду во время проверки
+        self.stats_label = QLabel(self)
+        self.stats_label.setWordWrap(True)
+        self.stats_label.hide()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(1000)
+        self.stats_timer.timeout.connect(self.update_stats)
+
+        # Таблица результатов: строки приходят пачками раз в RESULTS_INTERVAL_MS
+        self.results_model = ResultsTableModel(self)
+        self.results_view = create_results_view(self.results_model, self)
+        self.results_view.hide()
+        self.results = None
+        self.results_timer = QTimer(self)
+        self.results_timer.setInterval(RESULTS_INTERVAL_MS)
+        self.results_timer.timeout.connect(self.drain_results)
+
+        # Лента изменений режима наблюдения
+        self.changes_view = QTextEdit(self)
+        self.changes_view.setReadOnly(True)
+        self.changes_view.setPlaceholderText("Изменения балансов в режиме наблюдения")
+        self.changes_view.hide()
         
         # Кнопка для возврата на главную страницу
         self.back_button = QPushButton("Назад", self)
         self.back_button.clicked.connect(self.back_callback)
         
+        import_layout = QHBoxLayout()
+        import_layout.addWidget(self.import_button)
+        import_layout.addWidget(self.import_label, 1)
+
         layout.addWidget(self.text_edit)
+        layout.addLayout(import_layout)
+        layout.addWidget(self.bypass_cache_checkbox)
         layout.addWidget(self.start_button)
+        layout.addWidget(self.watch_button)
         layout.addWidget(self.stop_button)
         layout.addWidget(self.progress_bar)
+        layout.addWidget(self.stats_label)
+        layout.addWidget(self.results_view)
+        layout.addWidget(self.changes_view)
         layout.addWidget(self.back_button)
         self.setLayout(layout)
     
+    def choose_import_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Файл с адресами", "", "Адреса (*.txt *.csv *.xlsx)")
+        if not path:
+            return
+        self.text_edit.clear()
+        self.import_path = path
+        self.import_label.setText(f"Файл: {path}")
+        self.import_label.show()
+
+    def on_text_changed(self):
+        # Введённые вручную адреса заменяют выбранный файл
+        if self.import_path and self.text_edit.toPlainText():
+            self.import_path = None
+            self.import_label.hide()
+
     def start_worker(self):
         addresses_text = self.text_edit.toPlainText()
-        if not addresses_text.strip():
+        if not addresses_text.strip() and not self.import_path:
             print("Нет введённых данных для проверки.")
             return
         
         self.thread = QThread()
-        self.worker = EthBalanceWorker(addresses_text)
+        self.worker = EthBalanceWorker(addresses_text, self.bypass_cache_checkbox.isChecked(), self.import_path)
         self.worker.moveToThread(self.thread)
         
         self.thread.started.connect(self.worker.run)
@@ -88,18 +209,78 @@ class EthBalanceCheckerPage(QWidget):
         self.worker.finished.connect(self.worker.deleteLater)
         self.thread.finished.connect(self.thread.deleteLater)
         
+        self.stats_label.clear()
+        self.stats_label.show()
+        self.stats_timer.start()
+        reset_results(self.results_view)
+        self.results = self.worker.results
+        self.results_view.show()
+        self.results_timer.start()
         self.thread.start()
         
         self.start_button.setEnabled(False)
+        self.watch_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+
+    def start_watch(self):
+        addresses_text = self.text_edit.toPlainText()
+        if not addresses_text.strip() and not self.import_path:
+            print("Нет введённых данных для наблюдения.")
+            return
+
+        self.thread = QThread()
+        self.worker = EthWatchWorker(addresses_text, self.import_path)
+        self.worker.moveToThread(self.thread)
+
+        self.thread.started.connect(self.worker.run)
+        self.worker.changed.connect(self.on_changed)
+        self.worker.error.connect(lambda err: print(f"Ошибка: {err}"))
+        self.worker.finished.connect(self.on_watch_finished)
+        self.worker.finished.connect(self.thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self.thread.deleteLater)
+
+        self.changes_view.clear()
+        self.changes_view.show()
+        self.thread.start()
+
+        self.start_button.setEnabled(False)
+        self.watch_button.setEnabled(False)
         self.stop_button.setEnabled(True)
+
+    def on_changed(self, row):
+        self.changes_view.append(
+            f"{row['Time']}  {row['Network']}  блок {row['Block']}  {row['Address']}: {row['Balance']}"
+        )
+
+    def on_watch_finished(self):
+        self.start_button.setEnabled(True)
+        self.watch_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        print("Наблюдение за балансами ETH остановлено.")
     
     def stop_worker(self):
         if self.worker:
             self.worker.stop()
             self.stop_button.setEnabled(False)
     
+    def drain_results(self):
+        batch = []
+        while self.results and len(batch) < MAX_ROWS_PER_UPDATE:
+            batch.append(self.results.popleft())
+        self.results_model.append_rows(batch)
+
+    def update_stats(self):
+        self.stats_label.setText(metrics.format_stats(metrics.run_stats('eth')) or "Запросов пока нет")
+
     def on_finished(self):
+        self.stats_timer.stop()
+        self.update_stats()
+        self.results_timer.stop()
+        while self.results:
+            self.drain_results()
         self.start_button.setEnabled(True)
+        self.watch_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.progress_bar.setValue(100)
         print("ETH balance check завершён. XLSX файл сохранён в проекте.")
@@ -2,10 +2,18 @@
 from PyQt6.QtWidgets import QMainWindow, QStackedWidget
 from PyQt6.QtGui import QAction
 from .home_page import HomePage
-from .eth_balance_checker_page import EthBalanceCheckerPage
-from .atom_balance_checker_page import AtomBalanceCheckerPage
 from .settings_page import SettingsPage  # Подключаем новый модуль
 
+
+def create_eth_page(back_callback):
+    from .eth_balance_checker_page import EthBalanceCheckerPage
+    return EthBalanceCheckerPage(back_callback)
+
+
+def create_atom_page(back_callback):
+    from .atom_balance_checker_page import AtomBalanceCheckerPage
+    return AtomBalanceCheckerPage(back_callback)
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -24,13 +32,12 @@ class MainWindow(QMainWindow):
         self.home_page = HomePage(self.scripts, self.switch_page, self.show_settings)
         self.stack.addWidget(self.home_page)
 
-        # Страницы для скриптов, передаём функцию возврата на главную
-        self.pages = {
-            "ETH balance checker": EthBalanceCheckerPage(self.show_home),
-            "ATOM balance checker": AtomBalanceCheckerPage(self.show_home)
+        # Страницы для скриптов создаются при первом открытии, чтобы не замедлять запуск окна
+        self.page_factories = {
+            "ETH balance checker": create_eth_page,
+            "ATOM balance checker": create_atom_page
         }
-        for page in self.pages.values():
-            self.stack.addWidget(page)
+        self.pages = {}
 
         # Меню для навигации
         home_action = QAction("Главная", self)
@@ -51,8 +58,16 @@ class MainWindow(QMainWindow):
         # При запуске показываем главную страницу
         self.show_home()
 
-    def switch_page(self, script_name):
+    def get_page(self, script_name):
         page = self.pages.get(script_name)
+        if page is None and script_name in self.page_factories:
+            page = self.page_factories[script_name](self.show_home)
+            self.pages[script_name] = page
+            self.stack.addWidget(page)
+        return page
+
+    def switch_page(self, script_name):
+        page = self.get_page(script_name)
         if page:
             self.stack.setCurrentWidget(page)
             print(f"Переключились на страницу: {script_name}")
@@ -0,0 +1,150 @@
+# ui/results_model.py
+import bisect
+from decimal import Decimal
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt6.QtWidgets import QAbstractItemView, QHeaderView, QTableView
+
+
+class ResultsTableModel(QAbstractTableModel):
+    """
+    Таблица результатов проверки. Строки (словари колонка -> значение) добавляются
+    пачками через append_rows; колонки берутся из первой строки запуска.
+    Представлению строки отдаются порциями по FETCH_SIZE (canFetchMore/fetchMore),
+    поэтому даже сотни тысяч строк не замедляют отрисовку. При сортировке новые
+    строки вставляются на своё место, не пересортировывая всю таблицу.
+    """
+
+    FETCH_SIZE = 1000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._columns = []
+        self._rows = []
+        self._visible = 0
+        self._sort_column = None
+        self._descending = False
+
+    @property
+    def total_rows(self):
+        return len(self._rows)
+
+    def clear(self):
+        self.beginResetModel()
+        self._columns = []
+        self._rows = []
+        self._visible = 0
+        # Колонки следующего запуска могут отличаться (токены, высоты снимка)
+        self._sort_column = None
+        self._descending = False
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        if not rows:
+            return
+        if not self._columns:
+            self.beginResetModel()
+            self._columns = list(rows[0].keys())
+            self.endResetModel()
+        values = [[row.get(column) for column in self._columns] for row in rows]
+
+        if self._sort_column is None:
+            self._rows.extend(values)
+        else:
+            # Отсортированный порядок сохраняем вставкой каждой строки на её место
+            self.layoutAboutToBeChanged.emit()
+            for row in values:
+                bisect.insort(self._rows, row, key=self._sort_key)
+            self.layoutChanged.emit()
+        # Первая порция показывается сразу, дальше строки подгружаются при прокрутке
+        if self._visible < self.FETCH_SIZE:
+            self._expose(min(len(self._rows), self.FETCH_SIZE) - self._visible)
+
+    def _expose(self, count):
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._visible, self._visible + count - 1)
+        self._visible += count
+        self.endInsertRows()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._visible < len(self._rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not parent.isValid():
+            self._expose(min(self.FETCH_SIZE, len(self._rows) - self._visible))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._visible
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def _row(self, i):
+        # При обратном порядке строки хранятся по возрастанию и читаются с конца
+        return self._rows[len(self._rows) - 1 - i] if self._descending else self._rows[i]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self._row(index.row())[index.column()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return "" if value is None else str(value)
+        if role == Qt.ItemDataRole.TextAlignmentRole and _is_number(value):
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        if role == Qt.ItemDataRole.ToolTipRole and value is None:
+            return "Значение не получено, подробности в отчёте об ошибках"
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self._columns[section] if section < len(self._columns) else None
+        return section + 1
+
+    def _sort_key(self, row):
+        value = row[self._sort_column]
+        if value is None or value in ("", "-"):
+            # Пустые значения всегда внизу таблицы; при обратном порядке список читается с конца
+            return (-1 if self._descending else 2), 0
+        if _is_number(value):
+            return 0, value
+        return 1, str(value)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if column < 0 or column >= len(self._columns):
+            return
+        self.layoutAboutToBeChanged.emit()
+        self._sort_column = column
+        self._descending = order == Qt.SortOrder.DescendingOrder
+        self._rows.sort(key=self._sort_key)
+        self.layoutChanged.emit()
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def create_results_view(model, parent=None):
+    """Таблица для ResultsTableModel: фиксированная высота строк, сортировка по клику на заголовок."""
+    view = QTableView(parent)
+    view.setModel(model)
+    # Без сортировки по умолчанию строки идут в порядке поступления; индикатор снимаем
+    # до включения сортировки, иначе представление сразу отсортирует по первой колонке
+    view.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+    view.setSortingEnabled(True)
+    view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+    view.horizontalHeader().setStretchLastSection(True)
+    # Фиксированная высота строк: представлению не нужно измерять каждую строку
+    view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+    view.verticalHeader().setDefaultSectionSize(view.fontMetrics().height() + 6)
+    view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+    view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+    return view
+
+
+def reset_results(view):
+    """Очищает таблицу перед новым запуском и снимает сортировку."""
+    view.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+    view.model().clear()
@@ -1,10 +1,13 @@
 # ui/settings_page.py
 import configparser
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QCheckBox, QLineEdit, QPushButton, QHBoxLayout, QFileDialog
+    QWidget, QVBoxLayout, QLabel, QCheckBox, QLineEdit, QPushButton, QHBoxLayout, QFileDialog, QComboBox,
+    QSpinBox
 )
 from PyQt6.QtCore import Qt
 from utils.get_config_path import config_path
+from utils.writers import OUTPUT_FORMATS
+from .endpoints_dialog import EndpointsDialog
 
 
 class SettingsPage(QWidget):
@@ -33,6 +36,10 @@ class SettingsPage(QWidget):
         self.output_dir_button = QPushButton("Обзор")
         self.output_dir_button.clicked.connect(self.browse_output_directory)
 
+        # Формат итогового файла
+        self.output_format_combo = QComboBox()
+        self.output_format_combo.addItems(list(OUTPUT_FORMATS))
+
         # Читаем конфигурацию
         self.config = configparser.ConfigParser()
         self.config.read(self.config_path)
@@ -53,11 +60,17 @@ class SettingsPage(QWidget):
             checkbox = QCheckBox(net)
             self.checkboxes[net] = checkbox
 
+            # Можно указать несколько эндпоинтов через запятую, вес — после "|"
             rpc_edit = QLineEdit()
+            rpc_edit.setPlaceholderText("https://rpc-a|3, https://rpc-b")
             self.rpc_edits[net] = rpc_edit
 
+            endpoints_button = QPushButton("Эндпоинты…")
+            endpoints_button.clicked.connect(lambda checked, n=net: self.edit_endpoints(n))
+
             row_layout.addWidget(checkbox)
             row_layout.addWidget(rpc_edit)
+            row_layout.addWidget(endpoints_button)
             layout.addLayout(row_layout)
 
         # Секция для задания директории сохранения результатов
@@ -66,8 +79,25 @@ class SettingsPage(QWidget):
         output_layout.addWidget(output_label)
         output_layout.addWidget(self.output_dir_edit)
         output_layout.addWidget(self.output_dir_button)
+        output_layout.addWidget(QLabel("Формат:"))
+        output_layout.addWidget(self.output_format_combo)
         layout.addLayout(output_layout)
 
+        # Режим снимка: все балансы читаются на одной высоте блока
+        self.snapshot_checkbox = QCheckBox("Снимок на одном блоке")
+        layout.addWidget(self.snapshot_checkbox)
+
+        # Метрики запросов: файл итогов рядом с результатом и экспорт для Prometheus
+        metrics_layout = QHBoxLayout()
+        self.metrics_summary_checkbox = QCheckBox("Сохранять метрики запросов")
+        self.prometheus_port_spin = QSpinBox()
+        self.prometheus_port_spin.setRange(0, 65535)
+        self.prometheus_port_spin.setSpecialValueText("выключен")
+        metrics_layout.addWidget(self.metrics_summary_checkbox)
+        metrics_layout.addWidget(QLabel("Порт Prometheus:"))
+        metrics_layout.addWidget(self.prometheus_port_spin)
+        layout.addLayout(metrics_layout)
+
         # Кнопки "Сохранить" и "Назад"
         buttons_layout = QHBoxLayout()
         save_button = QPushButton("Сохранить")
@@ -82,6 +112,11 @@ class SettingsPage(QWidget):
 
         self.setLayout(layout)
 
+    def edit_endpoints(self, net):
+        dialog = EndpointsDialog(net, self.rpc_edits[net].text(), self)
+        if dialog.exec():
+            self.rpc_edits[net].setText(dialog.value)
+
     def browse_output_directory(self):
         directory = QFileDialog.getExistingDirectory(self, "Выберите директорию сохранения")
         if directory:
@@ -103,9 +138,14 @@ class SettingsPage(QWidget):
         if "Output" in self.config:
             output_dir = self.config.get("Output", "output_dir", fallback="")
             self.output_dir_edit.setText(output_dir)
+            self.output_format_combo.setCurrentText(self.config.get("Output", "format", fallback="xlsx"))
         else:
             self.output_dir_edit.setText("")
 
+        self.snapshot_checkbox.setChecked(self.config.getboolean("Snapshot", "enabled", fallback=False))
+        self.metrics_summary_checkbox.setChecked(self.config.getboolean("Metrics", "summary", fallback=True))
+        self.prometheus_port_spin.setValue(self.config.getint("Metrics", "prometheus_port", fallback=0))
+
     def save_settings(self):
         """Сохраняем изменения в config.ini."""
         if "Networks" not in self.config:
@@ -114,12 +154,20 @@ class SettingsPage(QWidget):
             self.config["RPCs"] = {}
         if "Output" not in self.config:
             self.config["Output"] = {}
+        if "Snapshot" not in self.config:
+            self.config["Snapshot"] = {}
+        if "Metrics" not in self.config:
+            self.config["Metrics"] = {}
 
         for net in self.networks:
             self.config["Networks"][net] = str(self.checkboxes[net].isChecked())
             self.config["RPCs"][net] = self.rpc_edits[net].text()
 
         self.config["Output"]["output_dir"] = self.output_dir_edit.text()
+        self.config["Output"]["format"] = self.output_format_combo.currentText()
+        self.config["Snapshot"]["enabled"] = str(self.snapshot_checkbox.isChecked())
+        self.config["Metrics"]["summary"] = str(self.metrics_summary_checkbox.isChecked())
+        self.config["Metrics"]["prometheus_port"] = str(self.prometheus_port_spin.value())
 
         with open(self.config_path, "w") as f:
             self.config.write(f)
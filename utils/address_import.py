@@ -0,0 +1,307 @@
+"""
+Импорт адресов из вставленного текста или файлов txt/csv/xlsx.
+
+Файл читается потоково порциями по CHUNK_SIZE строк: каждая порция нормализуется,
+проверяется (контрольная сумма EIP-55 для EVM, bech32 для Cosmos) и очищается от
+повторов до того, как адреса попадут в проверку. Контрольные суммы считаются по
+одной на адрес (keccak и bech32 поэлементно не векторизуются), но в пределах
+порции — один раз на различный адрес. В памяти остаются только принятые
+адреса и компактные ключи для поиска повторов (20 байт на адрес). Отклонённые строки
+пишутся в отчёт *_rejected.csv с номером строки и причиной.
+"""
+import configparser
+import csv
+import io
+import os
+import re
+from itertools import islice
+
+from utils.get_config_path import config_path
+from utils.writers import CsvWriter, output_path
+
+EVM = "evm"
+COSMOS = "cosmos"
+
+# Префикс bech32 аккаунтов Cosmos Hub
+COSMOS_PREFIX = "cosmos"
+CHUNK_SIZE = 10000
+IMPORT_EXTENSIONS = (".txt", ".csv", ".xlsx")
+
+# Заголовки колонки с адресами в csv/xlsx; без заголовка берётся первая колонка
+ADDRESS_HEADERS = {"address", "addresses", "wallet", "адрес", "адреса", "кошелёк", "кошелек"}
+
+BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+_BECH32_VALUES = {char: value for value, char in enumerate(BECH32_CHARSET)}
+_EVM_RE = re.compile(r"(?:0[xX])?([0-9a-fA-F]{40})")
+# Кавычки и разделители, которые остаются вокруг адреса при копировании из таблиц
+_STRIP_CHARS = " \t\r\n\ufeff\"'`,;"
+
+
+class RejectedReport:
+    """Отчёт об отклонённых строках импорта; файл создаётся только при первой такой строке."""
+
+    COLUMNS = ["line", "value", "reason"]
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._writer = None
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def add_many(self, rejected):
+        if not rejected or not self.path:
+            self.count += len(rejected)
+            return
+        if self._writer is None:
+            self._writer = CsvWriter(self.path, self.COLUMNS)
+        self._writer.write_many(rejected)
+        self.count += len(rejected)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class AddressImport:
+    """
+    Нормализует и проверяет адреса порциями: feed(rows) принимает список
+    (номер строки, значение) и добавляет новые корректные адреса в addresses.
+    """
+
+    def __init__(self, kind, report_path=None, prefix=COSMOS_PREFIX):
+        if kind not in (EVM, COSMOS):
+            raise ValueError(f"Неизвестный тип адресов: {kind}")
+        self.kind = kind
+        self.prefix = prefix
+        self.addresses = []
+        self.total = 0
+        self.duplicates = 0
+        self.report = RejectedReport(report_path)
+        self._seen = set()
+
+    @property
+    def rejected(self):
+        return self.report.count
+
+    def feed(self, rows):
+        rows = [(line, _clean(value)) for line, value in rows]
+        rows = [(line, value) for line, value in rows if value]
+        self.total += len(rows)
+        if self.kind == EVM:
+            results = normalize_evm_chunk([value for _, value in rows])
+        else:
+            results = normalize_bech32_chunk([value for _, value in rows], self.prefix)
+
+        rejected = []
+        seen = self._seen
+        for (line, value), (address, key, reason) in zip(rows, results):
+            if reason:
+                rejected.append([line, value, reason])
+            elif key in seen:
+                self.duplicates += 1
+            else:
+                seen.add(key)
+                self.addresses.append(address)
+        self.report.add_many(rejected)
+
+    def close(self):
+        self.report.close()
+        # Ключи нужны только на время импорта
+        self._seen = set()
+
+    def summary(self):
+        text = (f"Импортировано адресов: {len(self.addresses)} из {self.total} строк, "
+                f"повторов: {self.duplicates}, отклонено: {self.rejected}")
+        if self.rejected and self.report.path:
+            text += f" (подробности в файле {self.report.path})"
+        return text
+
+
+def _clean(value):
+    if value is None:
+        return ""
+    return str(value).strip(_STRIP_CHARS)
+
+
+def normalize_evm_chunk(values):
+    """
+    Приводит порцию EVM-адресов к виду EIP-55. Возвращает для каждого значения
+    (адрес, ключ для поиска повторов, причина отклонения или None).
+    Адрес в смешанном регистре должен совпадать со своей контрольной суммой.
+    Сначала по всей порции проверяется формат, затем контрольная сумма считается
+    один раз на каждый различный адрес.
+    """
+    from eth_utils import keccak
+
+    bodies = [_EVM_RE.fullmatch(value) for value in values]
+    bodies = [match.group(1) if match else None for match in bodies]
+    checksums = {}
+    for lower in {body.lower() for body in bodies if body}:
+        digest = keccak(lower.encode("ascii")).hex()
+        checksums[lower] = "".join(char.upper() if nibble in "89abcdef" else char
+                                   for char, nibble in zip(lower, digest))
+
+    results = []
+    for body in bodies:
+        if body is None:
+            results.append((None, None, "не EVM-адрес"))
+            continue
+        lower = body.lower()
+        checksummed = checksums[lower]
+        if body != lower and body != body.upper() and body != checksummed:
+            results.append((None, None, "неверная контрольная сумма EIP-55"))
+            continue
+        results.append(("0x" + checksummed, bytes.fromhex(lower), None))
+    return results
+
+
+def _bech32_polymod(values):
+    generator = (0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3)
+    checksum = 1
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1FFFFFF) << 5 ^ value
+        for i in range(5):
+            if (top >> i) & 1:
+                checksum ^= generator[i]
+    return checksum
+
+
+def _convert_bits(data, from_bits, to_bits):
+    """Перепаковка 5-битных групп bech32 в байты; None при ненулевом дополнении."""
+    accumulator = 0
+    bits = 0
+    result = bytearray()
+    max_value = (1 << to_bits) - 1
+    for value in data:
+        accumulator = (accumulator << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append((accumulator >> bits) & max_value)
+    if bits >= from_bits or (accumulator << (to_bits - bits)) & max_value:
+        return None
+    return bytes(result)
+
+
+def normalize_bech32(value, prefix=COSMOS_PREFIX):
+    """
+    Проверяет bech32-адрес с заданным префиксом. Возвращает
+    (адрес в нижнем регистре, ключ для поиска повторов, причина отклонения или None).
+    """
+    if value != value.lower() and value != value.upper():
+        return None, None, "смешанный регистр в bech32"
+    address = value.lower()
+    hrp, separator, data = address.rpartition("1")
+    if not separator or len(address) > 90 or len(data) < 6:
+        return None, None, "не bech32-адрес"
+    if hrp != prefix:
+        return None, None, f"префикс {hrp or '—'} вместо {prefix}"
+    values = [_BECH32_VALUES.get(char) for char in data]
+    if None in values:
+        return None, None, "недопустимые символы bech32"
+    expanded = [ord(char) >> 5 for char in hrp] + [0] + [ord(char) & 31 for char in hrp]
+    if _bech32_polymod(expanded + values) != 1:
+        return None, None, "неверная контрольная сумма bech32"
+    payload = _convert_bits(values[:-6], 5, 8)
+    if payload is None or len(payload) not in (20, 32):
+        return None, None, "неверная длина адреса"
+    return address, payload, None
+
+
+def normalize_bech32_chunk(values, prefix=COSMOS_PREFIX):
+    """normalize_bech32 для порции: повторяющиеся в порции значения проверяются один раз."""
+    results = {value: normalize_bech32(value, prefix) for value in set(values)}
+    return [results[value] for value in values]
+
+
+def _address_column(header):
+    for i, cell in enumerate(header):
+        if _clean(cell).lower() in ADDRESS_HEADERS:
+            return i
+    return None
+
+
+def _iter_table(rows):
+    """Значения колонки адресов из строк таблицы; заголовок пропускается, если он есть."""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
+    column = _address_column(first)
+    if column is None:
+        column = 0
+        yield 1, first[0] if first else None
+    for line, row in enumerate(rows, start=2):
+        yield line, row[column] if len(row) > column else None
+
+
+def _iter_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        yield from _iter_table(csv.reader(f))
+
+
+def _iter_xlsx(path):
+    from openpyxl import load_workbook
+
+    # read_only: строки листа читаются потоково, а не загружаются в память целиком
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from _iter_table(workbook.worksheets[0].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def _iter_lines(lines):
+    for line, value in enumerate(lines, start=1):
+        yield line, value
+
+
+def _iter_text_file(path):
+    with open(path, encoding="utf-8-sig") as f:
+        yield from _iter_lines(f)
+
+
+def text_lines(text):
+    """Строки вставленного текста без промежуточного списка, как у splitlines()."""
+    return io.StringIO(text)
+
+
+def iter_source(source):
+    """(номер строки, значение) из пути к файлу txt/csv/xlsx или из итерируемого набора строк."""
+    if not isinstance(source, (str, os.PathLike)):
+        return _iter_lines(source)
+    extension = os.path.splitext(source)[1].lower()
+    if extension == ".xlsx":
+        return _iter_xlsx(source)
+    if extension == ".csv":
+        return _iter_csv(source)
+    return _iter_text_file(source)
+
+
+def import_addresses(source, kind, report_path=None, chunk_size=CHUNK_SIZE, prefix=COSMOS_PREFIX):
+    """
+    Импортирует адреса из файла (путь) или строк (например, text_lines(...) или stdin).
+    Возвращает AddressImport: addresses — уникальные корректные адреса в исходном порядке.
+    """
+    result = AddressImport(kind, report_path, prefix)
+    rows = iter_source(source)
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            result.feed(chunk)
+    finally:
+        result.close()
+    return result
+
+
+def rejected_report_path(basename, config=None):
+    """Отчёт об отклонённых строках рядом с итоговым файлом проверки."""
+    if config is None:
+        config = configparser.ConfigParser()
+        config.read(config_path)
+    return os.path.splitext(output_path(config, basename))[0] + "_rejected.csv"
@@ -1,48 +1,490 @@
-import requests
-import pandas as pd
+import asyncio
+import configparser
+import os
+from concurrent.futures import ThreadPoolExecutor
+from utils import metrics, transport
+from utils.get_config_path import config_path
+from utils.balance_cache import open_cache
+from utils.journal import open_journal, scale_progress
+from utils.writers import output_path, open_writer
+from utils.result_store import ResultStore, format_row
+from utils.retry import (
+    AdaptiveLimiter, HTTPStatusError, load_retry_policy, parse_retry_after, retry_async, retry_blocking
+)
+from utils.failure_report import FailureReport, failure_report_path
+from utils.sharding import load_shard_count, run_shards, shard_config, split_shards
+from utils.cosmos_staking import (
+    DEC_PRECISION, fetch_all_pages, fetch_page, height_headers, load_validators, parse_delegations,
+    parse_unbonding, parse_validator_rewards, parse_validators
+)
+from utils.cosmos_rpc import fetch_abci_queries, latest_height
+from utils.eth_batch import RpcError
 # Ваш публичный или локальный REST-эндпоинт для сети Cosmos
 BASE_URL = "https://cosmos-rest.publicnode.com"
 
-def get_balance(address):
-    # Получаем баланс
-    url = f"{BASE_URL}/cosmos/bank/v1beta1/balances/{address}"
-    r = requests.get(url)
-    if r.status_code != 200:
-        return 0.0
-    data = r.json()
+def balance_url(address):
+    return f"{BASE_URL}/cosmos/bank/v1beta1/balances/{address}"
+
+def staked_url(address):
+    return f"{BASE_URL}/cosmos/staking/v1beta1/delegations/{address}"
+
+def unbonding_url(address):
+    return f"{BASE_URL}/cosmos/staking/v1beta1/delegators/{address}/unbonding_delegations"
+
+def rewards_url(address):
+    return f"{BASE_URL}/cosmos/distribution/v1beta1/delegators/{address}/rewards"
+
+def latest_block_url():
+    return f"{BASE_URL}/cosmos/base/tendermint/v1beta1/blocks/latest"
+
+# Суммы разбираются в целые uatom; награды (DecCoin с 18 знаками) — в uatom * 10^18.
+# В ATOM они переводятся при записи итогового файла (см. utils.result_store)
+ATOM_DECIMALS = 6
+ATOM_PLACES = 6
+
+def parse_balance(data):
     balances = data.get("balances", [])
     uatom_bal = next((b for b in balances if b["denom"] == "uatom"), None)
     if uatom_bal:
-        return float(uatom_bal["amount"]) / 1_000_000
-    return 0.0
+        return int(uatom_bal["amount"])
+    return 0
 
-def get_staked(address):
-    # Получаем делегированные (стейкнутые) средства
-    url = f"{BASE_URL}/cosmos/staking/v1beta1/delegations/{address}"
-    r = requests.get(url)
-    if r.status_code != 200:
-        return 0.0
-    data = r.json()
-    delegations = data.get("delegation_responses", [])
-    total_ua = 0.0
-    for d in delegations:
-        total_ua += float(d["balance"]["amount"])
-    return total_ua / 1_000_000
-
-def get_rewards(address):
-    # Получаем награды за стейкинг (непретендованные)
-    url = f"{BASE_URL}/cosmos/distribution/v1beta1/delegators/{address}/rewards"
-    r = requests.get(url)
+def fetch_json(url, headers=None):
+    # Неуспешный статус поднимаем как ошибку: временные повторяются, остальные не превращаются в 0.0
+    r = transport.get_session(BASE_URL).get(url, headers=headers)
     if r.status_code != 200:
-        return 0.0
-    data = r.json()
-    total = data.get("total", [])
-    uatom_reward = next((r for r in total if r["denom"] == "uatom"), None)
-    if uatom_reward:
-        return float(uatom_reward["amount"]) / 1_000_000
-    return 0.0
+        raise HTTPStatusError(r.status_code, parse_retry_after(r.headers.get("Retry-After")))
+    return r.json()
+
+def resolve_snapshot_height(confirmations=0, policy=None, rpc_url=None):
+    """Закрепляет высоту снимка: последний блок сети минус confirmations."""
+    if rpc_url:
+        latest = retry_blocking(lambda: latest_height(transport.get_session(rpc_url), rpc_url), policy)
+    else:
+        data = retry_blocking(lambda: fetch_json(latest_block_url()), policy)
+        block = data.get("sdk_block") or data["block"]
+        latest = int(block["header"]["height"])
+    return max(1, latest - confirmations)
+
+
+# Идентификатор сети в кэше результатов
+COSMOS_CHAIN = "cosmoshub"
+
+def cosmos_rpc_url(config, chain=COSMOS_CHAIN):
+    """CometBFT RPC сети из секции [CosmosRPC]; пусто — запросы идут через REST-шлюз."""
+    return config.get("CosmosRPC", chain, fallback="").strip() or None
+
+# Колонки итогового файла; в режиме снимка добавляется "height"
+ATOM_COLUMNS = ["address", "balance", "staked", "unbonding", "rewards"]
+# Колонки сумм и число знаков их базовой единицы
+ATOM_AMOUNTS = {"balance": ATOM_DECIMALS, "staked": ATOM_DECIMALS, "unbonding": ATOM_DECIMALS,
+                "rewards": ATOM_DECIMALS + DEC_PRECISION}
+
+# Запросы, значение которых — {валидатор: сумма}; в строку итогового файла идёт их сумма
+VALIDATOR_QUERIES = ["staked", "unbonding", "rewards"]
+# Колонки файла разбивки по валидаторам ([Cosmos] breakdown)
+BREAKDOWN_COLUMNS = ["address", "validator", "moniker", *VALIDATOR_QUERIES]
+
+def cache_query(query):
+    # Суммы в кэше — целые базовые единицы; суффикс отделяет их от значений прежних версий
+    # (в ATOM или уже просуммированных по валидаторам)
+    return f"{query}:validators" if query in VALIDATOR_QUERIES else f"{query}:base"
+
+# Типы запросов по адресу: функция построения URL, ключ списка для постраничного
+# запроса (None — ответ без пагинации) и разбор ответа
+COSMOS_QUERIES = {
+    "balance": (balance_url, None, parse_balance),
+    "staked": (staked_url, "delegation_responses", parse_delegations),
+    "unbonding": (unbonding_url, "unbonding_responses", parse_unbonding),
+    "rewards": (rewards_url, None, parse_validator_rewards),
+}
+
+async def fetch_value_async(session, url, parse, headers=None):
+    data, _ = await fetch_page(session, url, headers=headers)
+    return parse(data)
+
+async def get_value_async(session, limiter, address, query, cache=None, policy=None, failures=None,
+                          height=None):
+    """
+    Значение одного запроса по адресу (на высоте height, если она закреплена).
+    Лимитер ограничивает число одновременных HTTP-запросов к BASE_URL и снижает
+    его при троттлинге; постраничные запросы проходят через него страница за страницей.
+    Если значение не удалось получить после всех повторов, возвращается None,
+    а ошибка пишется в failures.
+    """
+    if cache:
+        cached = cache.get(COSMOS_CHAIN, address, cache_query(query), height)
+        if cached is not None:
+            return cached
+    build_url, page_key, parse = COSMOS_QUERIES[query]
+    url = build_url(address)
+    headers = height_headers(height)
+    on_retry = metrics.retry_callback(COSMOS_CHAIN, metrics.query_of(url))
+    try:
+        if page_key:
+            retry = lambda call: retry_async(call, policy, limiter, on_retry)
+            value = parse(await fetch_all_pages(session, url, page_key, headers, retry))
+        else:
+            value = await retry_async(lambda: fetch_value_async(session, url, parse, headers), policy, limiter,
+                                      on_retry)
+    except Exception as e:
+        if failures:
+            failures.add(address, COSMOS_CHAIN, query, e)
+        return None
+    if cache:
+        cache.put(COSMOS_CHAIN, address, cache_query(query), value, height)
+    return value
+
+def total_of(value):
+    # {валидатор: сумма} -> сумма по всем валидаторам; None (не получено) остаётся None
+    return sum(value.values()) if isinstance(value, dict) else value
+
+async def get_address_data_async(session, limiter, address, cache=None, policy=None, failures=None,
+                                 height=None, breakdown=False):
+    """
+    Строка [address, balance, staked, unbonding, rewards(, height)]. Все запросы
+    адреса идут параллельно. С breakdown последним элементом строки добавляется
+    {запрос: {валидатор: сумма}} для файла разбивки — в итоговый файл он не пишется.
+    """
+    values = dict(zip(COSMOS_QUERIES, await asyncio.gather(*(
+        get_value_async(session, limiter, address, query, cache, policy, failures, height)
+        for query in COSMOS_QUERIES
+    ))))
+    return address_row(address, values, height, breakdown)
+
+def address_row(address, values, height=None, breakdown=False):
+    row = [address, *(total_of(values[query]) for query in COSMOS_QUERIES)]
+    # В режиме снимка после сумм идёт высота, на которой прочитаны значения
+    if height is not None:
+        row.append(height)
+    if breakdown:
+        row.append({query: values[query] for query in VALIDATOR_QUERIES})
+    return row
+
+def breakdown_rows(row, monikers, height=None):
+    """Строки файла разбивки [address, validator, moniker, staked, unbonding, rewards(, height)] по строке адреса."""
+    address, details = row[0], row[-1]
+    if not isinstance(details, dict):
+        return []
+    validators = sorted(set().union(*(values for values in details.values() if values)))
+    return [
+        [address, validator, monikers.get(validator, ""),
+         *(values.get(validator, 0) if values is not None else None
+           for values in (details.get(query) for query in VALIDATOR_QUERIES)),
+         *([height] if height is not None else [])]
+        for validator in validators
+    ]
+
+def load_monikers(policy=None, rpc_url=None):
+    """Моникеры валидаторов для файла разбивки; при ошибке разбивка пишется без них."""
+    async def load():
+        async with transport.create_aiohttp_session() as session:
+            return await load_validators(session, BASE_URL, lambda call: retry_async(call, policy))
+    try:
+        if rpc_url:
+            items = fetch_abci_queries(transport.get_session(rpc_url), rpc_url, [("", "validators")],
+                                       policy=policy)[("", "validators")]
+            if isinstance(items, Exception):
+                raise items
+            return parse_validators(items)
+        return asyncio.run(load())
+    except Exception as e:
+        print(f"[{COSMOS_CHAIN}] Не удалось загрузить список валидаторов: {e}")
+        return {}
+
+def breakdown_path(output_filename):
+    """Путь к файлу разбивки по валидаторам рядом с итоговым файлом."""
+    base, ext = os.path.splitext(output_filename)
+    return f"{base}_validators{ext}"
+
+async def get_addresses_data_async(addresses, max_in_flight=16, progress_callback=None,
+                                   is_interrupted=None, cache=None, on_row=None, policy=None,
+                                   failures=None, height=None, breakdown=False):
+    """
+    Запрашивает данные по всем адресам параллельно, держа в полёте не больше
+    max_in_flight HTTP-запросов (меньше, если REST-эндпоинт отвечает 429).
+    Возвращает строки [address, balance, staked, unbonding, rewards] в порядке входного списка;
+    при прерывании — только для обработанных адресов. Неполученные значения — None.
+    Каждая готовая строка сразу передаётся в on_row.
+    """
+    # Если строки забирает on_row, в памяти их не копим
+    results = [None] * len(addresses) if on_row is None else None
+    total = len(addresses)
+    done = 0
+    pending = iter(enumerate(addresses))
+    limiter = AdaptiveLimiter(max_in_flight)
+
+    async with transport.create_aiohttp_session() as session:
+        async def worker():
+            nonlocal done
+            for i, address in pending:
+                if is_interrupted and is_interrupted():
+                    return
+                row = await get_address_data_async(session, limiter, address, cache, policy, failures,
+                                                   height, breakdown)
+                if on_row:
+                    on_row(row)
+                else:
+                    results[i] = row
+                done += 1
+                if progress_callback:
+                    progress_callback(int(done / total * 100))
+
+        # Каждый адрес даёт не меньше четырёх запросов, поэтому воркеров хватает, чтобы загрузить лимитер
+        workers = max(1, min(total, max_in_flight))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    if results is None:
+        return []
+    return [row for row in results if row is not None]
+
+def fetch_segment_rpc(session, rpc_url, addresses, cache=None, policy=None, height=None, batch_size=100):
+    """Значения запросов по адресам сегмента из кэша или батчами abci_query: {(address, query): значение | Exception}."""
+    values = {}
+    todo = []
+    for address in addresses:
+        for query in COSMOS_QUERIES:
+            cached = cache.get(COSMOS_CHAIN, address, cache_query(query), height) if cache else None
+            if cached is not None:
+                values[address, query] = cached
+            else:
+                todo.append((address, query))
+    fetched = fetch_abci_queries(session, rpc_url, todo, height, batch_size, policy)
+    for address, query in todo:
+        value = fetched.get((address, query))
+        if value is None:
+            value = RpcError("Узел не вернул ответ на запрос")
+        if not isinstance(value, Exception):
+            # Ответ уже в форме REST — разбор общий с REST-путём
+            try:
+                value = COSMOS_QUERIES[query][2](value)
+            except (KeyError, TypeError, ValueError) as e:
+                value = e
+            else:
+                if cache:
+                    cache.put(COSMOS_CHAIN, address, cache_query(query), value, height)
+        values[address, query] = value
+    return values
+
+def run_address_check_rpc(addresses, rpc_url, max_in_flight=16, batch_size=100, progress_callback=None,
+                          is_interrupted=None, cache=None, on_row=None, policy=None, failures=None, height=None,
+                          breakdown=False):
+    """
+    То же, что run_address_check, через CometBFT RPC (см. utils.cosmos_rpc): адреса
+    делятся на сегменты по batch_size, запросы сегмента уходят JSON-RPC батчами
+    abci_query, до max_in_flight сегментов запрашиваются параллельно в потоках.
+    """
+    session = transport.get_session(rpc_url)
+    size = max(1, batch_size)
+    segments = [addresses[start:start + size] for start in range(0, len(addresses), size)]
+    results = []
+    done = 0
+
+    def fetch(segment):
+        if is_interrupted and is_interrupted():
+            return segment, None
+        return segment, fetch_segment_rpc(session, rpc_url, segment, cache, policy, height, batch_size)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_in_flight, len(segments)))) as executor:
+        for segment, values in executor.map(fetch, segments):
+            if values is None:
+                continue
+            for address in segment:
+                for query in COSMOS_QUERIES:
+                    if isinstance(values[address, query], Exception):
+                        if failures:
+                            failures.add(address, COSMOS_CHAIN, query, values[address, query])
+                        values[address, query] = None
+                row = address_row(address, {query: values[address, query] for query in COSMOS_QUERIES},
+                                  height, breakdown)
+                if on_row:
+                    on_row(row)
+                else:
+                    results.append(row)
+            done += len(segment)
+            if progress_callback:
+                progress_callback(int(done / len(addresses) * 100))
+    return results
+
+def run_address_check(addresses, max_in_flight=16, progress_callback=None, is_interrupted=None,
+                      cache=None, on_row=None, policy=None, failures=None, height=None, breakdown=False,
+                      rpc_url=None, batch_size=100):
+    if rpc_url:
+        return run_address_check_rpc(addresses, rpc_url, max_in_flight, batch_size, progress_callback,
+                                     is_interrupted, cache, on_row, policy, failures, height, breakdown)
+    return asyncio.run(get_addresses_data_async(addresses, max_in_flight, progress_callback,
+                                                is_interrupted, cache, on_row, policy, failures, height,
+                                                breakdown))
+
+def atom_shard_main(payload, shard):
+    """Процесс-шард: своя aiohttp-сессия, цикл событий и доля лимита max_in_flight."""
+    global BASE_URL
+    BASE_URL = payload["base_url"]
+    config = configparser.ConfigParser()
+    config.read_dict(payload["config"])
+    transport.configure(config)
+    rpc_url = cosmos_rpc_url(config)
+    metrics.register_endpoints(COSMOS_CHAIN, [BASE_URL] + ([rpc_url] if rpc_url else []))
+    cache = open_cache(config, bypass=payload["bypass_cache"])
+    try:
+        run_address_check(
+            payload["addresses"],
+            max_in_flight=config.getint("Cosmos", "max_in_flight", fallback=16),
+            progress_callback=shard.progress,
+            is_interrupted=shard.is_interrupted,
+            cache=cache,
+            on_row=shard.row,
+            policy=load_retry_policy(config),
+            failures=shard,
+            height=payload["height"],
+            breakdown=payload["breakdown"],
+            rpc_url=rpc_url,
+            batch_size=config.getint("Performance", "batch_size", fallback=100),
+        )
+    finally:
+        if cache:
+            cache.close()
+
+def run_atom_sharded(config, parts, on_row, progress_callback, is_interrupted, failures,
+                     bypass_cache=False, height=None, breakdown=False):
+    """Запуск по шардам (см. utils.sharding): строки пишет только основной процесс."""
+    base_config = shard_config(config, len(parts))
+    payloads = [{
+        "addresses": part,
+        "config": base_config,
+        "base_url": BASE_URL,
+        "height": height,
+        "bypass_cache": bypass_cache,
+        "breakdown": breakdown,
+    } for part in parts]
+
+    def on_rows(rows):
+        for row in rows:
+            on_row(row)
+
+    run_shards(atom_shard_main, payloads, on_rows, failures.add_formatted, progress_callback, is_interrupted)
+
+def run_atom_check(addresses, progress_callback=None, is_interrupted=None, bypass_cache=False, config=None,
+                   on_row=None):
+    """
+    Полный запуск проверки Cosmos: журнал, кэш, запросы и запись итогового файла.
+    on_row(row) получает каждую готовую строку [address, balance, staked, unbonding, rewards(, height)]
+    с суммами в ATOM. С [Cosmos] breakdown рядом пишется файл разбивки по валидаторам.
+    Возвращает путь к итоговому файлу.
+    """
+    if config is None:
+        config = configparser.ConfigParser()
+        config.read(config_path)
+    max_in_flight = config.getint("Cosmos", "max_in_flight", fallback=16)
+    breakdown = config.getboolean("Cosmos", "breakdown", fallback=False)
+    rpc_url = cosmos_rpc_url(config)
+    policy = load_retry_policy(config)
+    transport.configure(config)
+    save_metrics = metrics.configure(config)
+    metrics.register_endpoints(COSMOS_CHAIN, [BASE_URL] + ([rpc_url] if rpc_url else []))
+    metrics.begin_run("atom", [COSMOS_CHAIN])
+
+    # Режим снимка: все запросы читают состояние на одной высоте
+    snapshot = config.getboolean("Snapshot", "enabled", fallback=False)
+    height = None
+    if snapshot:
+        height = resolve_snapshot_height(config.getint("Snapshot", "confirmations", fallback=0), policy, rpc_url)
+
+    output_filename = output_path(config, "atom_balances")
+
+    # Журнал запуска: уже обработанные адреса прерванного запуска повторно не запрашиваем
+    # Набор колонок и разбивка входят в отпечаток: строки журнала другого формата не смешиваются
+    journal = open_journal(config, output_filename, addresses, "atom", *ATOM_COLUMNS,
+                           *(["snapshot"] if snapshot else []), *(["breakdown"] if breakdown else []),
+                           meta={"height": height})
+    if journal and journal.meta.get("height"):
+        # Продолжение прерванного снимка читает данные на той же высоте
+        height = int(journal.meta["height"])
+    if height is not None:
+        print(f"[{COSMOS_CHAIN}] Снимок на высоте {height}")
+    todo = [address for address in addresses if not journal.is_done(address)] if journal else addresses
+    columns = ATOM_COLUMNS + (["height"] if height is not None else [])
+    writer = ResultStore(open_writer(config, output_filename, columns, dict.fromkeys(ATOM_AMOUNTS, ATOM_PLACES)),
+                         ATOM_AMOUNTS, ATOM_PLACES)
+    details = None
+    if breakdown:
+        # Справочник валидаторов — один раз на запуск, а не на каждого делегатора
+        monikers = load_monikers(policy, rpc_url)
+        details = ResultStore(
+            open_writer(config, breakdown_path(output_filename),
+                        BREAKDOWN_COLUMNS + (["height"] if height is not None else []),
+                        dict.fromkeys(ATOM_AMOUNTS, ATOM_PLACES)),
+            ATOM_AMOUNTS, ATOM_PLACES,
+        )
+
+    def write_output(row):
+        writer.write(row)
+        if details:
+            details.write_many(breakdown_rows(row, monikers, height))
+
+    # С журналом строки пишутся в него, итоговый файл собирается в конце; без журнала — сразу в файл.
+    # Строка с неполученными значениями будет перезапрошена при следующем запуске
+    write_row = (lambda row: journal.append(row[0], row, complete=None not in row)) if journal else write_output
+    if on_row:
+        if journal and len(todo) < len(addresses):
+            # Строки, готовые в прерванном запуске, показываем сразу
+            for row in journal.rows():
+                if journal.is_done(row[0]):
+                    on_row(format_row(row, columns, ATOM_AMOUNTS, ATOM_PLACES))
 
+        def write_and_report(row):
+            write_row(row)
+            on_row(format_row(row, columns, ATOM_AMOUNTS, ATOM_PLACES))
+    else:
+        write_and_report = write_row
+    failures = FailureReport(failure_report_path(output_filename))
 
-def get_address_data(address):
-    return [address, get_balance(address), get_staked(address), get_rewards(address)]
+    progress = scale_progress(progress_callback, len(addresses) - len(todo), len(todo), len(addresses))
+    parts = split_shards(todo, load_shard_count(config))
+    cache = None if len(parts) > 1 else open_cache(config, bypass=bypass_cache)
+    try:
+        if len(parts) > 1:
+            run_atom_sharded(config, parts, write_and_report, progress, is_interrupted, failures,
+                             bypass_cache, height, breakdown)
+        else:
+            run_address_check(
+                todo,
+                max_in_flight=max_in_flight,
+                progress_callback=progress,
+                is_interrupted=is_interrupted,
+                cache=cache,
+                on_row=write_and_report,
+                policy=policy,
+                failures=failures,
+                height=height,
+                breakdown=breakdown,
+                rpc_url=rpc_url,
+                batch_size=config.getint("Performance", "batch_size", fallback=100),
+            )
+        if journal:
+            for row in journal.rows():
+                write_output(row)
+    finally:
+        writer.close()
+        if details:
+            details.close()
+        failures.close()
+        if cache:
+            cache.close()
+            print(cache.report())
+        if journal:
+            journal.close()
+        metrics.end_run("atom")
+        if save_metrics:
+            metrics.write_summary(metrics.summary_path(output_filename), "atom")
 
+    # Журнал нужен только для продолжения незавершённого запуска
+    if journal and not (is_interrupted and is_interrupted()):
+        journal.discard()
+    print(f"Балансы сохранены в файл {output_filename}")
+    if details:
+        print(f"Разбивка по валидаторам сохранена в файл {details.path}")
+    totals = ", ".join(f"{column} {total}" for column, total in writer.format_totals().items() if total)
+    if totals:
+        print(f"Итого: {totals}")
+    return output_filename
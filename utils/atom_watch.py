@@ -0,0 +1,169 @@
+import asyncio
+import configparser
+import time
+
+from utils import metrics, transport
+from utils.get_config_path import config_path
+from utils.atom_balance_check import (
+    ATOM_AMOUNTS, ATOM_PLACES, BASE_URL, COSMOS_CHAIN, get_address_data_async
+)
+from utils.result_store import format_row
+from utils.retry import AdaptiveLimiter, load_retry_policy
+from utils.subscriptions import RESUBSCRIBED, subscribe_many
+from utils.writers import output_path, open_writer
+
+# Колонки файла изменений: одна строка на каждое изменение данных адреса
+WATCH_COLUMNS = ["time", "address", "height", "balance", "staked", "unbonding", "rewards"]
+
+# Подписки на адрес: транзакции, подписанные адресом (переводы, делегирование,
+# вывод наград), и входящие переводы. Язык запросов CometBFT не поддерживает OR,
+# поэтому на каждый адрес — несколько подписок, а не одна на все транзакции сети
+ADDRESS_QUERIES = ("message.sender='{address}'", "transfer.recipient='{address}'")
+# Подписок на одно websocket-соединение: max_subscriptions_per_client в конфиге CometBFT (по умолчанию 5)
+DEFAULT_SUBSCRIPTIONS_PER_CONNECTION = 5
+# Не больше стольких соединений с узлом (max_open_connections / max_subscription_clients
+# в конфиге CometBFT); если адресам нужно больше — одна подписка на все транзакции сети
+DEFAULT_MAX_CONNECTIONS = 4
+TX_QUERY = "tm.event='Tx'"
+
+def address_queries(address):
+    """Параметры запросов subscribe CometBFT для одного адреса."""
+    return [{"query": f"tm.event='Tx' AND {query.format(address=address)}"} for query in ADDRESS_QUERIES]
+
+def subscription_groups(addresses, per_connection=DEFAULT_SUBSCRIPTIONS_PER_CONNECTION):
+    """Адреса, разбитые по соединениям так, чтобы подписок на соединение было не больше per_connection."""
+    size = max(1, per_connection // len(ADDRESS_QUERIES))
+    return [addresses[start:start + size] for start in range(0, len(addresses), size)]
+
+def subscription_plan(addresses, per_connection=DEFAULT_SUBSCRIPTIONS_PER_CONNECTION,
+                      max_connections=DEFAULT_MAX_CONNECTIONS):
+    """
+    Подписки по соединениям: [(адреса соединения, параметры подписок)]. Пока адреса
+    помещаются в max_connections соединений, узел фильтрует транзакции по адресам;
+    иначе — одно соединение с подпиской на все транзакции сети, фильтр на клиенте.
+    """
+    groups = subscription_groups(addresses, per_connection)
+    if len(groups) <= max(1, max_connections):
+        return [(group, [params for address in group for params in address_queries(address)]) for group in groups]
+    print(f"Адресов для наблюдения: {len(addresses)}, подписок по адресам не хватает "
+          f"{max_connections} соединений — отслеживаются все транзакции сети")
+    return [(addresses, [{"query": TX_QUERY}])]
+
+def touched_addresses(event, watched):
+    """Адреса из watched, встречающиеся в атрибутах событий транзакции (отправитель, получатель, делегатор...)."""
+    events = event.get("events") or {}
+    return {value for values in events.values() for value in values if value in watched}
+
+def event_height(event):
+    values = (event.get("events") or {}).get("tx.height")
+    return int(values[0]) if values else None
+
+async def watch_addresses(ws_url, addresses, on_change, is_interrupted=None, max_in_flight=16, policy=None,
+                          subscriptions_per_connection=DEFAULT_SUBSCRIPTIONS_PER_CONNECTION,
+                          max_connections=DEFAULT_MAX_CONNECTIONS):
+    """
+    Следит за адресами по событиям транзакций CometBFT (подписки subscription_plan:
+    по адресам или на все транзакции, не больше max_connections соединений),
+    затронутый транзакцией адрес перечитывается через REST,
+    в on_change(rows) передаются только изменившиеся строки. После
+    (пере)подключения перечитываются все адреса соединения, так как события за
+    время обрыва потеряны. Награды за стейкинг растут каждый блок без
+    транзакций, поэтому обновляются только при перечитывании адреса.
+    """
+    addresses = list(dict.fromkeys(addresses))
+    watched = set(addresses)
+    last = {}
+    pending = set()
+    height = None
+    wake = asyncio.Event()
+
+    def interrupted():
+        return is_interrupted is not None and is_interrupted()
+
+    async with transport.create_aiohttp_session() as session:
+        limiter = AdaptiveLimiter(max_in_flight)
+
+        async def follow_events(group, queries):
+            nonlocal height
+            async for event in subscribe_many(ws_url, "subscribe", queries, is_interrupted, policy):
+                if event is RESUBSCRIBED:
+                    # Полная сверка идёт на текущей высоте, а не на высоте последнего события
+                    pending.update(group)
+                    height = None
+                else:
+                    touched = touched_addresses(event, watched)
+                    if not touched:
+                        continue
+                    pending.update(touched)
+                    height = event_height(event) or height
+                wake.set()
+
+        async def refresh():
+            while not interrupted():
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+                wake.clear()
+                batch, at_height = list(pending), height
+                pending.clear()
+                # Кэш не используем: нужны текущие значения, а не сохранённые ранее
+                rows = await asyncio.gather(*(
+                    get_address_data_async(session, limiter, address, None, policy) for address in batch
+                ))
+                changed = []
+                now = time.strftime("%Y-%m-%d %H:%M:%S")
+                for address, *values in rows:
+                    # Неполученные значения не считаем изменением
+                    if None in values or last.get(address) == values:
+                        continue
+                    last[address] = values
+                    changed.append({"time": now, "address": address, "height": at_height,
+                                    **format_row(dict(zip(WATCH_COLUMNS[3:], values)), None,
+                                                 ATOM_AMOUNTS, ATOM_PLACES)})
+                if changed:
+                    on_change(changed)
+
+        plan = subscription_plan(addresses, subscriptions_per_connection, max_connections)
+        await asyncio.gather(*(follow_events(group, queries) for group, queries in plan), refresh())
+
+def run_atom_watch(addresses, on_change=None, is_interrupted=None, config=None):
+    """
+    Режим наблюдения Cosmos: дописывает изменения баланса, стейкинга и наград
+    в файл atom_watch и в on_change(row), пока is_interrupted() не вернёт True.
+    Возвращает путь к файлу изменений.
+    """
+    if config is None:
+        config = configparser.ConfigParser()
+        config.read(config_path)
+    ws_url = config.get("Watch", COSMOS_CHAIN, fallback="").strip()
+    if not ws_url:
+        raise ValueError(f"Для наблюдения укажите websocket-эндпоинт CometBFT ({COSMOS_CHAIN}) в секции [Watch].")
+    transport.configure(config)
+    # Наблюдение работает долго — для него и нужен экспорт метрик в Prometheus
+    metrics.configure(config)
+    metrics.register_endpoints(COSMOS_CHAIN, [BASE_URL])
+
+    writer = open_writer(config, output_path(config, "atom_watch"), WATCH_COLUMNS,
+                         dict.fromkeys(WATCH_COLUMNS[3:], ATOM_PLACES))
+
+    def emit(rows):
+        writer.write_many(rows)
+        writer.flush()
+        if on_change:
+            for row in rows:
+                on_change(row)
+
+    try:
+        asyncio.run(watch_addresses(
+            ws_url, addresses, emit, is_interrupted,
+            max_in_flight=config.getint("Cosmos", "max_in_flight", fallback=16),
+            policy=load_retry_policy(config),
+            subscriptions_per_connection=config.getint("Cosmos", "watch_subscriptions",
+                                                       fallback=DEFAULT_SUBSCRIPTIONS_PER_CONNECTION),
+            max_connections=config.getint("Cosmos", "watch_connections", fallback=DEFAULT_MAX_CONNECTIONS),
+        ))
+    finally:
+        writer.close()
+    print(f"Изменения сохранены в файл {writer.path}")
+    return writer.path
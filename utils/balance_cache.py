@@ -0,0 +1,144 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.get_config_path import get_app_path
+
+# Высота для результатов, прочитанных на "latest": такие записи живут ttl секунд.
+# Записи с конкретной высотой блока неизменяемы и не устаревают.
+LATEST = -1
+
+
+class BalanceCache:
+    """
+    Локальный кэш результатов запросов в SQLite с ключом (chain, address, query, height).
+    Запись буферизуется и сбрасывается на диск пачками; при превышении max_entries
+    вытесняются давно не использованные записи.
+    """
+
+    def __init__(self, path, ttl=3600, max_entries=1_000_000, flush_every=500):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS balances ("
+            " chain TEXT NOT NULL, address TEXT NOT NULL, query TEXT NOT NULL,"
+            " height INTEGER NOT NULL, value TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL,"
+            " PRIMARY KEY (chain, address, query, height))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS balances_accessed ON balances (accessed)")
+        self._conn.commit()
+
+    def get(self, chain, address, query, height=None):
+        """Возвращает закэшированное значение или None, учитывая счётчики попаданий/промахов."""
+        height = LATEST if height is None else int(height)
+        key = (chain, address, query, height)
+        now = time.time()
+        with self._lock:
+            if key in self._pending:
+                self.hits += 1
+                return self._pending[key]
+            row = self._conn.execute(
+                "SELECT value, created FROM balances"
+                " WHERE chain = ? AND address = ? AND query = ? AND height = ?", key
+            ).fetchone()
+            if row is None or (height == LATEST and row[1] + self.ttl < now):
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE balances SET accessed = ?"
+                " WHERE chain = ? AND address = ? AND query = ? AND height = ?", (now, *key)
+            )
+            self.hits += 1
+            return json.loads(row[0])
+
+    def get_many(self, chain, addresses, query, height=None):
+        """Возвращает {address: value} для найденных в кэше адресов."""
+        found = {}
+        for address in addresses:
+            value = self.get(chain, address, query, height)
+            if value is not None:
+                found[address] = value
+        return found
+
+    def put(self, chain, address, query, value, height=None):
+        height = LATEST if height is None else int(height)
+        with self._lock:
+            self._pending[(chain, address, query, height)] = value
+            if len(self._pending) >= self.flush_every:
+                self._flush_locked()
+
+    def put_many(self, chain, values, query, height=None):
+        for address, value in values.items():
+            self.put(chain, address, query, value, height)
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO balances VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(*key, json.dumps(value), now, now) for key, value in self._pending.items()]
+        )
+        self._pending.clear()
+        self._evict_locked()
+        self._conn.commit()
+
+    def _evict_locked(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM balances").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM balances WHERE rowid IN"
+                " (SELECT rowid FROM balances ORDER BY accessed LIMIT ?)", (excess,)
+            )
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+    def report(self):
+        return f"Кэш: попаданий {self.hits}, промахов {self.misses}"
+
+
+class WriteOnlyCache(BalanceCache):
+    """Кэш в режиме обхода: всегда промах при чтении, результаты обновляются."""
+
+    def get(self, chain, address, query, height=None):
+        with self._lock:
+            self.misses += 1
+        return None
+
+
+def open_cache(config, bypass=False):
+    """
+    Открывает кэш по настройкам секции [Cache]. Возвращает None, если кэш выключен.
+    При bypass=True кэш не читается, но свежие результаты в него записываются.
+    """
+    if not config.getboolean("Cache", "enabled", fallback=True):
+        return None
+    path = config.get("Cache", "path", fallback="balance_cache.sqlite3").strip()
+    if not os.path.isabs(path):
+        path = os.path.join(get_app_path(), path)
+    cache_cls = WriteOnlyCache if bypass else BalanceCache
+    return cache_cls(
+        path,
+        ttl=config.getint("Cache", "ttl", fallback=3600),
+        max_entries=config.getint("Cache", "max_entries", fallback=1_000_000),
+    )
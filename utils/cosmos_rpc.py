@@ -0,0 +1,303 @@
+"""
+Запросы Cosmos через CometBFT RPC: abci_query с protobuf-запросами, отправляемые JSON-RPC батчами.
+
+REST-шлюз не умеет батчить, поэтому каждый запрос баланса, делегаций или наград —
+отдельный HTTP-запрос. abci_query принимает тот же gRPC-запрос модуля (bank,
+staking, distribution) в protobuf, а CometBFT RPC принимает JSON-RPC батчи —
+сотни запросов по адресам уходят одним POST. Protobuf кодируется вручную: нужны
+несколько сообщений, и ради них не стоит тянуть сгенерированные классы Cosmos SDK.
+
+Ответы переводятся в ту же форму, что отдаёт REST (delegation_responses,
+unbonding_responses, rewards...), поэтому разбор сумм общий с REST-путём и
+значения совпадают.
+"""
+import base64
+import itertools
+
+from utils.cosmos_staking import BOND_DENOM, DEC_PRECISION, PAGE_LIMIT
+from utils.eth_batch import RpcError, rpc_call, run_batched_calls
+
+BALANCE_PATH = "/cosmos.bank.v1beta1.Query/Balance"
+DELEGATIONS_PATH = "/cosmos.staking.v1beta1.Query/DelegatorDelegations"
+UNBONDING_PATH = "/cosmos.staking.v1beta1.Query/DelegatorUnbondingDelegations"
+REWARDS_PATH = "/cosmos.distribution.v1beta1.Query/DelegationTotalRewards"
+VALIDATORS_PATH = "/cosmos.staking.v1beta1.Query/Validators"
+
+# --- protobuf ---
+
+VARINT = 0
+LENGTH_DELIMITED = 2
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if not value:
+            out.append(byte)
+            return bytes(out)
+        out.append(byte | 0x80)
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Обрезанный varint в ответе protobuf")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def field_bytes(number, value):
+    """Поле string/bytes/вложенное сообщение."""
+    if isinstance(value, str):
+        value = value.encode()
+    return _varint(number << 3 | LENGTH_DELIMITED) + _varint(len(value)) + value
+
+
+def field_varint(number, value):
+    """Поле uint64/bool; значение по умолчанию (0) в proto3 не кодируется."""
+    return _varint(number << 3 | VARINT) + _varint(int(value)) if value else b""
+
+
+def decode_fields(data):
+    """Сообщение protobuf -> {номер поля: [значения]} (int для varint, bytes для остальных)."""
+    fields = {}
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        number, wire = key >> 3, key & 7
+        if wire == VARINT:
+            value, pos = _read_varint(data, pos)
+        elif wire == LENGTH_DELIMITED:
+            length, pos = _read_varint(data, pos)
+            value = data[pos:pos + length]
+            if len(value) != length:
+                raise ValueError("Обрезанное поле в ответе protobuf")
+            pos += length
+        elif wire in (1, 5):
+            # fixed64 / fixed32 — в нужных сообщениях не встречаются, пропускаем
+            size = 8 if wire == 1 else 4
+            value = data[pos:pos + size]
+            pos += size
+        else:
+            raise ValueError(f"Неподдерживаемый тип поля protobuf: {wire}")
+        fields.setdefault(number, []).append(value)
+    return fields
+
+
+def _text(fields, number, default=""):
+    values = fields.get(number)
+    return values[-1].decode() if values else default
+
+
+def _messages(fields, number):
+    return [decode_fields(value) for value in fields.get(number, [])]
+
+
+# --- запросы ---
+
+def encode_page(key=None, offset=0, limit=0, count_total=False):
+    """cosmos.base.query.v1beta1.PageRequest."""
+    return ((field_bytes(1, key) if key else b"") + field_varint(2, offset) + field_varint(3, limit)
+            + field_varint(4, count_total))
+
+
+def encode_balance_request(address, page=None):
+    return field_bytes(1, address) + field_bytes(2, BOND_DENOM)
+
+
+def encode_delegator_request(address, page=None):
+    """QueryDelegatorDelegationsRequest и QueryDelegatorUnbondingDelegationsRequest: адрес и страница."""
+    return field_bytes(1, address) + (field_bytes(2, page) if page else b"")
+
+
+def encode_rewards_request(address, page=None):
+    return field_bytes(1, address)
+
+
+def encode_validators_request(address=None, page=None):
+    # Пустой статус — валидаторы всех статусов
+    return field_bytes(2, page) if page else b""
+
+
+# --- ответы в форме REST ---
+
+def format_dec(value):
+    """
+    sdk.Dec в protobuf передаётся целым числом, умноженным на 10^18, без точки;
+    в REST — строкой с 18 знаками после запятой. Переводим в форму REST для parse_dec.
+    """
+    unit = 10 ** DEC_PRECISION
+    return f"{value // unit}.{value % unit:0{DEC_PRECISION}d}"
+
+
+def _coin(fields):
+    return {"denom": _text(fields, 1), "amount": _text(fields, 2, "0")}
+
+
+def _dec_coin(fields):
+    return {"denom": _text(fields, 1), "amount": format_dec(int(_text(fields, 2, "0")))}
+
+
+def _pagination(fields):
+    page = _messages(fields, 2)
+    if not page:
+        return {"next_key": None, "total": "0"}
+    next_key = page[0].get(1, [b""])[-1]
+    return {"next_key": next_key or None, "total": str(page[0].get(2, [0])[-1])}
+
+
+def decode_balance(value):
+    fields = decode_fields(value)
+    return {"balances": [_coin(coin) for coin in _messages(fields, 1)]}
+
+
+def decode_delegations(value):
+    fields = decode_fields(value)
+    responses = []
+    for response in _messages(fields, 1):
+        delegation = (_messages(response, 1) or [{}])[0]
+        balance = (_messages(response, 2) or [{}])[0]
+        responses.append({
+            "delegation": {"delegator_address": _text(delegation, 1), "validator_address": _text(delegation, 2)},
+            "balance": _coin(balance),
+        })
+    return {"delegation_responses": responses, "pagination": _pagination(fields)}
+
+
+def decode_unbonding(value):
+    fields = decode_fields(value)
+    responses = [{
+        "delegator_address": _text(unbonding, 1),
+        "validator_address": _text(unbonding, 2),
+        "entries": [{"balance": _text(entry, 4, "0")} for entry in _messages(unbonding, 3)],
+    } for unbonding in _messages(fields, 1)]
+    return {"unbonding_responses": responses, "pagination": _pagination(fields)}
+
+
+def decode_rewards(value):
+    fields = decode_fields(value)
+    return {
+        "rewards": [{"validator_address": _text(reward, 1),
+                     "reward": [_dec_coin(coin) for coin in _messages(reward, 2)]}
+                    for reward in _messages(fields, 1)],
+        "total": [_dec_coin(coin) for coin in _messages(fields, 2)],
+    }
+
+
+def decode_validators(value):
+    fields = decode_fields(value)
+    validators = [{
+        "operator_address": _text(validator, 1),
+        "description": {"moniker": _text((_messages(validator, 7) or [{}])[0], 1)},
+    } for validator in _messages(fields, 1)]
+    return {"validators": validators, "pagination": _pagination(fields)}
+
+
+# Типы запросов по адресу (те же, что в atom_balance_check.COSMOS_QUERIES): путь gRPC-метода,
+# кодирование запроса, разбор ответа и ключ списка для постраничных запросов
+ABCI_QUERIES = {
+    "balance": (BALANCE_PATH, encode_balance_request, decode_balance, None),
+    "staked": (DELEGATIONS_PATH, encode_delegator_request, decode_delegations, "delegation_responses"),
+    "unbonding": (UNBONDING_PATH, encode_delegator_request, decode_unbonding, "unbonding_responses"),
+    "rewards": (REWARDS_PATH, encode_rewards_request, decode_rewards, None),
+    # Справочник валидаторов, не зависит от адреса
+    "validators": (VALIDATORS_PATH, encode_validators_request, decode_validators, "validators"),
+}
+
+
+def abci_params(path, data, height=None):
+    # height 0 — последний блок
+    return {"path": path, "data": data.hex(), "height": str(height or 0), "prove": False}
+
+
+def abci_value(result):
+    """Результат abci_query -> (байты ответа, высота блока). Ненулевой код ответа поднимается как RpcError."""
+    response = (result or {}).get("response") or {}
+    if response.get("code"):
+        raise RpcError({"code": response["code"], "message": response.get("log") or "abci_query"})
+    return base64.b64decode(response.get("value") or ""), int(response.get("height") or 0) or None
+
+
+def latest_height(session, rpc_url):
+    """Высота последнего блока по методу status CometBFT."""
+    return int(rpc_call(session, rpc_url, "status", {})["sync_info"]["latest_block_height"])
+
+
+def fetch_abci_queries(session, rpc_url, queries, height=None, batch_size=100, policy=None, page_limit=PAGE_LIMIT):
+    """
+    Выполняет запросы [(address, query), ...] батчами abci_query и возвращает
+    {(address, query): ответ в форме REST | список записей всех страниц | Exception}.
+
+    Постраничные запросы идут раундами: первые страницы всех адресов — в первом
+    раунде; если узел вернул total, остальные страницы запрашиваются следующим
+    раундом все сразу по смещению, иначе — по next_key, по раунду на страницу.
+    Продолжение читается на высоте первой страницы, чтобы смещения не съехали.
+    """
+    results = {}
+    items = {}
+    waiting = {}
+    pages = {}
+    numbers = itertools.count()
+
+    def call(address, query, page=None, kind="first", at=None):
+        path, encode, _, key = ABCI_QUERIES[query]
+        number = next(numbers)
+        pages[number] = (address, query, kind, at)
+        if key:
+            waiting[address, query] = waiting.get((address, query), 0) + 1
+        return number, "abci_query", abci_params(path, encode(address, page), at)
+
+    calls = [
+        call(address, query, encode_page(limit=page_limit, count_total=True) if ABCI_QUERIES[query][3] else None,
+             at=height)
+        for address, query in queries
+    ]
+    while calls:
+        raw = run_batched_calls(session, rpc_url, calls, batch_size, policy=policy)
+        calls = []
+        for number, result in raw.items():
+            address, query, kind, at = pages.pop(number)
+            target = (address, query)
+            if target in results:
+                # По запросу уже записана ошибка другой страницы
+                continue
+            _, _, decode, key = ABCI_QUERIES[query]
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                value, response_height = abci_value(result)
+                data = decode(value)
+            except Exception as e:
+                results[target] = e
+                items.pop(target, None)
+                waiting.pop(target, None)
+                continue
+            if not key:
+                results[target] = data
+                continue
+
+            page_items = data[key]
+            items.setdefault(target, []).extend(page_items)
+            waiting[target] -= 1
+            next_key = data["pagination"]["next_key"]
+            total = int(data["pagination"]["total"])
+            at = at or response_height
+            if kind == "first" and next_key and page_items and total > len(page_items):
+                size = len(page_items)
+                calls.extend(call(address, query, encode_page(offset=offset, limit=size), "offset", at)
+                             for offset in range(size, total, size))
+            elif kind != "offset" and next_key:
+                calls.append(call(address, query, encode_page(key=next_key, limit=page_limit), "key", at))
+            if not waiting[target]:
+                del waiting[target]
+                results[target] = items.pop(target)
+    for target in waiting:
+        results[target] = RpcError("Узел вернул не все страницы ответа")
+    return results
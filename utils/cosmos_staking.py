@@ -0,0 +1,123 @@
+"""
+Полные данные стейкинга Cosmos через REST: делегации, анбондинг и награды по валидаторам.
+
+Списочные запросы Cosmos SDK отдают по умолчанию одну страницу (100 записей),
+поэтому у адресов с большим числом делегаций первая страница занижает сумму.
+fetch_all_pages читает все страницы: если узел вернул pagination.total
+(count_total), остальные страницы запрашиваются параллельно по смещению на той же
+высоте блока, иначе — последовательно по pagination.next_key.
+"""
+import asyncio
+
+from utils.retry import HTTPStatusError, parse_retry_after
+
+# Записей на страницу списочного запроса
+PAGE_LIMIT = 100
+# Точность sdk.Dec: награды (DecCoin) хранятся целыми, умноженными на 10^18
+DEC_PRECISION = 18
+BOND_DENOM = "uatom"
+
+# Заголовок, которым REST-запросы Cosmos SDK читают состояние на заданной высоте
+HEIGHT_HEADER = "x-cosmos-block-height"
+# Высота, на которой узел выполнил запрос (метаданные gRPC-gateway в ответе)
+RESPONSE_HEIGHT_HEADER = "grpc-metadata-x-cosmos-block-height"
+
+
+def height_headers(height):
+    return {HEIGHT_HEADER: str(height)} if height is not None else None
+
+
+def parse_dec(amount):
+    """Строка sdk.Dec ("12.345000000000000000") -> целое, умноженное на 10^18."""
+    whole, _, fraction = amount.partition(".")
+    return int(whole or 0) * 10 ** DEC_PRECISION + int(fraction[:DEC_PRECISION].ljust(DEC_PRECISION, "0"))
+
+
+async def fetch_page(session, url, params=None, headers=None):
+    """Одна страница: (ответ, высота блока из заголовка ответа или None)."""
+    async with session.get(url, params=params, headers=headers) as r:
+        if r.status != 200:
+            raise HTTPStatusError(r.status, parse_retry_after(r.headers.get("Retry-After")))
+        return await r.json(content_type=None), r.headers.get(RESPONSE_HEIGHT_HEADER)
+
+
+async def fetch_all_pages(session, url, key, headers=None, retry=None, page_limit=PAGE_LIMIT):
+    """
+    Все записи списка data[key] со всех страниц. retry(func) — обёртка повторов
+    для каждой страницы (например, retry_async с лимитером); без неё запрос один.
+    """
+    def get(params, page_headers):
+        call = lambda: fetch_page(session, url, params, page_headers)
+        return retry(call) if retry else call()
+
+    first, height = await get({"pagination.limit": str(page_limit), "pagination.count_total": "true"}, headers)
+    items = list(first.get(key) or [])
+    pagination = first.get("pagination") or {}
+    next_key = pagination.get("next_key")
+    total = int(pagination.get("total") or 0)
+    if not next_key or not items:
+        return items
+
+    if total > len(items):
+        # Узел может урезать limit — шаг смещения берём по фактическому размеру первой страницы.
+        # Без закреплённой высоты остальные страницы читаем на высоте первой, чтобы смещения
+        # не съехали из-за новой делегации между запросами
+        size = len(items)
+        if headers is None and height:
+            headers = height_headers(height)
+        pages = await asyncio.gather(*(
+            get({"pagination.limit": str(size), "pagination.offset": str(offset)}, headers)
+            for offset in range(size, total, size)
+        ))
+        for data, _ in pages:
+            items.extend(data.get(key) or [])
+        return items
+
+    while next_key:
+        data, _ = await get({"pagination.limit": str(page_limit), "pagination.key": next_key}, headers)
+        items.extend(data.get(key) or [])
+        next_key = (data.get("pagination") or {}).get("next_key")
+    return items
+
+
+def parse_delegations(items):
+    """delegation_responses -> {валидатор: делегировано uatom}."""
+    staked = {}
+    for item in items:
+        balance = item.get("balance") or {}
+        if balance.get("denom", BOND_DENOM) != BOND_DENOM:
+            continue
+        validator = item["delegation"]["validator_address"]
+        staked[validator] = staked.get(validator, 0) + int(balance["amount"])
+    return staked
+
+
+def parse_unbonding(items):
+    """unbonding_responses -> {валидатор: сумма незавершённых выводов uatom по всем записям}."""
+    unbonding = {}
+    for item in items:
+        amount = sum(int(entry["balance"]) for entry in item.get("entries") or [])
+        validator = item["validator_address"]
+        unbonding[validator] = unbonding.get(validator, 0) + amount
+    return unbonding
+
+
+def parse_validator_rewards(data):
+    """Ответ .../delegators/{address}/rewards -> {валидатор: награды uatom * 10^18}."""
+    rewards = {}
+    for item in data.get("rewards") or []:
+        reward = next((r for r in item.get("reward") or [] if r["denom"] == BOND_DENOM), None)
+        rewards[item["validator_address"]] = parse_dec(reward["amount"]) if reward else 0
+    return rewards
+
+
+def parse_validators(items):
+    """validators -> {адрес оператора: моникер}."""
+    return {item["operator_address"]: (item.get("description") or {}).get("moniker", "") for item in items}
+
+
+async def load_validators(session, base_url, retry=None):
+    """Справочник валидаторов всех статусов; запрашивается один раз за запуск, а не на каждого делегатора."""
+    items = await fetch_all_pages(session, f"{base_url}/cosmos/staking/v1beta1/validators", "validators",
+                                  retry=retry)
+    return parse_validators(items)
@@ -0,0 +1,160 @@
+from eth_abi import decode
+
+from utils.eth_batch import RpcError, run_batched_calls
+from utils.multicall import _address_bytes, decode_uint, run_aggregate3
+
+BALANCE_OF_SELECTOR = bytes.fromhex("70a08231")  # balanceOf(address)
+DECIMALS_SELECTOR = bytes.fromhex("313ce567")  # decimals()
+SYMBOL_SELECTOR = bytes.fromhex("95d89b41")  # symbol()
+
+# Оценка газа на один balanceOf внутри aggregate3 (холодный аккаунт токена + SLOAD)
+GAS_PER_TOKEN_CALL = 12_000
+
+# decimals/symbol токена не меняются — держим их в памяти на весь сеанс приложения
+_metadata = {}  # (network, token) -> (symbol, decimals)
+
+
+class Token:
+    """ERC-20 токен сети и колонка итоговой таблицы, в которую пишется его баланс."""
+
+    def __init__(self, network, address, symbol, decimals, column):
+        self.network = network
+        self.address = address
+        self.symbol = symbol
+        self.decimals = decimals
+        self.column = column
+
+    @property
+    def query(self):
+        """Тип запроса в кэше результатов."""
+        return f"erc20:{self.address.lower()}"
+
+
+def load_token_lists(config):
+    """Читает секцию [Tokens]: для сети — адреса контрактов токенов через запятую."""
+    if config is None or not config.has_section("Tokens"):
+        return {}
+    tokens = {}
+    for network, value in config["Tokens"].items():
+        addresses = [item.strip() for item in value.split(",") if item.strip()]
+        if addresses:
+            tokens[network] = list(dict.fromkeys(addresses))
+    return tokens
+
+
+def balance_of_calldata(address):
+    return BALANCE_OF_SELECTOR + _address_bytes(address).rjust(32, b"\0")
+
+
+def _eth_call(target, calldata):
+    return {"to": target, "data": "0x" + calldata.hex()}
+
+
+def decode_symbol(data):
+    """symbol() возвращает string, у старых токенов (MKR, SAI) — bytes32."""
+    try:
+        (symbol,) = decode(["string"], data)
+        return symbol
+    except Exception:
+        return data[:32].rstrip(b"\0").decode("utf-8", "replace")
+
+
+def _cache_metadata(cache, network, token, symbol, decimals):
+    _metadata[(network, token)] = (symbol, decimals)
+    if cache:
+        # Высота 0 — неизменяемая запись без срока годности
+        cache.put(network, token, "erc20:symbol", symbol, 0)
+        cache.put(network, token, "erc20:decimals", decimals, 0)
+
+
+def _cached_metadata(cache, network, token):
+    if (network, token) in _metadata:
+        return _metadata[(network, token)]
+    if cache:
+        symbol = cache.get(network, token, "erc20:symbol", 0)
+        decimals = cache.get(network, token, "erc20:decimals", 0)
+        if symbol is not None and decimals is not None:
+            _metadata[(network, token)] = (symbol, decimals)
+            return symbol, decimals
+    return None
+
+
+def resolve_tokens(network, session, rpc_url, token_addresses, column_suffix, cache=None, policy=None):
+    """
+    Возвращает список Token сети: decimals() и symbol() читаются одним JSON-RPC
+    батчем только для токенов, которых ещё нет в кэше. Токен, метаданные которого
+    прочитать не удалось, пропускается с сообщением.
+    """
+    missing = [token for token in token_addresses if _cached_metadata(cache, network, token) is None]
+    if missing:
+        calls = []
+        for token in missing:
+            calls.append(((token, "decimals"), "eth_call", [_eth_call(token, DECIMALS_SELECTOR), "latest"]))
+            calls.append(((token, "symbol"), "eth_call", [_eth_call(token, SYMBOL_SELECTOR), "latest"]))
+        raw = run_batched_calls(session, rpc_url, calls, policy=policy)
+        for token in missing:
+            try:
+                # Пустой ответ "0x" — по адресу нет контракта
+                decimals = int(raw[(token, "decimals")], 16)
+                symbol = decode_symbol(bytes.fromhex(raw[(token, "symbol")][2:]))
+            except (KeyError, TypeError, ValueError):
+                print(f"[{network}] Не удалось прочитать decimals/symbol токена {token}, токен пропущен")
+                continue
+            _cache_metadata(cache, network, token, symbol, decimals)
+
+    tokens = []
+    columns = set()
+    for token in token_addresses:
+        metadata = _cached_metadata(cache, network, token)
+        if metadata is None:
+            continue
+        symbol, decimals = metadata
+        column = f"{symbol}_{column_suffix}"
+        if column in columns:
+            # Два токена с одинаковым символом различаем по началу адреса контракта
+            column = f"{symbol}_{token[2:8]}_{column_suffix}"
+        columns.add(column)
+        tokens.append(Token(network, token, symbol, decimals, column))
+    return tokens
+
+
+def get_token_balances_batch(session, rpc_url, pairs, batch_size=100, block="latest", on_chunk=None,
+                             policy=None):
+    """Возвращает {(address, token): сырое значение | Exception}, вызывая balanceOf JSON-RPC батчами."""
+    results = {}
+    calls = []
+    for address, token in pairs:
+        try:
+            calls.append(((address, token), "eth_call",
+                          [_eth_call(token, balance_of_calldata(address)), block]))
+        except ValueError as e:
+            results[(address, token)] = e
+    for key, value in run_batched_calls(session, rpc_url, calls, batch_size, on_chunk, policy=policy).items():
+        if isinstance(value, Exception):
+            results[key] = value
+        else:
+            try:
+                results[key] = int(value, 16)
+            except (TypeError, ValueError):
+                results[key] = RpcError(f"Некорректный ответ: {value!r}")
+    return results
+
+
+def get_token_balances_multicall(session, rpc_url, contract, pairs, chunk_size, block="latest",
+                                 on_chunk=None, policy=None):
+    """Возвращает {(address, token): сырое значение | Exception}, вызывая balanceOf через Multicall3."""
+    results = {}
+    calls = []
+    for address, token in pairs:
+        try:
+            calls.append(((address, token), token, balance_of_calldata(address)))
+        except ValueError as e:
+            results[(address, token)] = e
+    for key, returned in run_aggregate3(session, rpc_url, contract, calls, chunk_size, block, on_chunk,
+                                        policy, GAS_PER_TOKEN_CALL).items():
+        if isinstance(returned, Exception):
+            results[key] = returned
+        else:
+            value = decode_uint(*returned)
+            results[key] = value if value is not None else RpcError("balanceOf завершился ошибкой")
+    return results
@@ -1,84 +1,674 @@
-import pandas as pd
 import asyncio
-from web3 import Web3
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
 import configparser
 from utils.get_config_path import config_path
+from utils import metrics, transport
+from utils.balance_cache import open_cache
+from utils.journal import open_journal, scale_progress
+from utils.writers import output_path, open_writer
+from utils.result_store import ResultStore, format_amount, format_row
+from utils.eth_batch import get_balances_batch, rpc_call
+from utils.scheduler import Scheduler, load_rate_limits
+from utils.rpc_pool import get_pool, load_pool_settings
+from utils.retry import load_retry_policy, retry_async, retry_blocking
+from utils.failure_report import FailureReport, failure_report_path
+from utils.sharding import run_shards, shard_config, split_shards
+from utils.erc20 import (
+    GAS_PER_TOKEN_CALL, load_token_lists, resolve_tokens, get_token_balances_batch, get_token_balances_multicall
+)
+from utils.multicall import (
+    DEFAULT_GAS_CAP, multicall_address, has_multicall, chunk_size_for_network, get_balances_multicall
+)
 
-async def get_eth_balance_async(loop, web3, address):
-    try:
-        if web3:
-            balance_wei = await loop.run_in_executor(None, web3.eth.get_balance, address)
-            balance_eth = round(web3.from_wei(balance_wei, 'ether'), 5)
-            return balance_eth
+# Как часто запуск проверяет флаг остановки и предел длительности, секунд
+STOP_POLL_INTERVAL = 0.2
+
+# Сети в порядке колонок итоговой таблицы
+NETWORK_COLUMNS = {
+    'ethereum': 'ETH',
+    'arbitrum': 'ETH_arb',
+    'optimism': 'ETH_op',
+    'linea': 'ETH_linea',
+    'zksync': 'ETH_zksync',
+    'scroll': 'ETH_scroll',
+    'base': 'ETH_base',
+    'arbitrum_nova': 'ETH_arb_nova',
+}
+
+def block_tag(block):
+    """Параметр блока для JSON-RPC: закреплённая высота в hex или "latest"."""
+    return 'latest' if block is None else hex(block)
+
+def resolve_snapshot_blocks(connections, confirmations=0, policy=None):
+    """
+    Закрепляет для каждой включённой сети один номер блока (голова цепи минус
+    confirmations), на котором читаются все балансы запуска.
+    """
+    blocks = {}
+    for network, pool in connections.items():
+        if not pool:
+            continue
+        head = retry_blocking(lambda: pool.call(
+            lambda url: int(rpc_call(transport.get_session(url), url, 'eth_blockNumber', []), 16)
+        ), policy)
+        blocks[network] = max(0, head - confirmations)
+    return blocks
+
+# Балансы передаются целыми wei и переводятся в ETH с BALANCE_PLACES знаками при записи
+ETH_DECIMALS = 18
+BALANCE_PLACES = 5
+
+def format_balance(balance_wei):
+    # Неполученный баланс оставляем пустой ячейкой, причина уходит в отчёт об ошибках
+    if balance_wei is None or isinstance(balance_wei, Exception):
+        return None
+    return format_amount(balance_wei, ETH_DECIMALS, BALANCE_PLACES)
+
+def amount_columns(tokens):
+    """Колонки итоговой таблицы с суммами и число знаков их базовой единицы."""
+    amounts = dict.fromkeys(NETWORK_COLUMNS.values(), ETH_DECIMALS)
+    amounts.update({token.column: token.decimals for network_tokens in tokens.values() for token in network_tokens})
+    return amounts
+
+async def request_balance(loop, pool, address, scheduler=None, network=None, policy=None, block=None):
+    """
+    eth_getBalance через пул эндпоинтов сети с учётом лимитов планировщика и повторами.
+    block — закреплённая высота снимка, None — "latest".
+    """
+    if scheduler:
+        run = functools.partial(scheduler.run, network)
+    else:
+        run = functools.partial(loop.run_in_executor, None)
+    block_identifier = 'latest' if block is None else block
+    return await retry_async(lambda: pool.call_async(
+        lambda url: transport.get_web3(network, url).eth.get_balance(address, block_identifier), run
+    ), policy, on_retry=metrics.retry_callback(network, 'eth_getBalance'))
+
+async def get_eth_balance_async(loop, pool, address, scheduler=None, network=None, cache=None,
+                                policy=None, failures=None, block=None):
+    if not pool:
         return '-'
+    try:
+        # Значения на закреплённой высоте неизменяемы и хранятся в кэше без срока годности
+        balance_wei = cache.get(network, address, 'native', block) if cache else None
+        if balance_wei is None:
+            balance_wei = await request_balance(loop, pool, address, scheduler, network, policy, block)
+            if cache:
+                cache.put(network, address, 'native', balance_wei, block)
     except Exception as e:
-        return f"Ошибка при получении баланса: {e}"
-
-async def process_address(address, loop, connections):
-    tasks = [
-        get_eth_balance_async(loop, connections['ethereum'], address),
-        get_eth_balance_async(loop, connections['arbitrum'], address),
-        get_eth_balance_async(loop, connections['optimism'], address),
-        get_eth_balance_async(loop, connections['linea'], address),
-        get_eth_balance_async(loop, connections['zksync'], address),
-        get_eth_balance_async(loop, connections['scroll'], address),
-        get_eth_balance_async(loop, connections['base'], address),
-        get_eth_balance_async(loop, connections['arbitrum_nova'], address),
-    ]
+        if failures:
+            failures.add(address, network, 'native', e)
+        return None
+    return balance_wei
+
+async def process_address(address, loop, connections, scheduler=None, cache=None, policy=None,
+                          failures=None, blocks=None):
+    blocks = blocks or {}
+    tasks = [get_eth_balance_async(loop, connections[network], address, scheduler, network, cache,
+                                   policy, failures, blocks.get(network))
+             for network in NETWORK_COLUMNS]
     try:
         results = await asyncio.gather(*tasks)
-        return {'Address': address, 'ETH': results[0], 'ETH_arb': results[1],
-                'ETH_op': results[2], 'ETH_linea': results[3],
-                'ETH_zksync': results[4], 'ETH_scroll': results[5],
-                'ETH_base': results[6], 'ETH_arb_nova': results[7]}
+        row = {'Address': address}
+        row.update(zip(NETWORK_COLUMNS.values(), results))
+        return row
     except Exception as e:
         return {'Address': address, 'error': f"Ошибка при обработке адреса: {e}"}
 
-async def async_main(addresses, connections, excel_filename, progress_callback=None):
-    results = []
+async def process_addresses_scheduled(addresses, connections, scheduler, progress_callback=None,
+                                      cache=None, on_result=None, policy=None, failures=None,
+                                      blocks=None):
+    """
+    Обрабатывает адреса параллельно: одновременно в работе не больше
+    scheduler.max_concurrency адресов, а запросы к сетям дополнительно ограничены
+    лимитами планировщика. Результаты возвращаются в порядке завершения;
+    если задан on_result, каждая готовая строка сразу передаётся в него.
+    """
     loop = asyncio.get_event_loop()
+    results = []
     total = len(addresses)
-    for i, address in enumerate(addresses):
-        res = await process_address(address, loop, connections)
-        results.append(res)
-        if progress_callback:
-            progress_callback(int((i + 1) / total * 100))
-    df = pd.DataFrame(results)
-    df.to_excel(excel_filename, index=False)
-    print(f"Балансы сохранены в файл {excel_filename}")
-
-def run_balance_check(addresses, progress_callback=None):
-    # Считываем актуальную конфигурацию при запуске проверки
+    done = 0
+    pending = iter(addresses)
+
+    async def worker():
+        nonlocal done
+        # Общий итератор: каждый воркер берёт следующий ещё не обработанный адрес
+        for address in pending:
+            row = await process_address(address, loop, connections, scheduler, cache, policy, failures,
+                                        blocks)
+            # Если строки забирает on_result, в памяти их не копим
+            if on_result:
+                on_result(row)
+            else:
+                results.append(row)
+            done += 1
+            if progress_callback:
+                progress_callback(int(done / total * 100))
+
+    await asyncio.gather(*(worker() for _ in range(min(scheduler.max_concurrency, total))))
+    return results
+
+async def get_balance_wei_async(loop, pool, address, scheduler, network, policy=None, block=None):
+    try:
+        return await request_balance(loop, pool, address, scheduler, network, policy, block)
+    except Exception as e:
+        return e
+
+async def fetch_balances_bulk(addresses, connections, fetch_network, settings, progress_callback=None):
+    """
+    Общая обвязка для пакетных режимов: запрашивает балансы параллельно по сетям
+    через fetch_network(...) -> {address: wei | Exception} и собирает строки
+    с теми же колонками, что и process_address.
+    """
+    loop = asyncio.get_event_loop()
+    active = {network: pool for network, pool in connections.items() if pool}
+    total = len(set(addresses)) * len(active)
+    done = 0
+
+    def report(count):
+        nonlocal done
+        done += count
+        if progress_callback and total:
+            progress_callback(int(done / total * 100))
+
+    def on_chunk(count):
+        # Может вызываться из потока executor'а, поэтому прогресс передаём в цикл событий
+        loop.call_soon_threadsafe(report, count)
+
+    cache = settings.get('cache')
+    blocks = settings.get('blocks') or {}
+
+    async def fetch_cached(network, pool):
+        # Из сети запрашиваем только адреса, которых нет в кэше
+        unique = list(dict.fromkeys(addresses))
+        cached = cache.get_many(network, unique, 'native', blocks.get(network)) if cache else {}
+        if cached:
+            report(len(cached))
+        missing = [address for address in unique if address not in cached]
+        fetched = await fetch_network(loop, network, pool, missing, settings, on_chunk) if missing else {}
+        if cache:
+            cache.put_many(network, {a: v for a, v in fetched.items() if not isinstance(v, Exception)},
+                           'native', blocks.get(network))
+        return {**cached, **fetched}
+
+    fetched = await asyncio.gather(*(fetch_cached(network, pool) for network, pool in active.items()))
+    balances = dict(zip(active, fetched))
+
+    failures = settings.get('failures')
+    results = []
+    for address in addresses:
+        row = {'Address': address}
+        for network, column in NETWORK_COLUMNS.items():
+            if network in balances:
+                balance = balances[network][address]
+                if isinstance(balance, Exception) and failures:
+                    failures.add(address, network, 'native', balance)
+                row[column] = None if isinstance(balance, Exception) else balance
+            else:
+                row[column] = '-'
+        results.append(row)
+    return results
+
+def pooled_session(network, pool, settings):
+    """Сессия для пакетных запросов: эндпоинт выбирает пул, частоту ограничивает планировщик."""
+    return settings['scheduler'].throttle(network, pool.session(transport.get_session))
+
+async def fetch_network_batch(loop, network, pool, addresses, settings, on_chunk):
+    # Адрес запроса подставляет пул, поэтому rpc_url здесь только для совместимости с интерфейсом
+    rpc_url = pool.urls[0]
+    session = pooled_session(network, pool, settings)
+    return await loop.run_in_executor(
+        None, get_balances_batch, session, rpc_url, addresses, settings['batch_size'],
+        block_tag(settings['blocks'].get(network)), on_chunk, settings['retry_policy']
+    )
+
+async def fetch_network_multicall(loop, network, pool, addresses, settings, on_chunk):
+    rpc_url = pool.urls[0]
+    scheduler = settings['scheduler']
+    session = pooled_session(network, pool, settings)
+    contract = multicall_address(network, settings['multicall_addresses'])
+    policy = settings['retry_policy']
+    block = settings['blocks'].get(network)
+    try:
+        available = await loop.run_in_executor(
+            None, retry_blocking, lambda: has_multicall(session, rpc_url, contract), policy
+        )
+    except Exception as e:
+        print(f"[{network}] Не удалось проверить Multicall3: {e}")
+        available = False
+    if available:
+        chunk_size = await loop.run_in_executor(
+            None, retry_blocking, lambda: chunk_size_for_network(
+                session, rpc_url, settings['multicall_gas_cap'], settings['multicall_max_chunk']
+            ), policy
+        )
+        return await loop.run_in_executor(
+            None, get_balances_multicall, session, rpc_url, contract,
+            addresses, chunk_size, block_tag(block), on_chunk, policy
+        )
+
+    # Multicall3 не развёрнут — откатываемся на eth_getBalance по каждому адресу
+    print(f"[{network}] Multicall3 недоступен, используется eth_getBalance по каждому адресу")
+    unique = list(dict.fromkeys(addresses))
+
+    async def fetch_one(address):
+        balance = await get_balance_wei_async(loop, pool, address, scheduler, network, policy, block)
+        on_chunk(1)
+        return balance
+
+    return dict(zip(unique, await asyncio.gather(*(fetch_one(a) for a in unique))))
+
+# Пакетные режимы запросов: сеть -> {address: wei | Exception}
+BULK_FETCHERS = {
+    'batch': fetch_network_batch,
+    'multicall': fetch_network_multicall,
+}
+
+async def fetch_token_network(loop, network, pool, pairs, settings):
+    """
+    balanceOf для пар (address, token) одной сети: через Multicall3 в режиме
+    multicall (если контракт развёрнут), иначе JSON-RPC батчами eth_call.
+    """
+    rpc_url = pool.urls[0]
+    session = pooled_session(network, pool, settings)
+    block = block_tag(settings['blocks'].get(network))
+    policy = settings['retry_policy']
+    if settings['engine'] == 'multicall':
+        contract = multicall_address(network, settings['multicall_addresses'])
+        try:
+            available = await loop.run_in_executor(
+                None, retry_blocking, lambda: has_multicall(session, rpc_url, contract), policy
+            )
+        except Exception as e:
+            print(f"[{network}] Не удалось проверить Multicall3: {e}")
+            available = False
+        if available:
+            chunk_size = max(1, min(settings['multicall_max_chunk'],
+                                    settings['multicall_gas_cap'] // GAS_PER_TOKEN_CALL))
+            return await loop.run_in_executor(
+                None, get_token_balances_multicall, session, rpc_url, contract, pairs, chunk_size, block,
+                None, policy
+            )
+    return await loop.run_in_executor(
+        None, get_token_balances_batch, session, rpc_url, pairs, settings['batch_size'], block, None, policy
+    )
+
+async def add_token_balances(rows, connections, settings):
+    """
+    Токенная стадия: дописывает в строки балансы ERC-20 из settings['tokens']
+    ({network: [Token]}). Пары (адрес, токен), которых нет в кэше, запрашиваются
+    пакетно, сети обрабатываются параллельно.
+    """
+    loop = asyncio.get_event_loop()
+    cache = settings.get('cache')
+    failures = settings.get('failures')
+    blocks = settings.get('blocks') or {}
+    addresses = list(dict.fromkeys(row['Address'] for row in rows))
+
+    async def scan(network, tokens):
+        height = blocks.get(network)
+        values = {}
+        missing = []
+        for token in tokens:
+            cached = cache.get_many(network, addresses, token.query, height) if cache else {}
+            values.update({(address, token.address): value for address, value in cached.items()})
+            missing.extend((address, token.address) for address in addresses if address not in cached)
+        if missing:
+            fetched = await fetch_token_network(loop, network, connections[network], missing, settings)
+            values.update(fetched)
+            if cache:
+                queries = {token.address: token.query for token in tokens}
+                for (address, token), value in fetched.items():
+                    if not isinstance(value, Exception):
+                        cache.put(network, address, queries[token], value, height)
+        return values
+
+    token_lists = settings['tokens']
+    scanned = await asyncio.gather(*(scan(network, tokens) for network, tokens in token_lists.items()))
+    for (network, tokens), values in zip(token_lists.items(), scanned):
+        for row in rows:
+            for token in tokens:
+                value = values.get((row['Address'], token.address))
+                if value is None or isinstance(value, Exception):
+                    if failures and value is not None:
+                        failures.add(row['Address'], network, token.query, value)
+                    row[token.column] = None
+                else:
+                    row[token.column] = value
+
+def start_results(addresses, writer, settings):
+    """
+    Подготовка записи результатов: адреса, уже записанные в журнал прерванного запуска,
+    повторно не запрашиваются. Возвращает (адреса к запросу, число пропущенных, on_result).
+    """
+    journal = settings.get('journal')
+    todo = [address for address in addresses if not journal.is_done(address)] if journal else addresses
+    skipped = len(addresses) - len(todo)
+
+    # В режиме снимка в каждой строке указывается высота, на которой прочитаны балансы
+    block_columns = {f"{NETWORK_COLUMNS[network]}_block": block for network, block in settings['blocks'].items()}
+    on_row = settings.get('on_row')
+    # В строках суммы в wei; для показа они переводятся в ETH по одной строке
+    amounts = amount_columns(settings.get('tokens') or {})
+    if on_row and journal and skipped:
+        # Строки, готовые в прерванном запуске, показываем сразу
+        for row in journal.rows():
+            if journal.is_done(row['Address']):
+                on_row(format_row(row, None, amounts, BALANCE_PLACES))
+
+    def on_result(row):
+        row.update(block_columns)
+        # С журналом строки пишутся в него, итоговый файл собирается в конце; без журнала — сразу в файл
+        if journal:
+            journal.append(row['Address'], row, complete=not row_has_errors(row))
+        else:
+            writer.write(row)
+        if on_row:
+            on_row(format_row(row, None, amounts, BALANCE_PLACES))
+
+    return todo, skipped, on_result
+
+def finish_results(writer, journal, interrupted=False):
+    # Итоговый отчёт собираем из журнала: в нём есть и строки предыдущих попыток
+    if journal:
+        writer.write_many(journal.rows())
+    writer.close()
+    # Журнал прерванного запуска оставляем: повторный запуск продолжит с необработанных адресов
+    if journal and not interrupted:
+        journal.discard()
+    if interrupted:
+        print("Проверка остановлена: в файл записаны только готовые строки")
+    print(f"Балансы сохранены в файл {writer.path}")
+    totals = ", ".join(f"{column} {total}" for column, total in writer.format_totals().items() if total)
+    if totals:
+        print(f"Итого: {totals}")
+
+async def fetch_addresses(addresses, connections, on_result, progress_callback=None, settings=None):
+    """Запрашивает балансы адресов; готовые строки передаются в on_result по мере готовности."""
+    settings = dict(settings or load_performance_settings(None))
+    settings.setdefault('blocks', {})
+    scheduler = Scheduler(settings['max_concurrency'], settings['network_concurrency'],
+                          settings['rate_limits'])
+    settings['scheduler'] = scheduler
+    # Пул потоков под блокирующие вызовы web3/requests должен вмещать все разрешённые запросы
+    executor = ThreadPoolExecutor(max_workers=scheduler.max_concurrency)
+    asyncio.get_event_loop().set_default_executor(executor)
+    try:
+        await _fetch_addresses(addresses, connections, on_result, progress_callback, settings, scheduler)
+    except asyncio.CancelledError:
+        # Остановка: пакетные циклы в потоках завершаются на следующем POST (RunCancelled),
+        # ещё не начатые задачи executor'а снимаются, keep-alive соединения сетей закрываются.
+        # Уже отправленный запрос завершается в пределах [Transport] request_timeout
+        scheduler.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+        transport.close_sessions(url for pool in connections.values() if pool for url in pool.urls)
+        raise
+
+async def _fetch_addresses(addresses, connections, on_result, progress_callback, settings, scheduler):
+    fetcher = BULK_FETCHERS.get(settings['engine'])
+    if fetcher or settings.get('tokens'):
+        # Пакетные режимы и токенная стадия работают сегментами, чтобы готовые строки
+        # попадали в журнал по ходу запуска
+        segment_size = max(1, settings['segment_size'])
+        for start in range(0, len(addresses), segment_size):
+            segment = addresses[start:start + segment_size]
+            progress = scale_progress(progress_callback, start, len(segment), len(addresses))
+            if fetcher:
+                rows = await fetch_balances_bulk(segment, connections, fetcher, settings, progress)
+            else:
+                rows = await process_addresses_scheduled(
+                    segment, connections, scheduler, progress, settings.get('cache'), None,
+                    settings['retry_policy'], settings.get('failures'), settings['blocks']
+                )
+            if settings.get('tokens'):
+                await add_token_balances(rows, connections, settings)
+            for row in rows:
+                on_result(row)
+    else:
+        await process_addresses_scheduled(
+            addresses, connections, scheduler, progress_callback,
+            settings.get('cache'), on_result, settings['retry_policy'], settings.get('failures'),
+            settings['blocks']
+        )
+
+async def run_until_interrupted(coro, is_interrupted=None, poll_interval=STOP_POLL_INTERVAL):
+    """
+    Выполняет coro, раз в poll_interval проверяя is_interrupted(); при остановке задача
+    отменяется (CancelledError доходит до всех запросов в полёте). True — выполнено полностью.
+    """
+    task = asyncio.ensure_future(coro)
+    if is_interrupted is None:
+        await task
+        return True
+    while not task.done():
+        await asyncio.wait({task}, timeout=poll_interval)
+        if not task.done() and is_interrupted():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            return False
+    task.result()
+    return True
+
+async def async_main(addresses, connections, writer, progress_callback=None, settings=None, is_interrupted=None):
+    settings = dict(settings or load_performance_settings(None))
+    settings.setdefault('blocks', {})
+    todo, skipped, on_result = start_results(addresses, writer, settings)
+    completed = await run_until_interrupted(
+        fetch_addresses(todo, connections, on_result,
+                        scale_progress(progress_callback, skipped, len(todo), len(addresses)), settings),
+        is_interrupted
+    )
+    if progress_callback and not todo:
+        progress_callback(100)
+    finish_results(writer, settings.get('journal'), interrupted=not completed)
+
+def run_sharded(addresses, writer, progress_callback, settings, config, bypass_cache=False, is_interrupted=None):
+    """
+    Запуск в нескольких процессах (см. utils.sharding): каждый шард запрашивает свою
+    часть адресов, строки пишет только этот процесс — в журнал или итоговый файл.
+    """
+    todo, skipped, on_result = start_results(addresses, writer, settings)
+    parts = split_shards(todo, settings['shards'])
+    base_config = shard_config(config, len(parts))
+    payloads = [{
+        'addresses': part,
+        'config': base_config,
+        'blocks': settings['blocks'],
+        'tokens': settings['tokens'],
+        'bypass_cache': bypass_cache,
+    } for part in parts]
+
+    def on_rows(rows):
+        for row in rows:
+            on_result(row)
+
+    run_shards(eth_shard_main, payloads, on_rows, settings['failures'].add_formatted,
+               scale_progress(progress_callback, skipped, len(todo), len(addresses)), is_interrupted)
+    if progress_callback and not todo:
+        progress_callback(100)
+    finish_results(writer, settings.get('journal'), interrupted=bool(is_interrupted and is_interrupted()))
+
+def eth_shard_main(payload, shard):
+    """Процесс-шард: свои соединения, цикл событий и доля лимитов из payload['config']."""
     config = configparser.ConfigParser()
-    config.read(config_path)
-    
+    config.read_dict(payload['config'])
+    connections = open_connections(config)
+    settings = load_performance_settings(config)
+    settings['blocks'] = payload['blocks']
+    settings['tokens'] = payload['tokens']
+    settings['failures'] = shard
+    cache = open_cache(config, bypass=payload['bypass_cache'])
+    settings['cache'] = cache
+    try:
+        asyncio.run(run_until_interrupted(
+            fetch_addresses(payload['addresses'], connections, shard.row, shard.progress, settings),
+            shard.is_interrupted
+        ))
+    finally:
+        if cache:
+            cache.close()
+
+def row_has_errors(row):
+    # Пустая ячейка включённой сети — баланс не получен даже после повторов
+    return 'error' in row or any(value is None for value in row.values())
+
+def load_performance_settings(config):
+    """Читает секцию [Performance]; при её отсутствии возвращает значения по умолчанию."""
+    section = config['Performance'] if config is not None and config.has_section('Performance') else {}
+    return {
+        # single — eth_getBalance на каждый адрес, batch — JSON-RPC батчи, multicall — Multicall3
+        'engine': section.get('engine', 'single').strip().lower(),
+        'batch_size': int(section.get('batch_size', 100)),
+        'multicall_max_chunk': int(section.get('multicall_max_chunk', 2000)),
+        'multicall_gas_cap': int(section.get('multicall_gas_cap', DEFAULT_GAS_CAP)),
+        # Общий лимит одновременных запросов и лимит на одну сеть
+        'max_concurrency': int(section.get('max_concurrency', 32)),
+        'network_concurrency': int(section.get('network_concurrency', 8)),
+        # Сколько адресов пакетные режимы обрабатывают за один сегмент между записями в журнал
+        'segment_size': int(section.get('segment_size', 5000)),
+        # Число процессов-шардов для больших списков адресов (см. utils.sharding)
+        'shards': max(1, int(section.get('shards', 1))),
+        'rate_limits': load_rate_limits(config),
+        # Необязательные адреса Multicall3 по сетям, если контракт развёрнут не по стандартному адресу
+        'multicall_addresses': dict(config['Multicall']) if config is not None and config.has_section('Multicall') else {},
+        'retry_policy': load_retry_policy(config),
+        # Предел длительности запуска в секундах: по его истечении запуск останавливается
+        # как по кнопке "Прервать", готовые строки сохраняются. 0 — без предела
+        'run_deadline': float(section.get('run_deadline', 0)),
+    }
+
+def open_connections(config):
+    """
+    Возвращает {network: EndpointPool | None} для сетей из NETWORK_COLUMNS;
+    None — сеть выключена в секции [Networks].
+    """
     # Получаем настройки включённых сетей
     network_to_process = {key: config.getboolean('Networks', key) for key in config['Networks']}
     if not any(network_to_process.values()):
         raise ValueError("Не выбрана ни одна сеть в конфигурационном файле. Выберите хотя бы одну сеть.")
     
-    def connect_to_network(network_name, provider_url):
+    # Провайдеры и пулы соединений берём из общего транспорта: они переживают запуск
+    transport.configure(config)
+    pool_settings = load_pool_settings(config)
+
+    def connect_to_network(network_name, provider_urls):
+        # В [RPCs] для сети может быть задан список эндпоинтов с весами
         if network_to_process.get(network_name):
-            return Web3(Web3.HTTPProvider(provider_url))
+            return get_pool(network_name, provider_urls, pool_settings)
         return None
 
     # Создаём подключения к сетям, используя актуальные настройки
     connections = {}
-    connections['ethereum'] = connect_to_network('ethereum', config.get('RPCs', 'ethereum'))
-    connections['arbitrum'] = connect_to_network('arbitrum', config.get('RPCs', 'arbitrum'))
-    connections['optimism'] = connect_to_network('optimism', config.get('RPCs', 'optimism'))
-    connections['linea'] = connect_to_network('linea', config.get('RPCs', 'linea'))
-    connections['zksync'] = connect_to_network('zksync', config.get('RPCs', 'zksync'))
-    connections['scroll'] = connect_to_network('scroll', config.get('RPCs', 'scroll'))
-    connections['base'] = connect_to_network('base', config.get('RPCs', 'base'))
-    connections['arbitrum_nova'] = connect_to_network('arbitrum_nova', config.get('RPCs', 'arbitrum_nova'))
-
-    output_dir = config.get("Output", "output_dir", fallback="").strip()
-    if output_dir:
-        # Если указан, добавляем "/" или используем os.path.join для формирования пути
-        import os
-        excel_filename = os.path.join(output_dir, "ethereum_balances.xlsx")
-    else:
-        excel_filename = "ethereum_balances.xlsx"
+    for network in NETWORK_COLUMNS:
+        connections[network] = connect_to_network(network, config.get('RPCs', network))
+    return connections
+
+def load_tokens(config, connections, cache=None, policy=None):
+    """
+    Токены из секции [Tokens] для включённых сетей: {network: [Token]} с прочитанными
+    (или взятыми из кэша) decimals и symbol.
+    """
+    tokens = {}
+    for network, token_addresses in load_token_lists(config).items():
+        pool = connections.get(network)
+        if not pool:
+            continue
+        tokens[network] = resolve_tokens(network, pool.session(transport.get_session), pool.urls[0],
+                                         token_addresses, NETWORK_COLUMNS[network], cache, policy)
+    return tokens
 
-    asyncio.run(async_main(addresses, connections, excel_filename, progress_callback))
+def run_balance_check(addresses, progress_callback=None, bypass_cache=False, config=None, on_row=None,
+                      is_interrupted=None):
+    """
+    Полный запуск проверки ETH: журнал, кэш, запросы и запись итогового файла.
+    on_row(row) получает каждую готовую строку (словарь колонка -> значение) с суммами в ETH.
+    Если is_interrupted() вернул True или истёк [Performance] run_deadline, запросы
+    в полёте отменяются, готовые строки записываются в итоговый файл, а журнал
+    остаётся для продолжения. Возвращает путь к итоговому файлу.
+    """
+    # Считываем актуальную конфигурацию при запуске проверки (если её не передали явно, как делает CLI)
+    if config is None:
+        config = configparser.ConfigParser()
+        config.read(config_path)
+
+    connections = open_connections(config)
+    settings = load_performance_settings(config)
+    deadline = time.monotonic() + settings['run_deadline'] if settings['run_deadline'] > 0 else None
+    expired = False
+
+    def stop_requested():
+        nonlocal expired
+        if is_interrupted and is_interrupted():
+            return True
+        if deadline is not None and time.monotonic() >= deadline:
+            if not expired:
+                expired = True
+                print(f"Истёк предел длительности запуска ({settings['run_deadline']:g} с)")
+            return True
+        return False
+
+    # Метрики запросов считаются с начала запуска по включённым сетям
+    save_metrics = metrics.configure(config)
+    metrics.begin_run('eth', [network for network, pool in connections.items() if pool])
+    # Режим снимка: все балансы читаются на одной высоте блока в каждой сети
+    snapshot = config.getboolean('Snapshot', 'enabled', fallback=False)
+    blocks = {}
+    if snapshot:
+        blocks = resolve_snapshot_blocks(connections, config.getint('Snapshot', 'confirmations', fallback=0),
+                                         settings['retry_policy'])
+
+    cache = open_cache(config, bypass=bypass_cache)
+    settings['cache'] = cache
+    try:
+        settings['tokens'] = load_tokens(config, connections, cache, settings['retry_policy'])
+    except Exception:
+        if cache:
+            cache.close()
+        raise
+
+    output_filename = output_path(config, "ethereum_balances")
+
+    enabled_networks = sorted(network for network, pool in connections.items() if pool)
+    token_context = [f"{token.network}:{token.address}" for tokens in settings['tokens'].values() for token in tokens]
+    journal = open_journal(config, output_filename, addresses, 'eth', *enabled_networks, *token_context,
+                           *(['snapshot'] if snapshot else []), meta={'blocks': blocks})
+    if journal and journal.meta.get('blocks'):
+        # Продолжение прерванного снимка читает балансы на тех же блоках
+        blocks = {network: int(block) for network, block in journal.meta['blocks'].items()}
+    for network, block in blocks.items():
+        print(f"[{network}] Снимок на блоке {block}")
+    settings['journal'] = journal
+    settings['blocks'] = blocks
+    settings['on_row'] = on_row
+    failures = FailureReport(failure_report_path(output_filename))
+    settings['failures'] = failures
+    block_columns = [f"{NETWORK_COLUMNS[network]}_block" for network in NETWORK_COLUMNS if network in blocks]
+    token_columns = [token.column for tokens in settings['tokens'].values() for token in tokens]
+    amounts = amount_columns(settings['tokens'])
+    writer = ResultStore(open_writer(config, output_filename,
+                                     ['Address', *NETWORK_COLUMNS.values(), *token_columns, *block_columns],
+                                     dict.fromkeys(amounts, BALANCE_PLACES)),
+                         amounts, BALANCE_PLACES)
+
+    try:
+        if len(split_shards(addresses, settings['shards'])) > 1:
+            run_sharded(addresses, writer, progress_callback, settings, config, bypass_cache, stop_requested)
+        else:
+            asyncio.run(async_main(addresses, connections, writer, progress_callback, settings, stop_requested))
+    finally:
+        writer.close()
+        failures.close()
+        if journal:
+            journal.close()
+        if cache:
+            cache.close()
+            print(cache.report())
+        metrics.end_run('eth')
+        if save_metrics:
+            metrics.write_summary(metrics.summary_path(output_filename), 'eth')
+    return output_filename
@@ -0,0 +1,174 @@
+import time
+
+import requests
+
+from utils import metrics
+from utils.retry import DEFAULT_POLICY, is_retryable, parse_retry_after, retry_blocking
+
+# Коды ошибок, которыми провайдеры сообщают о слишком большом батче
+BATCH_LIMIT_ERROR_CODES = (-32600, -32005)
+
+
+class BatchRejected(Exception):
+    """Провайдер отклонил батч целиком (HTTP-ошибка, одиночный объект ошибки и т.п.)."""
+
+    def __init__(self, message, status=None, retry_after=None, code=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.code = code
+
+
+class RpcError(Exception):
+    """Ошибка, возвращённая узлом для конкретного вызова внутри батча."""
+
+    def __init__(self, error):
+        self.code = error.get("code") if isinstance(error, dict) else None
+        message = error.get("message") if isinstance(error, dict) else error
+        super().__init__(f"{self.code}: {message}" if self.code is not None else str(message))
+
+
+def _is_batch_limit_error(error):
+    if not isinstance(error, dict):
+        return False
+    message = str(error.get("message", "")).lower()
+    return error.get("code") in BATCH_LIMIT_ERROR_CODES and "batch" in message
+
+
+def post_json(session, rpc_url, payload, timeout=30):
+    """Отправляет JSON-RPC запрос (одиночный или батч) и возвращает разобранный JSON."""
+    try:
+        r = session.post(rpc_url, json=payload, timeout=timeout)
+    except requests.RequestException as e:
+        raise BatchRejected(str(e)) from e
+    if r.status_code != 200:
+        raise BatchRejected(f"HTTP {r.status_code}", status=r.status_code,
+                            retry_after=parse_retry_after(r.headers.get("Retry-After")))
+    try:
+        return r.json()
+    except ValueError as e:
+        raise BatchRejected("Некорректный JSON в ответе") from e
+
+
+def post_batch(session, rpc_url, payload, timeout=30):
+    """Отправляет JSON-RPC батч одним POST и возвращает ответы, разложенные по id."""
+    data = post_json(session, rpc_url, payload, timeout)
+    if not isinstance(data, list):
+        # Часть провайдеров вместо массива отвечает одной ошибкой на весь батч
+        error = data.get("error") if isinstance(data, dict) else data
+        raise BatchRejected(error, code=error.get("code") if isinstance(error, dict) else None)
+    return {resp.get("id"): resp for resp in data if isinstance(resp, dict)}
+
+
+def run_batched_calls(session, rpc_url, calls, batch_size=100, on_chunk=None, timeout=30, policy=None):
+    """
+    Выполняет список вызовов [(key, method, params), ...] JSON-RPC батчами.
+
+    Если провайдер отклоняет батч или возвращает не все ответы, батч делится
+    пополам (или переотправляются только потерянные вызовы) до тех пор, пока
+    каждый вызов не получит результат. Временные ошибки (429, 5xx, таймауты)
+    повторяются с задержкой по policy — как для батча целиком, так и для
+    отдельных вызовов. Возвращает {key: result | Exception}.
+    """
+    policy = policy or DEFAULT_POLICY
+    results = _run_batches(session, rpc_url, calls, batch_size, on_chunk, timeout, policy)
+    for attempt in range(policy.max_attempts - 1):
+        retry = [call for call in calls
+                 if isinstance(results.get(call[0]), RpcError) and is_retryable(results[call[0]])]
+        if not retry:
+            break
+        metrics.count_retry(metrics.network_of(rpc_url), f"batch:{retry[0][1]}", len(retry))
+        time.sleep(policy.delay(attempt))
+        # Прогресс по этим вызовам уже учтён в первом проходе
+        results.update(_run_batches(session, rpc_url, retry, batch_size, None, timeout, policy))
+    return results
+
+
+def _run_batches(session, rpc_url, calls, batch_size, on_chunk, timeout, policy):
+    results = {}
+    batch_size = max(1, int(batch_size))
+    pending = [calls[i:i + batch_size] for i in range(0, len(calls), batch_size)]
+    pending.reverse()
+    network = metrics.network_of(rpc_url)
+
+    while pending:
+        chunk = pending.pop()
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (_, method, params) in enumerate(chunk)
+        ]
+        try:
+            responses = retry_blocking(lambda: post_batch(session, rpc_url, payload, timeout), policy,
+                                       metrics.retry_callback(network, f"batch:{chunk[0][1]}"))
+        except BatchRejected as e:
+            if len(chunk) == 1 or is_retryable(e):
+                # Повторы временной ошибки исчерпаны — дробление батча тут не поможет
+                for call in chunk:
+                    results[call[0]] = e
+                if on_chunk:
+                    on_chunk(len(chunk))
+            else:
+                middle = len(chunk) // 2
+                pending.append(chunk[middle:])
+                pending.append(chunk[:middle])
+            continue
+
+        missing = []
+        done = 0
+        for i, call in enumerate(chunk):
+            resp = responses.get(i)
+            if resp is None or _is_batch_limit_error(resp.get("error")):
+                missing.append(call)
+            elif "error" in resp:
+                results[call[0]] = RpcError(resp["error"])
+                done += 1
+            else:
+                results[call[0]] = resp.get("result")
+                done += 1
+        if on_chunk and done:
+            on_chunk(done)
+
+        if not missing:
+            continue
+        if done:
+            # Провайдер обрезал батч — переотправляем только потерянные вызовы
+            pending.append(missing)
+        elif len(missing) == 1:
+            results[missing[0][0]] = BatchRejected("Провайдер не вернул ответ на вызов")
+            if on_chunk:
+                on_chunk(1)
+        else:
+            middle = len(missing) // 2
+            pending.append(missing[middle:])
+            pending.append(missing[:middle])
+
+    return results
+
+
+def get_balances_batch(session, rpc_url, addresses, batch_size=100, block="latest", on_chunk=None,
+                       policy=None):
+    """Возвращает {address: баланс в wei | Exception}, запрашивая eth_getBalance батчами."""
+    unique = list(dict.fromkeys(addresses))
+    calls = [(address, "eth_getBalance", [address, block]) for address in unique]
+    raw = run_batched_calls(session, rpc_url, calls, batch_size, on_chunk, policy=policy)
+    balances = {}
+    for address, value in raw.items():
+        if isinstance(value, Exception):
+            balances[address] = value
+        else:
+            try:
+                balances[address] = int(value, 16)
+            except (TypeError, ValueError):
+                balances[address] = RpcError(f"Некорректный ответ: {value!r}")
+    return balances
+
+
+def rpc_call(session, rpc_url, method, params, timeout=30):
+    """Одиночный JSON-RPC вызов без повторов. Ошибку узла поднимает как RpcError."""
+    payload = {"jsonrpc": "2.0", "id": 0, "method": method, "params": params}
+    data = post_json(session, rpc_url, payload, timeout)
+    if not isinstance(data, dict):
+        raise BatchRejected(f"Некорректный ответ: {data!r}")
+    if "error" in data:
+        raise RpcError(data["error"])
+    return data.get("result")
@@ -0,0 +1,299 @@
+import asyncio
+import calendar
+import configparser
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import metrics
+from utils.get_config_path import config_path
+from utils.balance_cache import open_cache
+from utils.eth_balance_check import (
+    BALANCE_PLACES, ETH_DECIMALS, NETWORK_COLUMNS, block_tag, load_performance_settings, open_connections,
+    pooled_session
+)
+from utils.eth_batch import RpcError, run_batched_calls
+from utils.failure_report import FailureReport, failure_report_path
+from utils.result_store import ResultStore
+from utils.retry import retry_blocking
+from utils.scheduler import Scheduler
+from utils.writers import output_path, open_writer
+
+# Колонки файла соответствия дат и блоков
+BLOCK_COLUMNS = ['Network', 'Date', 'Timestamp', 'Block']
+# Найденный блок кэшируется навсегда, только если после него уже столько блоков:
+# у свежих блоков ответ ещё может измениться (реорганизация, новые блоки в ту же секунду)
+FINAL_DEPTH = 64
+
+def _end_of_day(day):
+    return calendar.timegm(day.timetuple()) + 86400 - 1
+
+def _month_end(year, month):
+    return datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+def parse_dates(text):
+    """
+    Список дат через запятую -> [(подпись колонки, unix-время UTC)]:
+    2024-01-31 — конец дня, 2024-01-31T12:00 — указанный момент, 2024-01 — конец
+    месяца, 2024-01..2024-06 — концы всех месяцев диапазона.
+    """
+    dates = []
+    for item in (part.strip() for part in text.split(',')):
+        if not item:
+            continue
+        try:
+            if '..' in item:
+                start, end = (datetime.datetime.strptime(value.strip(), '%Y-%m') for value in item.split('..', 1))
+                year, month = start.year, start.month
+                while (year, month) <= (end.year, end.month):
+                    day = _month_end(year, month)
+                    dates.append((day.isoformat(), _end_of_day(day)))
+                    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            elif 'T' in item or ' ' in item:
+                moment = datetime.datetime.fromisoformat(item.replace(' ', 'T'))
+                if moment.tzinfo is not None:
+                    moment = moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+                dates.append((item, calendar.timegm(moment.timetuple())))
+            elif item.count('-') == 1:
+                month = datetime.datetime.strptime(item, '%Y-%m')
+                day = _month_end(month.year, month.month)
+                dates.append((day.isoformat(), _end_of_day(day)))
+            else:
+                dates.append((item, _end_of_day(datetime.date.fromisoformat(item))))
+        except ValueError:
+            raise ValueError(f"Некорректная дата: {item}. Формат: 2024-01-31, 2024-01-31T12:00, 2024-01 или 2024-01..2024-06")
+    # Повторы убираем, порядок колонок — по времени
+    return sorted(dict(dates).items(), key=lambda date: date[1])
+
+def _header_calls(numbers):
+    return [(number, 'eth_getBlockByNumber', [block_tag(number) if number is not None else 'latest', False])
+            for number in numbers]
+
+def _fetch_headers(session, rpc_url, numbers, batch_size, policy):
+    """{номер блока: время блока} одним или несколькими батчами; None в numbers — последний блок."""
+    headers = {}
+    for number, result in run_batched_calls(session, rpc_url, _header_calls(numbers), batch_size,
+                                            policy=policy).items():
+        if isinstance(result, Exception):
+            raise result
+        if not result:
+            raise RpcError(f"Узел не вернул блок {number}")
+        headers[int(result['number'], 16) if number is None else number] = int(result['timestamp'], 16)
+    return headers
+
+def find_blocks(session, rpc_url, timestamps, batch_size=100, policy=None, cache=None, network=None):
+    """
+    {unix-время: номер последнего блока не позже этого времени | None, если время раньше первого блока}.
+
+    Двоичный поиск по заголовкам блоков идёт для всех дат сразу: на каждом шаге
+    заголовки середин всех интервалов запрашиваются одним JSON-RPC батчем, а уже
+    прочитанные заголовки переиспользуются. Шаги чередуют интерполяцию по времени
+    блоков (при ровном времени блока сходится за пару шагов) и деление пополам,
+    которое гарантирует log2(высоты) шагов. Найденные блоки сохраняются в кэш
+    и повторно не ищутся.
+    """
+    results = {}
+    for timestamp in timestamps:
+        block = cache.get(network, str(timestamp), 'block_at', 0) if cache else None
+        if block is not None:
+            results[timestamp] = block
+    todo = [timestamp for timestamp in timestamps if timestamp not in results]
+    if not todo:
+        return results
+
+    known = _fetch_headers(session, rpc_url, [None, 0], batch_size, policy)
+    head = max(known)
+    ranges = {}
+    for timestamp in todo:
+        if timestamp >= known[head]:
+            results[timestamp] = head
+        elif timestamp < known[0]:
+            results[timestamp] = None
+        else:
+            ranges[timestamp] = (0, head)
+
+    step = 0
+    while ranges:
+        probes = {}
+        for timestamp, (low, high) in list(ranges.items()):
+            if high - low <= 1:
+                results[timestamp] = low
+                del ranges[timestamp]
+                continue
+            if step % 2 == 0 and known[high] > known[low]:
+                guess = low + (timestamp - known[low]) * (high - low) // (known[high] - known[low])
+                guess = min(max(guess, low + 1), high - 1)
+            else:
+                guess = (low + high) // 2
+            probes[timestamp] = guess
+        missing = sorted({guess for guess in probes.values() if guess not in known})
+        if missing:
+            known.update(_fetch_headers(session, rpc_url, missing, batch_size, policy))
+        for timestamp, guess in probes.items():
+            low, high = ranges[timestamp]
+            ranges[timestamp] = (guess, high) if known[guess] <= timestamp else (low, guess)
+        step += 1
+
+    if cache:
+        for timestamp in todo:
+            block = results[timestamp]
+            if block is not None and block + FINAL_DEPTH <= head:
+                cache.put(network, str(timestamp), 'block_at', block, 0)
+    return results
+
+def history_calls(addresses, blocks, balances):
+    """Вызовы eth_getBalance для пар (адрес, блок), которых нет в balances."""
+    return [((address, block), 'eth_getBalance', [address, block_tag(block)])
+            for block in blocks for address in addresses if (address, block) not in balances]
+
+async def fetch_network_history(loop, network, pool, addresses, dates, settings, on_chunk):
+    """
+    Балансы сети на все даты: {(address, block): wei | Exception} и {unix-время: блок}.
+    Все пары адрес × блок уходят батчами eth_getBalance; независимые части по segment_size
+    вызовов запрашиваются параллельно (не больше network_concurrency одновременно).
+    """
+    rpc_url = pool.urls[0]
+    session = pooled_session(network, pool, settings)
+    policy = settings['retry_policy']
+    cache = settings.get('cache')
+    blocks = await loop.run_in_executor(
+        None, retry_blocking,
+        lambda: find_blocks(session, rpc_url, [timestamp for _, timestamp in dates], settings['batch_size'],
+                            policy, cache, network),
+        policy
+    )
+    unique = list(dict.fromkeys(addresses))
+    used = sorted({block for block in blocks.values() if block is not None})
+    # Даты раньше первого блока и даты с общим блоком отдельных запросов не требуют
+    on_chunk(len(unique) * (len(dates) - len(used)))
+
+    balances = {}
+    if cache:
+        for block in used:
+            for address, value in cache.get_many(network, unique, 'native', block).items():
+                balances[address, block] = value
+        if balances:
+            on_chunk(len(balances))
+    calls = history_calls(unique, used, balances)
+    size = max(1, settings['segment_size'])
+    limit = asyncio.Semaphore(max(1, settings['network_concurrency']))
+
+    async def run_part(part):
+        async with limit:
+            return await loop.run_in_executor(None, run_batched_calls, session, rpc_url, part,
+                                              settings['batch_size'], on_chunk, 30, policy)
+
+    parts = await asyncio.gather(*(run_part(calls[start:start + size]) for start in range(0, len(calls), size)))
+    for fetched in parts:
+        for (address, block), value in fetched.items():
+            if not isinstance(value, Exception):
+                try:
+                    value = int(value, 16)
+                except (TypeError, ValueError):
+                    value = RpcError(f"Некорректный ответ: {value!r}")
+            balances[address, block] = value
+            if cache and not isinstance(value, Exception):
+                cache.put(network, address, 'native', value, block)
+    return balances, blocks
+
+async def history_main(addresses, connections, dates, settings, progress_callback=None):
+    settings = dict(settings)
+    scheduler = Scheduler(settings['max_concurrency'], settings['network_concurrency'],
+                          settings['rate_limits'])
+    settings['scheduler'] = scheduler
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=scheduler.max_concurrency))
+    active = {network: pool for network, pool in connections.items() if pool}
+    total = len(set(addresses)) * len(dates) * len(active)
+    done = 0
+
+    def report(count):
+        nonlocal done
+        done += count
+        if progress_callback and total:
+            progress_callback(min(100, int(done / total * 100)))
+
+    def on_chunk(count):
+        loop.call_soon_threadsafe(report, count)
+
+    async def fetch(network, pool):
+        try:
+            return await fetch_network_history(loop, network, pool, addresses, dates, settings, on_chunk)
+        except Exception as e:
+            # Без соответствия дат и блоков сеть пропускаем целиком, остальные сети продолжают
+            print(f"[{network}] Не удалось найти блоки для дат: {e}")
+            return e
+
+    results = await asyncio.gather(*(fetch(network, pool) for network, pool in active.items()))
+    if progress_callback:
+        progress_callback(100)
+    return dict(zip(active, results))
+
+def run_eth_history(addresses, dates, progress_callback=None, bypass_cache=False, config=None):
+    """
+    Исторические балансы: для каждой включённой сети файл ethereum_history_<сеть>
+    с матрицей адрес × дата (балансы ETH на последнем блоке не позже даты) и общий
+    файл ethereum_history_blocks с найденными блоками. dates — строка для parse_dates
+    или список [(подпись, unix-время)]. Нужен архивный RPC-узел. Балансы на
+    конкретных блоках кэшируются бессрочно, поэтому повторный запуск после сбоя
+    дозапрашивает только недостающее. Возвращает список путей к файлам матриц.
+    """
+    if config is None:
+        config = configparser.ConfigParser()
+        config.read(config_path)
+    if isinstance(dates, str):
+        dates = parse_dates(dates)
+    if not dates:
+        raise ValueError("Не указаны даты для исторических балансов.")
+
+    connections = open_connections(config)
+    settings = load_performance_settings(config)
+    save_metrics = metrics.configure(config)
+    metrics.begin_run('eth', [network for network, pool in connections.items() if pool])
+    cache = open_cache(config, bypass=bypass_cache)
+    settings['cache'] = cache
+    blocks_path = output_path(config, 'ethereum_history_blocks')
+    failures = FailureReport(failure_report_path(output_path(config, 'ethereum_history')))
+    labels = [label for label, _ in dates]
+    paths = []
+    try:
+        results = asyncio.run(history_main(addresses, connections, dates, settings, progress_callback))
+        with open_writer(config, blocks_path, BLOCK_COLUMNS) as block_writer:
+            for network, result in results.items():
+                if isinstance(result, Exception):
+                    failures.add('', network, 'block_at', result)
+                    continue
+                balances, blocks = result
+                for label, timestamp in dates:
+                    block_writer.write([network, label, timestamp, blocks[timestamp]])
+
+                path = output_path(config, f'ethereum_history_{network}')
+                writer = ResultStore(open_writer(config, path, ['Address', *labels],
+                                                 dict.fromkeys(labels, BALANCE_PLACES)),
+                                     dict.fromkeys(labels, ETH_DECIMALS), BALANCE_PLACES)
+                with writer:
+                    for address in addresses:
+                        row = [address]
+                        for label, timestamp in dates:
+                            block = blocks[timestamp]
+                            if block is None:
+                                # Дата раньше первого блока сети
+                                row.append('-')
+                                continue
+                            value = balances[address, block]
+                            if isinstance(value, Exception):
+                                failures.add(address, network, label, value)
+                                value = None
+                            row.append(value)
+                        writer.write(row)
+                paths.append(path)
+                print(f"[{NETWORK_COLUMNS[network]}] Исторические балансы сохранены в файл {path}")
+    finally:
+        failures.close()
+        if cache:
+            cache.close()
+            print(cache.report())
+        metrics.end_run('eth')
+        if save_metrics:
+            metrics.write_summary(metrics.summary_path(output_path(config, 'ethereum_history')), 'eth')
+    print(f"Блоки для дат сохранены в файл {blocks_path}")
+    return paths
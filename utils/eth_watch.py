@@ -0,0 +1,127 @@
+import asyncio
+import configparser
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import metrics
+from utils.get_config_path import config_path
+from utils.eth_balance_check import (
+    BALANCE_PLACES, BULK_FETCHERS, format_balance, load_performance_settings, open_connections
+)
+from utils.scheduler import Scheduler
+from utils.subscriptions import RESUBSCRIBED, subscribe
+from utils.writers import output_path, open_writer
+
+# Колонки файла изменений: одна строка на каждое изменение баланса
+WATCH_COLUMNS = ['Time', 'Address', 'Network', 'Block', 'Balance']
+
+async def watch_network(network, ws_url, pool, addresses, settings, on_change, is_interrupted=None):
+    """
+    Следит за балансами адресов одной сети: на каждый новый блок (подписка newHeads)
+    балансы перечитываются пакетно на высоте этого блока, а в on_change(rows)
+    передаются только изменившиеся строки. Если блоки приходят быстрее, чем
+    идёт опрос, промежуточные пропускаются — читается последний известный блок.
+    Первый опрос задаёт исходное состояние и отдаёт строки всех адресов.
+    """
+    loop = asyncio.get_running_loop()
+    # Наблюдение всегда читает пакетно: без Multicall3 — JSON-RPC батчами
+    fetcher = BULK_FETCHERS.get(settings['engine'], BULK_FETCHERS['batch'])
+    unique = list(dict.fromkeys(addresses))
+    last = {}
+    head = None
+    new_head = asyncio.Event()
+
+    def interrupted():
+        return is_interrupted is not None and is_interrupted()
+
+    async def follow_heads():
+        nonlocal head
+        async for header in subscribe(ws_url, 'eth_subscribe', ['newHeads'], is_interrupted,
+                                      settings['retry_policy']):
+            if header is RESUBSCRIBED:
+                continue
+            head = int(header['number'], 16)
+            new_head.set()
+
+    async def refresh():
+        while not interrupted():
+            try:
+                await asyncio.wait_for(new_head.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            new_head.clear()
+            block = head
+            try:
+                balances = await fetcher(loop, network, pool, unique, dict(settings, blocks={network: block}),
+                                         lambda count: None)
+            except Exception as e:
+                print(f"[{network}] Не удалось прочитать балансы на блоке {block}: {e}")
+                continue
+            changed = []
+            now = time.strftime('%Y-%m-%d %H:%M:%S')
+            for address in unique:
+                balance = balances.get(address)
+                # Ошибку чтения не считаем изменением: остаётся последнее известное значение
+                if balance is None or isinstance(balance, Exception) or last.get(address) == balance:
+                    continue
+                last[address] = balance
+                changed.append({'Time': now, 'Address': address, 'Network': network,
+                                'Block': block, 'Balance': format_balance(balance)})
+            if changed:
+                on_change(changed)
+
+    await asyncio.gather(follow_heads(), refresh())
+
+async def watch_main(addresses, connections, ws_urls, settings, on_change, is_interrupted=None):
+    settings = dict(settings)
+    scheduler = Scheduler(settings['max_concurrency'], settings['network_concurrency'],
+                          settings['rate_limits'])
+    settings['scheduler'] = scheduler
+    executor = ThreadPoolExecutor(max_workers=scheduler.max_concurrency)
+    asyncio.get_running_loop().set_default_executor(executor)
+    await asyncio.gather(*(
+        watch_network(network, ws_url, connections[network], addresses, settings, on_change, is_interrupted)
+        for network, ws_url in ws_urls.items()
+    ))
+
+def load_watch_urls(config, networks):
+    """Websocket-эндпоинты сетей из секции [Watch]; сети без эндпоинта пропускаются."""
+    urls = {network: config.get('Watch', network, fallback='').strip() for network in networks}
+    missing = [network for network, url in urls.items() if not url]
+    if missing:
+        print(f"В секции [Watch] нет websocket-эндпоинта для сетей: {', '.join(missing)}; они не отслеживаются")
+    return {network: url for network, url in urls.items() if url}
+
+def run_eth_watch(addresses, on_change=None, is_interrupted=None, config=None):
+    """
+    Режим наблюдения: держит список адресов и при каждом новом блоке дописывает
+    изменившиеся балансы в файл ethereum_watch и в on_change(row).
+    Работает, пока is_interrupted() не вернёт True. Возвращает путь к файлу изменений.
+    """
+    if config is None:
+        config = configparser.ConfigParser()
+        config.read(config_path)
+
+    connections = open_connections(config)
+    # Наблюдение работает долго — для него и нужен экспорт метрик в Prometheus
+    metrics.configure(config)
+    ws_urls = load_watch_urls(config, [network for network, pool in connections.items() if pool])
+    if not ws_urls:
+        raise ValueError("Для наблюдения укажите websocket-эндпоинты включённых сетей в секции [Watch].")
+    settings = load_performance_settings(config)
+
+    writer = open_writer(config, output_path(config, "ethereum_watch"), WATCH_COLUMNS, {'Balance': BALANCE_PLACES})
+
+    def emit(rows):
+        writer.write_many(rows)
+        writer.flush()
+        if on_change:
+            for row in rows:
+                on_change(row)
+
+    try:
+        asyncio.run(watch_main(addresses, connections, ws_urls, settings, emit, is_interrupted))
+    finally:
+        writer.close()
+    print(f"Изменения балансов сохранены в файл {writer.path}")
+    return writer.path
@@ -0,0 +1,47 @@
+import os
+
+from utils.writers import CsvWriter
+
+
+class FailureReport:
+    """
+    Отчёт о значениях, которые не удалось получить после всех повторов:
+    строка на каждую пару (адрес, сеть, запрос) с текстом последней ошибки.
+    В итоговом файле такие ячейки остаются пустыми вместо сообщений об ошибке
+    или нулей. Файл создаётся только при первой ошибке.
+    """
+
+    COLUMNS = ["address", "chain", "query", "error"]
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._writer = None
+        # Отчёт прошлого запуска относится к уже перезапрошенным адресам
+        if os.path.exists(path):
+            os.remove(path)
+
+    def add(self, address, chain, query, error):
+        self.add_formatted(address, chain, query, format_error(error))
+
+    def add_formatted(self, address, chain, query, text):
+        """Ошибка, уже переведённая в текст (например, полученная от процесса-шарда)."""
+        if self._writer is None:
+            self._writer = CsvWriter(self.path, self.COLUMNS)
+        self._writer.write([address, chain, query, text])
+        self.count += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            print(f"Не удалось получить значений: {self.count}, подробности в файле {self.path}")
+
+
+def format_error(error):
+    return f"{type(error).__name__}: {error}"
+
+
+def failure_report_path(output_filename):
+    """Путь к отчёту об ошибках рядом с итоговым файлом."""
+    return os.path.splitext(output_filename)[0] + "_failures.csv"
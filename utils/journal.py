@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import time
+from decimal import Decimal
+
+
+def input_fingerprint(addresses, *context):
+    """Отпечаток входных данных запуска: список адресов плюс параметры, влияющие на результат."""
+    digest = hashlib.sha256()
+    for part in context:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    for address in addresses:
+        digest.update(address.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def _encode(value):
+    # Decimal сохраняем строкой с пометкой, чтобы восстановить значение без потери точности
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в журнал")
+
+
+def _decode(obj):
+    if "__decimal__" in obj and len(obj) == 1:
+        return Decimal(obj["__decimal__"])
+    return obj
+
+
+class RunJournal:
+    """
+    Журнал запуска: каждая готовая строка результата дописывается в файл JSON Lines.
+    Перезапуск с теми же входными данными подхватывает журнал и пропускает
+    уже обработанные адреса; журнал с другим отпечатком начинается заново.
+    В памяти держатся только ключи готовых адресов, сами строки читаются из файла.
+    В заголовке хранятся параметры запуска (meta), которые продолжение должно
+    унаследовать, например закреплённые высоты блоков.
+    """
+
+    def __init__(self, path, fingerprint, flush_every=100, flush_interval=1.0, meta=None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.meta = meta or {}
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._done = set()
+        self._count = 0
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+        resumed = self._load()
+        self._file = open(path, "a" if resumed else "w", encoding="utf-8")
+        if not resumed:
+            self._file.write(json.dumps({"fingerprint": fingerprint, "meta": self.meta}) + "\n")
+            self._file.flush()
+        elif self._count:
+            # Последняя строка могла не дописаться при аварийном завершении — начинаем с новой
+            self._file.write("\n")
+            print(f"Продолжение прерванного запуска: готово {len(self._done)} адресов")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                return False
+        if header.get("fingerprint") != self.fingerprint:
+            return False
+        self.meta = header.get("meta") or {}
+        for _, entry in self._entries():
+            self._count += 1
+            if entry.get("complete", True):
+                self._done.add(entry["key"])
+            else:
+                self._done.discard(entry["key"])
+        return True
+
+    def _entries(self):
+        """Перебирает записи журнала (номер строки, запись), пропуская недописанные строки."""
+        with open(self.path, encoding="utf-8") as f:
+            f.readline()
+            for n, line in enumerate(f):
+                if not line.strip():
+                    continue
+                try:
+                    yield n, json.loads(line, object_hook=_decode)
+                except ValueError:
+                    continue
+
+    def is_done(self, key):
+        return key in self._done
+
+    @property
+    def done_count(self):
+        return len(self._done)
+
+    def append(self, key, row, complete=True):
+        """Дописывает строку; complete=False — строку нужно перезапросить при следующем запуске."""
+        self._count += 1
+        if complete:
+            self._done.add(key)
+        else:
+            self._done.discard(key)
+        entry = {"key": key, "row": row}
+        if not complete:
+            entry["complete"] = False
+        self._file.write(json.dumps(entry, ensure_ascii=False, default=_encode) + "\n")
+        self._unflushed += 1
+        now = time.monotonic()
+        if self._unflushed >= self.flush_every or now - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._unflushed = 0
+            self._last_flush = now
+
+    def rows(self):
+        """
+        Потоково отдаёт строки результата в порядке записи в журнал. Для адресов,
+        записанных несколько раз (перезапрос после ошибки), берётся последняя запись.
+        """
+        self._file.flush()
+        last = {}
+        for n, entry in self._entries():
+            last[entry["key"]] = n
+        for n, entry in self._entries():
+            if last[entry["key"]] == n:
+                yield entry["row"]
+
+    def close(self):
+        if not self._file.closed:
+            self._file.flush()
+            self._file.close()
+
+    def discard(self):
+        """Удаляет журнал после того, как итоговый отчёт успешно записан."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def scale_progress(progress_callback, offset, count, total):
+    """Пересчитывает прогресс части запуска (0–100) в прогресс всего запуска."""
+    if not progress_callback or not total:
+        return None
+    return lambda percent: progress_callback(int((offset + count * percent / 100) / total * 100))
+
+
+def open_journal(config, output_filename, addresses, *context, meta=None):
+    """
+    Открывает журнал рядом с итоговым файлом по настройкам секции [Journal].
+    При продолжении прерванного запуска journal.meta содержит meta исходного запуска.
+    """
+    if not config.getboolean("Journal", "enabled", fallback=True):
+        return None
+    return RunJournal(output_filename + ".journal", input_fingerprint(addresses, *context), meta=meta)
@@ -0,0 +1,403 @@
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Метрики запросов к узлам: гистограммы задержек, счётчики запросов, ошибок,
+# повторов и переданных байт в разрезе сети, эндпоинта и типа запроса.
+# Как и сессии в transport, реестр живёт на уровне модуля: запросы учитывает
+# транспортный слой, а чекеры только начинают запуск и сохраняют итоги.
+
+# Границы корзин гистограммы задержек, секунды
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+UNKNOWN = "unknown"
+
+_lock = threading.Lock()
+_series = {}  # (network, endpoint, query) -> Series
+_retries = {}  # (network, query) -> число повторов
+_endpoints = {}  # url эндпоинта -> сеть
+_runs = {}  # имя запуска -> (сети, время начала, время окончания или None)
+_exporter = None
+
+_METHOD_RE = re.compile(rb'"method"\s*:\s*"([^"]+)"')
+# Адреса (bech32 и hex) в пути REST-запроса заменяются шаблоном
+_ADDRESS_SEGMENT_RE = re.compile(r"^(?:[a-z]+1[02-9ac-hj-np-z]{38,}|0x[0-9a-fA-F]{40})$")
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последняя корзина — +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q):
+        """Оценка квантиля линейной интерполяцией внутри корзины (как histogram_quantile в Prometheus)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, count in enumerate(self.counts):
+            if i == len(self.buckets):
+                return self.buckets[-1]
+            upper = self.buckets[i]
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return self.buckets[-1]
+
+
+class Series:
+    """Статистика запросов к одному эндпоинту сети одного типа."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = Histogram()
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.errors += other.errors
+        self.bytes_sent += other.bytes_sent
+        self.bytes_received += other.bytes_received
+        self.latency.merge(other.latency)
+
+
+def register_endpoints(network, urls):
+    """Запоминает, к какой сети относятся эндпоинты, чтобы транспорт подписывал запросы сетью."""
+    with _lock:
+        for url in urls:
+            _endpoints[url.rstrip("/")] = network
+
+
+def network_of(url):
+    # Самый длинный зарегистрированный префикс: к REST-эндпоинту дописываются пути запросов
+    best = None
+    for prefix, network in tuple(_endpoints.items()):
+        if url.startswith(prefix) and (best is None or len(prefix) > len(best[0])):
+            best = (prefix, network)
+    return best[1] if best else UNKNOWN
+
+
+def endpoint_label(url):
+    # Только хост: в пути и параметрах часто лежит API-ключ провайдера
+    return urlsplit(url).hostname or UNKNOWN
+
+
+def query_of(url, body=None):
+    """Тип запроса: метод JSON-RPC (batch:<метод> для батча) или шаблон пути REST."""
+    if body:
+        if isinstance(body, str):
+            body = body.encode()
+        match = _METHOD_RE.search(body[:512])
+        if match:
+            method = match.group(1).decode()
+            return f"batch:{method}" if body.lstrip()[:1] == b"[" else method
+    path = urlsplit(url).path
+    segments = ["{address}" if _ADDRESS_SEGMENT_RE.match(segment) else segment for segment in path.split("/")]
+    return "/".join(segments) or "/"
+
+
+def observe(url, seconds, ok, body=None, received=0):
+    """Учитывает один HTTP-запрос; ok=False — исключение или статус, отличный от 200."""
+    if isinstance(body, str):
+        body = body.encode()
+    key = (network_of(url), endpoint_label(url), query_of(url, body))
+    with _lock:
+        series = _series.get(key)
+        if series is None:
+            series = _series[key] = Series()
+        series.requests += 1
+        if not ok:
+            series.errors += 1
+        series.bytes_sent += len(body) if body else 0
+        series.bytes_received += received
+        series.latency.observe(seconds)
+
+
+def count_retry(network, query, count=1):
+    with _lock:
+        _retries[(network, query)] = _retries.get((network, query), 0) + count
+
+
+def retry_callback(network, query):
+    """on_retry для retry_blocking/retry_async: повтор учитывается в метриках."""
+    return lambda error, attempt: count_retry(network, query)
+
+
+def take_delta():
+    """
+    Забирает накопленные серии и повторы, обнуляя реестр. Процесс-шард периодически
+    передаёт их основному процессу, который добавляет их к своим через merge_delta.
+    """
+    global _series, _retries
+    with _lock:
+        series, retries = _series, _retries
+        _series, _retries = {}, {}
+    return series, retries
+
+
+def merge_delta(series, retries):
+    with _lock:
+        for key, item in series.items():
+            _series.setdefault(key, Series()).merge(item)
+        for key, count in retries.items():
+            _retries[key] = _retries.get(key, 0) + count
+
+
+def begin_run(name, networks):
+    """Начало запуска чекера: статистика его сетей обнуляется, итоги считаются с этого момента."""
+    networks = list(networks)
+    with _lock:
+        for key in [key for key in _series if key[0] in networks]:
+            del _series[key]
+        for key in [key for key in _retries if key[0] in networks]:
+            del _retries[key]
+        _runs[name] = (networks, time.time(), None)
+
+
+def end_run(name):
+    with _lock:
+        if name in _runs:
+            networks, started, _ = _runs[name]
+            _runs[name] = (networks, started, time.time())
+
+
+def _run_window(name):
+    networks, started, finished = _runs.get(name, ((), time.time(), None))
+    return networks, started, max((finished or time.time()) - started, 1e-6)
+
+
+def _row(series, retries=0, seconds=None):
+    latency = series.latency
+    row = {
+        "requests": series.requests,
+        "errors": series.errors,
+        "retries": retries,
+        "bytes_sent": series.bytes_sent,
+        "bytes_received": series.bytes_received,
+        "p50_ms": _ms(latency.quantile(0.5)),
+        "p95_ms": _ms(latency.quantile(0.95)),
+        "p99_ms": _ms(latency.quantile(0.99)),
+        "mean_ms": _ms(latency.sum / latency.count) if latency.count else None,
+    }
+    if seconds:
+        row["requests_per_second"] = round(series.requests / seconds, 1)
+    return row
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def _grouped(networks, key_of):
+    groups = {}
+    for key, series in _series.items():
+        if key[0] in networks:
+            groups.setdefault(key_of(key), Series()).merge(series)
+    return groups
+
+
+def run_stats(name):
+    """Сводка по сетям текущего (или последнего) запуска — для панели статистики."""
+    with _lock:
+        networks, _, seconds = _run_window(name)
+        by_network = _grouped(networks, lambda key: key[0])
+        retries = {network: sum(count for (n, _), count in _retries.items() if n == network)
+                   for network in networks}
+        return {network: _row(series, retries.get(network, 0), seconds)
+                for network, series in by_network.items()}
+
+
+def format_stats(stats):
+    """Текст панели статистики: строка на сеть."""
+    lines = []
+    for network, row in sorted(stats.items()):
+        lines.append(
+            f"{network}: {row['requests']} запросов ({row.get('requests_per_second', 0)}/с), "
+            f"ошибок {row['errors']}, повторов {row['retries']}, "
+            f"p50 {row['p50_ms']} мс, p99 {row['p99_ms']} мс, "
+            f"получено {row['bytes_received'] / 1_048_576:.1f} МБ"
+        )
+    return "\n".join(lines)
+
+
+def run_summary(name):
+    """Итоги запуска: по сетям, эндпоинтам и типам запросов."""
+    with _lock:
+        networks, started, seconds = _run_window(name)
+        retries_by_network = {}
+        for (network, _), count in _retries.items():
+            if network in networks:
+                retries_by_network[network] = retries_by_network.get(network, 0) + count
+        by_network = _grouped(networks, lambda key: key[0])
+        by_endpoint = _grouped(networks, lambda key: (key[0], key[1]))
+        by_query = _grouped(networks, lambda key: (key[0], key[2]))
+        return {
+            "run": name,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+            "seconds": round(seconds, 3),
+            "networks": {network: _row(series, retries_by_network.get(network, 0), seconds)
+                         for network, series in by_network.items()},
+            "endpoints": [dict(network=network, endpoint=endpoint, **_row(series, seconds=seconds))
+                          for (network, endpoint), series in by_endpoint.items()],
+            "queries": [dict(network=network, query=query,
+                             **_row(series, _retries.get((network, query), 0), seconds))
+                        for (network, query), series in by_query.items()],
+        }
+
+
+def summary_path(output_filename):
+    """Путь к файлу итогов метрик рядом с итоговым файлом."""
+    return os.path.splitext(output_filename)[0] + "_metrics.json"
+
+
+def write_summary(path, name):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(run_summary(name), f, ensure_ascii=False, indent=2)
+    print(f"Метрики запросов сохранены в файл {path}")
+    return path
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def prometheus_text():
+    """Все метрики в текстовом формате Prometheus."""
+    with _lock:
+        series = list(_series.items())
+        retries = list(_retries.items())
+    lines = []
+
+    def counter(name, help_text, value_of):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (network, endpoint, query), item in series:
+            lines.append(f"{name}{_labels(network=network, endpoint=endpoint, query=query)} {value_of(item)}")
+
+    counter("checker_requests_total", "Запросы к узлам", lambda item: item.requests)
+    counter("checker_request_errors_total", "Запросы, завершившиеся ошибкой или статусом не 200",
+            lambda item: item.errors)
+    counter("checker_bytes_sent_total", "Отправлено байт в телах запросов", lambda item: item.bytes_sent)
+    counter("checker_bytes_received_total", "Получено байт в телах ответов", lambda item: item.bytes_received)
+
+    lines.append("# HELP checker_retries_total Повторы временных ошибок")
+    lines.append("# TYPE checker_retries_total counter")
+    for (network, query), count in retries:
+        lines.append(f"checker_retries_total{_labels(network=network, query=query)} {count}")
+
+    lines.append("# HELP checker_request_duration_seconds Длительность запросов к узлам")
+    lines.append("# TYPE checker_request_duration_seconds histogram")
+    for (network, endpoint, query), item in series:
+        histogram = item.latency
+        cumulative = 0
+        for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+            cumulative += count
+            labels = _labels(network=network, endpoint=endpoint, query=query, le=bound)
+            lines.append(f"checker_request_duration_seconds_bucket{labels} {cumulative}")
+        labels = _labels(network=network, endpoint=endpoint, query=query)
+        lines.append(f"checker_request_duration_seconds_sum{labels} {histogram.sum:.6f}")
+        lines.append(f"checker_request_duration_seconds_count{labels} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+
+def start_exporter(port, host="127.0.0.1"):
+    """
+    HTTP-эндпоинт /metrics для Prometheus на localhost. Работает в фоновом потоке
+    до выхода из приложения; повторный вызов с тем же портом ничего не делает.
+    """
+    global _exporter
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    if _exporter is not None:
+        if _exporter.server_address[1] == port:
+            return _exporter
+        _exporter.shutdown()
+        _exporter.server_close()
+        _exporter = None
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _exporter = server
+    print(f"Метрики Prometheus: http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def configure(config):
+    """
+    Применяет секцию [Metrics]: prometheus_port > 0 запускает экспорт метрик.
+    Возвращает True, если нужно сохранять файл итогов запуска (summary).
+    """
+    port = config.getint("Metrics", "prometheus_port", fallback=0)
+    if port > 0:
+        try:
+            start_exporter(port)
+        except OSError as e:
+            print(f"Не удалось запустить экспорт метрик на порту {port}: {e}")
+    return config.getboolean("Metrics", "summary", fallback=True)
+
+
+def aiohttp_trace_config():
+    """TraceConfig, учитывающий запросы aiohttp-сессии в метриках."""
+    import aiohttp
+
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        response = params.response
+        observe(str(params.url), time.perf_counter() - context.started, response.status == 200,
+                received=response.content_length or 0)
+
+    async def on_request_exception(session, context, params):
+        observe(str(params.url), time.perf_counter() - context.started, False)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
@@ -0,0 +1,137 @@
+from eth_abi import encode, decode
+from utils import metrics
+from utils.eth_batch import rpc_call, RpcError
+from utils.retry import is_retryable, retry_blocking
+
+# Канонический адрес Multicall3 (одинаков почти во всех EVM-сетях)
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+# Сети, где Multicall3 развёрнут по другому адресу
+MULTICALL3_ADDRESSES = {
+    "zksync": "0xF9cda624FBC7e059355ce98a31693d299FACd963",
+}
+
+AGGREGATE3_SELECTOR = bytes.fromhex("82ad56cb")  # aggregate3((address,bool,bytes)[])
+GET_ETH_BALANCE_SELECTOR = bytes.fromhex("4d2301cc")  # getEthBalance(address)
+
+# Оценка газа на один getEthBalance внутри aggregate3 (холодный BALANCE + накладные расходы)
+GAS_PER_BALANCE_CALL = 4000
+# Типичный лимит газа для eth_call у узлов (RPCGasCap в geth)
+DEFAULT_GAS_CAP = 50_000_000
+
+
+def multicall_address(network, overrides=None):
+    if overrides and overrides.get(network):
+        return overrides[network]
+    return MULTICALL3_ADDRESSES.get(network, MULTICALL3_ADDRESS)
+
+
+def has_multicall(session, rpc_url, contract, block="latest"):
+    """Проверяет, что по адресу Multicall3 в сети есть код контракта."""
+    code = rpc_call(session, rpc_url, "eth_getCode", [contract, block])
+    return bool(code) and int(code, 16) != 0
+
+
+def chunk_size_for_network(session, rpc_url, gas_cap=DEFAULT_GAS_CAP, max_chunk=2000):
+    """Подбирает размер чанка по лимиту газа блока сети и лимиту eth_call у провайдера."""
+    block = rpc_call(session, rpc_url, "eth_getBlockByNumber", ["latest", False])
+    gas_limit = int(block["gasLimit"], 16) if block else gas_cap
+    budget = min(gas_limit, gas_cap)
+    return max(1, min(max_chunk, budget // GAS_PER_BALANCE_CALL))
+
+
+def _address_bytes(address):
+    if not isinstance(address, str) or not address.startswith(("0x", "0X")):
+        raise ValueError(f"Некорректный адрес: {address!r}")
+    raw = bytes.fromhex(address[2:])
+    if len(raw) != 20:
+        raise ValueError(f"Некорректный адрес: {address!r}")
+    return raw
+
+
+def encode_aggregate3(calls):
+    """Кодирует aggregate3 для списка вызовов [(target, calldata), ...] с allowFailure=True."""
+    encoded = [(target, True, calldata) for target, calldata in calls]
+    return "0x" + (AGGREGATE3_SELECTOR + encode(["(address,bool,bytes)[]"], [encoded])).hex()
+
+
+def decode_aggregate3(result):
+    """Разбирает ответ aggregate3 в список (success, returnData)."""
+    (returns,) = decode(["(bool,bytes)[]"], bytes.fromhex(result[2:]))
+    return returns
+
+
+def decode_uint(success, data):
+    return int.from_bytes(data, "big") if success and len(data) == 32 else None
+
+
+def run_aggregate3(session, rpc_url, contract, calls, chunk_size, block="latest", on_chunk=None,
+                   policy=None, gas_per_call=GAS_PER_BALANCE_CALL):
+    """
+    Выполняет вызовы [(key, target, calldata), ...] через Multicall3 одним eth_call
+    на чанк и возвращает {key: (success, returnData) | Exception}. Временные ошибки
+    повторяются по policy; чанк, который узел не смог выполнить (лимит газа,
+    размер ответа), делится пополам и запрашивается повторно.
+    """
+    results = {}
+    chunk_size = max(1, int(chunk_size))
+    pending = [calls[i:i + chunk_size] for i in range(0, len(calls), chunk_size)]
+    pending.reverse()
+    on_retry = metrics.retry_callback(metrics.network_of(rpc_url), "eth_call")
+    while pending:
+        chunk = pending.pop()
+        call = {
+            "to": contract,
+            "data": encode_aggregate3([(target, calldata) for _, target, calldata in chunk]),
+            "gas": hex(gas_per_call * len(chunk) + 100_000),
+        }
+        try:
+            returns = decode_aggregate3(retry_blocking(
+                lambda: rpc_call(session, rpc_url, "eth_call", [call, block]), policy, on_retry
+            ))
+            if len(returns) != len(chunk):
+                raise RpcError(f"Ожидалось {len(chunk)} результатов, получено {len(returns)}")
+        except Exception as e:
+            if len(chunk) > 1 and not is_retryable(e):
+                middle = len(chunk) // 2
+                pending.append(chunk[middle:])
+                pending.append(chunk[:middle])
+                continue
+            for key, _, _ in chunk:
+                results[key] = e
+            if on_chunk:
+                on_chunk(len(chunk))
+            continue
+
+        for (key, _, _), returned in zip(chunk, returns):
+            results[key] = returned
+        if on_chunk:
+            on_chunk(len(chunk))
+    return results
+
+
+def get_balances_multicall(session, rpc_url, contract, addresses, chunk_size,
+                           block="latest", on_chunk=None, policy=None):
+    """
+    Возвращает {address: баланс в wei | Exception}, читая балансы через Multicall3
+    (getEthBalance) одним eth_call на чанк.
+    """
+    balances = {}
+    calls = []
+    for address in dict.fromkeys(addresses):
+        try:
+            calldata = GET_ETH_BALANCE_SELECTOR + _address_bytes(address).rjust(32, b"\0")
+        except ValueError as e:
+            balances[address] = e
+            continue
+        calls.append((address, contract, calldata))
+    if on_chunk and balances:
+        on_chunk(len(balances))
+
+    for address, returned in run_aggregate3(session, rpc_url, contract, calls, chunk_size, block,
+                                            on_chunk, policy).items():
+        if isinstance(returned, Exception):
+            balances[address] = returned
+        else:
+            value = decode_uint(*returned)
+            balances[address] = value if value is not None else RpcError("getEthBalance завершился ошибкой")
+    return balances
@@ -0,0 +1,159 @@
+"""
+Колоночный буфер результатов перед записью в итоговый файл.
+
+Чекеры передают суммы целыми числами в базовых единицах (wei, uatom) — без
+округлений и float. ResultStore складывает их в непрерывные массивы (младшие и
+старшие 64 бита отдельно), а перевод в десятичные единицы с округлением и итоги
+по колонкам считает сразу для блока строк при сбросе в файл. Так значения точные,
+а на строку не создаются промежуточные объекты Decimal до самой записи.
+"""
+from array import array
+from decimal import Decimal
+
+MASK64 = (1 << 64) - 1
+WIDE = 1 << 128
+# Наибольший делитель для numpy: остаток, умноженный на 2, ещё укладывается в uint64
+MAX_NUMPY_UNIT = 1 << 63
+
+
+def format_amount(value, decimals, places):
+    """
+    Сумма в базовых единицах -> Decimal с places знаками после запятой
+    (банковское округление, как у round(Decimal)). Нецелые значения ("-", None,
+    уже отформатированные числа из журнала прошлой версии) возвращаются как есть.
+    """
+    if not isinstance(value, int) or isinstance(value, bool):
+        return value
+    if decimals > places:
+        unit = 10 ** (decimals - places)
+        scaled, remainder = divmod(value, unit)
+        if remainder * 2 > unit or (remainder * 2 == unit and scaled & 1):
+            scaled += 1
+    else:
+        scaled = value * 10 ** (places - decimals)
+    return Decimal(scaled).scaleb(-places) if scaled else Decimal(0)
+
+
+def format_row(row, columns, amounts, places):
+    """Копия строки (dict или список по columns) с суммами в десятичных единицах — для показа в GUI."""
+    if isinstance(row, dict):
+        return {column: format_amount(value, amounts[column], places) if column in amounts else value
+                for column, value in row.items()}
+    return [format_amount(value, amounts[column], places) if column in amounts else value
+            for column, value in zip(columns, row)]
+
+
+class ResultStore:
+    """
+    Буфер перед ResultWriter с тем же интерфейсом write/write_many/close.
+    amounts — {колонка: число знаков базовой единицы} (18 для wei, 6 для uatom);
+    остальные колонки (адрес, высота блока) пишутся как есть. Каждые block_size
+    строк блок переводится в Decimal с places знаками и записывается в файл;
+    точные суммы по колонкам копятся в totals (в базовых единицах).
+    """
+
+    def __init__(self, writer, amounts, places, block_size=10000):
+        self.writer = writer
+        self.columns = writer.columns
+        self.amounts = {column: decimals for column, decimals in amounts.items() if column in self.columns}
+        self.places = places
+        self.block_size = block_size
+        self.totals = dict.fromkeys(self.amounts, 0)
+        self._reset()
+
+    @property
+    def path(self):
+        return self.writer.path
+
+    @property
+    def rows_written(self):
+        return self.writer.rows_written
+
+    def _reset(self):
+        self._size = 0
+        self._text = {column: [] for column in self.columns if column not in self.amounts}
+        self._low = {column: array("Q") for column in self.amounts}
+        self._high = {column: array("Q") for column in self.amounts}
+        # Ячейки, не являющиеся суммой до 2^128: None, "-", значения из старого журнала, огромные числа
+        self._special = {column: {} for column in self.amounts}
+
+    def write(self, row):
+        values = [row.get(column) for column in self.columns] if isinstance(row, dict) else row
+        index = self._size
+        for column, value in zip(self.columns, values):
+            text = self._text.get(column)
+            if text is not None:
+                text.append(value)
+                continue
+            if isinstance(value, int) and not isinstance(value, bool) and 0 <= value < WIDE:
+                self._low[column].append(value & MASK64)
+                self._high[column].append(value >> 64)
+            else:
+                self._low[column].append(0)
+                self._high[column].append(0)
+                self._special[column][index] = value
+        self._size += 1
+        if self._size >= self.block_size:
+            self.flush()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        if not self._size:
+            return
+        cells = dict(self._text)
+        for column, decimals in self.amounts.items():
+            cells[column] = self._convert(column, decimals)
+        for values in zip(*(cells[column] for column in self.columns)):
+            self.writer.write(list(values))
+        self._reset()
+
+    def _convert(self, column, decimals):
+        import numpy as np
+
+        low = np.frombuffer(self._low[column], dtype=np.uint64)
+        high = np.frombuffer(self._high[column], dtype=np.uint64)
+        special = self._special[column]
+        places = self.places
+        if not high.any() and 10 ** max(decimals - places, 0) <= MAX_NUMPY_UNIT:
+            # Все суммы укладываются в 64 бита: деление и округление одним проходом numpy
+            raw = low.tolist()
+            if decimals > places:
+                unit = np.uint64(10 ** (decimals - places))
+                scaled, remainder = np.divmod(low, unit)
+                twice = remainder * np.uint64(2)
+                scaled += (twice > unit) | ((twice == unit) & (scaled % np.uint64(2) == 1))
+                scaled = scaled.tolist()
+            else:
+                factor = 10 ** (places - decimals)
+                scaled = raw if factor == 1 else [value * factor for value in raw]
+            values = [Decimal(value).scaleb(-places) if value else Decimal(0) for value in scaled]
+        else:
+            # Суммы шире 64 бит или делитель больше uint64 (токены с 24+ знаками) — точная арифметика Python
+            raw = [(h << 64) | l for l, h in zip(low.tolist(), high.tolist())]
+            values = [format_amount(value, decimals, places) for value in raw]
+
+        total = sum(raw)
+        for index, value in special.items():
+            values[index] = format_amount(value, decimals, places)
+            if isinstance(value, int) and not isinstance(value, bool):
+                total += value
+        self.totals[column] += total
+        return values
+
+    def format_totals(self):
+        """Итоги по колонкам сумм в десятичных единицах."""
+        return {column: format_amount(total, self.amounts[column], self.places)
+                for column, total in self.totals.items()}
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,229 @@
+import asyncio
+import random
+import sys
+import time
+from collections import deque
+
+# HTTP-статусы, после которых запрос имеет смысл повторить
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# Коды JSON-RPC: превышение лимитов провайдера и внутренняя ошибка узла
+RETRYABLE_RPC_CODES = {-32005, -32603}
+THROTTLE_MARKERS = ("rate limit", "too many requests", "limit exceeded", "capacity")
+
+
+class HTTPStatusError(Exception):
+    """Ответ с неуспешным HTTP-статусом; retry_after — значение заголовка Retry-After в секундах."""
+
+    def __init__(self, status, retry_after=None, message=None):
+        super().__init__(message or f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Заголовок Retry-After: число секунд или HTTP-дата."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+def _status_of(error):
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return status
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after_of(error):
+    if getattr(error, "retry_after", None) is not None:
+        return error.retry_after
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None)
+    if headers:
+        return parse_retry_after(headers.get("Retry-After"))
+    return None
+
+
+def _is_network_error(error):
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    # Библиотеки HTTP проверяем только если они уже загружены, чтобы не тянуть лишние импорты
+    requests = sys.modules.get("requests")
+    if requests and isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return True
+    aiohttp = sys.modules.get("aiohttp")
+    if aiohttp and isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError,
+                                      aiohttp.ClientPayloadError)):
+        return True
+    return False
+
+
+def _code_of(error):
+    """Код ошибки JSON-RPC: атрибут code, словарь в аргументах (web3) или rpc_response."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    payload = getattr(error, "rpc_response", None)
+    if isinstance(payload, dict):
+        payload = payload.get("error")
+    elif error.args and isinstance(error.args[0], dict):
+        payload = error.args[0]
+    code = payload.get("code") if isinstance(payload, dict) else None
+    return code if isinstance(code, int) else None
+
+
+def is_throttled(error):
+    if _status_of(error) == 429:
+        return True
+    message = str(error).lower()
+    if _code_of(error) == -32005 or any(marker in message for marker in THROTTLE_MARKERS):
+        return True
+    return error.__cause__ is not None and is_throttled(error.__cause__)
+
+
+def is_retryable(error):
+    """Классификация ошибки: True — временная (429, 5xx, таймауты, обрывы), False — фатальная."""
+    status = _status_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    if _code_of(error) in RETRYABLE_RPC_CODES:
+        return True
+    if is_throttled(error) or _is_network_error(error):
+        return True
+    # Обёртки (например, BatchRejected поверх таймаута requests) классифицируем по исходной ошибке
+    return error.__cause__ is not None and is_retryable(error.__cause__)
+
+
+class RetryPolicy:
+    """Повторы с экспоненциальной задержкой и полным джиттером; Retry-After имеет приоритет."""
+
+    def __init__(self, max_attempts=5, base_delay=0.5, max_delay=30.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, error=None):
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = retry_after_of(error) if error is not None else None
+        if retry_after is not None:
+            return min(self.max_delay, max(backoff, retry_after))
+        return backoff
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+def retry_blocking(func, policy=None, on_retry=None):
+    """Вызывает func() с повторами временных ошибок (для кода в потоках executor'а)."""
+    policy = policy or DEFAULT_POLICY
+    for attempt in range(policy.max_attempts):
+        try:
+            return func()
+        except Exception as e:
+            if attempt + 1 >= policy.max_attempts or not is_retryable(e):
+                raise
+            if on_retry:
+                on_retry(e, attempt)
+            time.sleep(policy.delay(attempt, e))
+
+
+async def retry_async(func, policy=None, limiter=None, on_retry=None):
+    """
+    Выполняет корутину func() с повторами временных ошибок. Если передан limiter
+    (AdaptiveLimiter), запрос выполняется под ним, а троттлинг уменьшает его лимит.
+    """
+    policy = policy or DEFAULT_POLICY
+    for attempt in range(policy.max_attempts):
+        try:
+            if limiter:
+                async with limiter:
+                    result = await func()
+                limiter.on_success()
+            else:
+                result = await func()
+            return result
+        except Exception as e:
+            if limiter and is_throttled(e):
+                limiter.on_throttle()
+            if attempt + 1 >= policy.max_attempts or not is_retryable(e):
+                raise
+            if on_retry:
+                on_retry(e, attempt)
+            await asyncio.sleep(policy.delay(attempt, e))
+
+
+class AdaptiveLimiter:
+    """
+    Лимит одновременных запросов к эндпоинту по схеме AIMD: +1/limit за каждый
+    успешный ответ, уменьшение вдвое при троттлинге (не чаще раза в cooldown секунд,
+    чтобы пачка одновременных 429 не обнулила лимит). Не привязан к циклу событий,
+    поэтому один объект можно использовать в разных запусках asyncio.run.
+    """
+
+    def __init__(self, limit, min_limit=1, max_limit=None, cooldown=1.0):
+        self.max_limit = float(max_limit or limit)
+        self.min_limit = float(min_limit)
+        self.limit = float(limit)
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._waiters = deque()
+        self._last_decrease = float("-inf")
+
+    async def __aenter__(self):
+        while self.in_flight >= max(1, int(self.limit)):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        free = max(1, int(self.limit)) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def on_success(self):
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    def on_throttle(self):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        previous = self.limit
+        self.limit = max(self.min_limit, self.limit / 2)
+        if int(previous) != int(self.limit):
+            print(f"Троттлинг: лимит одновременных запросов снижен до {int(self.limit)}")
+
+
+def load_retry_policy(config):
+    """Читает секцию [Retry]; при её отсутствии возвращает политику по умолчанию."""
+    if config is None or not config.has_section("Retry"):
+        return DEFAULT_POLICY
+    return RetryPolicy(
+        max_attempts=config.getint("Retry", "max_attempts", fallback=5),
+        base_delay=config.getfloat("Retry", "base_delay", fallback=0.5),
+        max_delay=config.getfloat("Retry", "max_delay", fallback=30.0),
+    )
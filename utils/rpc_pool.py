@@ -0,0 +1,250 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+from utils import metrics
+from utils.retry import AdaptiveLimiter, is_throttled
+
+# Формат списка эндпоинтов в секции [RPCs]: адреса через запятую, вес — после "|":
+#   ethereum = https://rpc-a.example|3, https://rpc-b.example
+DEFAULT_WEIGHT = 1.0
+
+
+def parse_endpoints(value):
+    """Разбирает строку из [RPCs] в список (url, weight)."""
+    endpoints = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        url, _, weight = item.partition("|")
+        try:
+            weight = float(weight) if weight.strip() else DEFAULT_WEIGHT
+        except ValueError:
+            raise ValueError(f"Некорректный вес эндпоинта: {item}")
+        endpoints.append((url.strip(), max(weight, 0.01)))
+    return endpoints
+
+
+def format_endpoints(endpoints):
+    """Обратное преобразование для записи в config.ini."""
+    parts = []
+    for url, weight in endpoints:
+        parts.append(url if weight == DEFAULT_WEIGHT else f"{url}|{weight:g}")
+    return ", ".join(parts)
+
+
+class Endpoint:
+    """Эндпоинт сети и наблюдаемая статистика: задержки, ошибки, исключение из ротации."""
+
+    def __init__(self, url, weight=DEFAULT_WEIGHT, window=200, max_in_flight=8):
+        self.url = url
+        self.weight = weight
+        # Лимит одновременных запросов к эндпоинту: снижается при троттлинге (AIMD)
+        self.limiter = AdaptiveLimiter(max_in_flight)
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True — успех, False — ошибка
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ewma = None
+
+    @property
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def p95(self):
+        if len(self.latencies) < 2:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def score(self):
+        """Чем меньше, тем лучше: сглаженная задержка с поправкой на ошибки и вес."""
+        latency = self.ewma if self.ewma is not None else 0.0
+        return (latency + 0.05) * (1 + 4 * self.error_rate) / self.weight
+
+
+class EndpointPool:
+    """
+    Пул эндпоинтов одной сети. Запросы направляются на эндпоинт с лучшей
+    наблюдаемой задержкой и долей ошибок (с учётом весов); после eject_after
+    ошибок подряд эндпоинт исключается из ротации на eject_seconds секунд.
+    При hedge=True медленный запрос дублируется на второй эндпоинт, если первый
+    не ответил за свою p95-задержку. Асинхронные запросы к каждому эндпоинту
+    ограничены его AdaptiveLimiter: при ответах 429 лимит уменьшается вдвое.
+    """
+
+    def __init__(self, network, endpoints, eject_after=3, eject_seconds=60,
+                 hedge=False, hedge_min_samples=20, max_in_flight=8):
+        if not endpoints:
+            raise ValueError(f"Для сети {network} не задан ни один RPC-эндпоинт")
+        self.network = network
+        self.endpoints = [Endpoint(url, weight, max_in_flight=max_in_flight)
+                          for url, weight in endpoints]
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self._lock = threading.Lock()
+
+    @property
+    def urls(self):
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def choose(self, exclude=()):
+        """Выбирает эндпоинт: из двух случайных (с учётом веса) берётся лучший по score."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e not in exclude and e.ejected_until <= now]
+            if not candidates:
+                # Все исключены — берём тот, чей срок исключения истекает раньше
+                candidates = [e for e in self.endpoints if e not in exclude] or self.endpoints
+                return min(candidates, key=lambda e: e.ejected_until)
+            if len(candidates) == 1:
+                return candidates[0]
+            weights = [e.weight for e in candidates]
+            first, second = random.choices(candidates, weights=weights, k=2)
+            return min((first, second), key=Endpoint.score)
+
+    def record(self, endpoint, latency, ok):
+        with self._lock:
+            endpoint.outcomes.append(ok)
+            if ok:
+                endpoint.latencies.append(latency)
+                endpoint.ewma = latency if endpoint.ewma is None else 0.8 * endpoint.ewma + 0.2 * latency
+                endpoint.consecutive_failures = 0
+            else:
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= self.eject_after:
+                    endpoint.ejected_until = time.monotonic() + self.eject_seconds
+                    endpoint.consecutive_failures = 0
+                    print(f"[{self.network}] Эндпоинт {endpoint.url} исключён на {self.eject_seconds} с")
+
+    def call(self, func, endpoint=None):
+        """Выполняет блокирующий func(url) на выбранном эндпоинте и учитывает результат."""
+        endpoint = endpoint or self.choose()
+        started = time.monotonic()
+        try:
+            result = func(endpoint.url)
+        except Exception:
+            self.record(endpoint, time.monotonic() - started, False)
+            raise
+        self.record(endpoint, time.monotonic() - started, True)
+        return result
+
+    async def call_async(self, func, run):
+        """
+        Выполняет func(url) через run(blocking_callable) (например, Scheduler.run).
+        Если включено хеджирование, по истечении p95 основного эндпоинта
+        отправляется дублирующий запрос на другой, побеждает первый успешный ответ.
+        """
+        primary = self.choose()
+        first = asyncio.ensure_future(self._call_limited(func, run, primary))
+        delay = self._hedge_delay(primary)
+        if delay is None:
+            return await first
+
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        secondary = self.choose(exclude=(primary,))
+        if secondary is primary:
+            return await first
+        second = asyncio.ensure_future(self._call_limited(func, run, secondary))
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    # Проигравший запрос в executor'е отменить нельзя — просто не ждём его
+                    for other in pending:
+                        other.cancel()
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    async def _call_limited(self, func, run, endpoint):
+        async with endpoint.limiter:
+            try:
+                result = await run(self.call, func, endpoint)
+            except Exception as e:
+                if is_throttled(e):
+                    endpoint.limiter.on_throttle()
+                raise
+        endpoint.limiter.on_success()
+        return result
+
+    def _hedge_delay(self, endpoint):
+        if not self.hedge or len(self.endpoints) < 2:
+            return None
+        if len(endpoint.latencies) < self.hedge_min_samples:
+            return None
+        return endpoint.p95()
+
+    def session(self, get_session):
+        """Обёртка с интерфейсом requests.Session для пакетных запросов через пул."""
+        return PooledSession(self, get_session)
+
+
+class PooledSession:
+    """
+    Подменяет session.post(url, ...) так, что url выбирается пулом, а задержка
+    и результат (HTTP 200 или ошибка) учитываются в статистике эндпоинта.
+    """
+
+    def __init__(self, pool, get_session):
+        self._pool = pool
+        self._get_session = get_session
+
+    def post(self, _url, **kwargs):
+        def send(url):
+            response = self._get_session(url).post(url, **kwargs)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise EndpointHTTPError(response)
+            return response
+
+        try:
+            return self._pool.call(send)
+        except EndpointHTTPError as e:
+            return e.response
+
+
+class EndpointHTTPError(Exception):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+_pools = {}  # network -> (спецификация, EndpointPool)
+
+
+def get_pool(network, spec, settings):
+    """
+    Возвращает пул сети, переиспользуя его (вместе со статистикой) между запусками,
+    пока список эндпоинтов и настройки пула не изменились.
+    """
+    key = (spec, tuple(sorted(settings.items())))
+    metrics.register_endpoints(network, [url for url, _ in parse_endpoints(spec)])
+    cached = _pools.get(network)
+    if cached and cached[0] == key:
+        return cached[1]
+    pool = EndpointPool(network, parse_endpoints(spec), **settings)
+    _pools[network] = (key, pool)
+    return pool
+
+
+def load_pool_settings(config):
+    """Читает секцию [RPCPool]."""
+    return {
+        "eject_after": config.getint("RPCPool", "eject_after", fallback=3),
+        "eject_seconds": config.getfloat("RPCPool", "eject_seconds", fallback=60.0),
+        "hedge": config.getboolean("RPCPool", "hedge", fallback=False),
+        "hedge_min_samples": config.getint("RPCPool", "hedge_min_samples", fallback=20),
+        # Начальный и максимальный лимит AIMD на эндпоинт — как лимит запросов на сеть
+        "max_in_flight": config.getint("Performance", "network_concurrency", fallback=8),
+    }
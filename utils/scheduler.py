@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов: rate токенов в секунду, не более burst подряд.
+    Потокобезопасен, поэтому один и тот же бакет можно использовать и из корутин,
+    и из синхронного кода, выполняющегося в executor'е.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst else max(1.0, self.rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Забирает токен и возвращает, сколько секунд нужно подождать до его появления."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    async def acquire(self):
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def acquire_blocking(self):
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+
+class RunCancelled(BaseException):
+    """
+    Запуск остановлен (Scheduler.cancel). Наследует BaseException, как asyncio.CancelledError:
+    обработчики except Exception не записывают его как ошибку адреса и не повторяют запрос,
+    поэтому пакетный цикл в потоке executor'а завершается на следующем POST.
+    """
+
+
+class ThrottledSession:
+    """
+    Обёртка над requests.Session: ограничивает частоту POST-запросов токен-бакетом
+    (если он задан) и прерывает запросы остановленного запуска.
+    """
+
+    def __init__(self, session, bucket, cancelled):
+        self._session = session
+        self._bucket = bucket
+        self._cancelled = cancelled
+
+    def post(self, *args, **kwargs):
+        if self._bucket:
+            self._bucket.acquire_blocking()
+        if self._cancelled.is_set():
+            raise RunCancelled()
+        return self._session.post(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class Scheduler:
+    """
+    Планировщик запросов к сетям: общий лимит одновременных запросов,
+    лимит на каждую сеть и токен-бакет с ограничением частоты по сети.
+    Создаётся внутри работающего цикла событий (семафоры привязаны к нему).
+    """
+
+    def __init__(self, max_concurrency=32, network_concurrency=8, rate_limits=None):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.network_concurrency = max(1, int(network_concurrency))
+        self._global = asyncio.Semaphore(self.max_concurrency)
+        self._networks = {}
+        self._buckets = {
+            network: TokenBucket(rate) for network, rate in (rate_limits or {}).items() if rate > 0
+        }
+        # Событие остановки читается и из потоков executor'а, поэтому threading, а не asyncio
+        self._cancelled = threading.Event()
+
+    def _network_semaphore(self, network):
+        if network not in self._networks:
+            self._networks[network] = asyncio.Semaphore(self.network_concurrency)
+        return self._networks[network]
+
+    def throttle(self, network, session):
+        """
+        Возвращает сессию для синхронных пакетных запросов: соблюдает лимит частоты
+        сети и после cancel() поднимает RunCancelled вместо отправки запроса.
+        """
+        return ThrottledSession(session, self._buckets.get(network), self._cancelled)
+
+    def cancel(self):
+        """Останавливает запуск: новые пакетные запросы больше не отправляются."""
+        self._cancelled.set()
+
+    async def run(self, network, func, *args):
+        """Выполняет блокирующий вызов func(*args) в executor'е с учётом всех лимитов."""
+        async with self._global, self._network_semaphore(network):
+            bucket = self._buckets.get(network)
+            if bucket:
+                await bucket.acquire()
+            return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+def load_rate_limits(config):
+    """Читает секцию [RateLimits]: запросов в секунду на сеть, 0 — без ограничения."""
+    if config is None or not config.has_section('RateLimits'):
+        return {}
+    return {network: config.getfloat('RateLimits', network, fallback=0.0)
+            for network in config['RateLimits']}
@@ -0,0 +1,186 @@
+"""
+Шардированный запуск проверки: список адресов делится между процессами.
+
+Один цикл событий упирается в одно ядро (разбор JSON, форматирование web3,
+округления), задолго до исчерпания квот RPC. В режиме шардов ([Performance] shards > 1)
+каждый процесс получает свою часть адресов, свой цикл событий, свои соединения
+и долю лимитов частоты и параллельности. Готовые строки, ошибки, прогресс и метрики
+запросов возвращаются пачками в основной процесс — он единственный пишет журнал,
+итоговый файл и отчёт об ошибках.
+"""
+import math
+import multiprocessing
+import queue
+import threading
+import time
+
+from utils import metrics
+from utils.failure_report import format_error
+
+# Меньшие списки не делим: запуск процесса дороже выигрыша
+MIN_SHARD_SIZE = 1000
+# Шард отправляет строки пачкой, когда их накопилось столько или прошло столько секунд
+FLUSH_ROWS = 500
+FLUSH_SECONDS = 0.25
+
+# Лимиты параллельности, которые делятся между шардами, и их значения по умолчанию
+SHARED_LIMITS = (
+    ("Performance", "max_concurrency", 32),
+    ("Performance", "network_concurrency", 8),
+    ("Cosmos", "max_in_flight", 16),
+)
+
+
+def load_shard_count(config):
+    """Число процессов-шардов из [Performance] shards; 1 — без шардов."""
+    return max(1, config.getint("Performance", "shards", fallback=1))
+
+
+def split_shards(items, shards):
+    """Делит список на непрерывные части не меньше MIN_SHARD_SIZE (не больше shards частей)."""
+    count = max(1, min(shards, len(items) // MIN_SHARD_SIZE))
+    size = math.ceil(len(items) / count) if items else 0
+    return [items[start:start + size] for start in range(0, len(items), size)] if items else []
+
+
+def shard_config(config, shards):
+    """
+    Конфигурация процесса-шарда в виде словаря для ConfigParser.read_dict: лимиты
+    частоты из [RateLimits] и лимиты параллельности делятся поровну между шардами,
+    журнал, снимок и экспорт метрик остаются за основным процессом.
+    """
+    values = {section: dict(config.items(section, raw=True)) for section in config.sections()}
+    for network in list(values.get("RateLimits", {})):
+        rate = config.getfloat("RateLimits", network, fallback=0.0)
+        values["RateLimits"][network] = repr(rate / shards) if rate > 0 else "0"
+    for section, option, default in SHARED_LIMITS:
+        limit = config.getint(section, option, fallback=default)
+        values.setdefault(section, {})[option] = str(max(1, math.ceil(limit / shards)))
+    values["Journal"] = {"enabled": "False"}
+    values["Snapshot"] = {"enabled": "False"}
+    values["Metrics"] = {"summary": "False", "prometheus_port": "0"}
+    return values
+
+
+class ShardChannel:
+    """
+    Сторона процесса-шарда: копит строки, ошибки и прогресс и отправляет их пачкой
+    вместе с приращением метрик. Интерфейс add() совпадает с FailureReport.
+    """
+
+    def __init__(self, index, channel, stop):
+        self.index = index
+        self._channel = channel
+        self._stop = stop
+        self._rows = []
+        self._failures = []
+        self._progress = None
+        self._flushed = time.monotonic()
+        self._lock = threading.Lock()
+
+    def row(self, row):
+        with self._lock:
+            self._rows.append(row)
+        self._maybe_flush()
+
+    def progress(self, percent):
+        self._progress = percent
+        self._maybe_flush()
+
+    def add(self, address, chain, query, error):
+        with self._lock:
+            self._failures.append((address, chain, query, format_error(error)))
+
+    def is_interrupted(self):
+        return self._stop.is_set()
+
+    def _maybe_flush(self):
+        if len(self._rows) >= FLUSH_ROWS or time.monotonic() - self._flushed >= FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+            failures, self._failures = self._failures, []
+            progress, self._progress = self._progress, None
+            self._flushed = time.monotonic()
+        series, retries = metrics.take_delta()
+        self._channel.put(("batch", self.index, rows, failures, progress, series, retries))
+
+
+def _shard_main(target, index, payload, channel, stop):
+    shard = ShardChannel(index, channel, stop)
+    try:
+        target(payload, shard)
+        shard.flush()
+    except BaseException as e:
+        shard.flush()
+        channel.put(("error", index, format_error(e)))
+    finally:
+        channel.put(("done", index))
+
+
+def run_shards(target, payloads, on_rows, on_failure=None, progress_callback=None, is_interrupted=None):
+    """
+    Запускает target(payload, shard) в отдельном процессе на каждый payload.
+    target должен быть функцией уровня модуля, а payload — сериализуемым pickle:
+    процессы запускаются методом spawn (fork в процессе с потоками Qt небезопасен).
+    Пачки строк передаются в on_rows, ошибки — в on_failure(address, chain, query, text),
+    прогресс всех шардов сводится в один progress_callback(0–100). Если is_interrupted()
+    вернул True, шардам отправляется сигнал остановки. Ошибка любого шарда поднимается
+    как RuntimeError после завершения остальных.
+    """
+    context = multiprocessing.get_context("spawn")
+    channel = context.Queue()
+    stop = context.Event()
+    sizes = [len(payload["addresses"]) for payload in payloads]
+    total = sum(sizes) or 1
+    percents = [0] * len(payloads)
+    processes = [
+        context.Process(target=_shard_main, args=(target, index, payload, channel, stop), daemon=True)
+        for index, payload in enumerate(payloads)
+    ]
+    for process in processes:
+        process.start()
+    print(f"Запущено процессов-шардов: {len(processes)}")
+
+    running = set(range(len(processes)))
+    errors = []
+    try:
+        while running:
+            if is_interrupted and is_interrupted() and not stop.is_set():
+                stop.set()
+            try:
+                message = channel.get(timeout=0.2)
+            except queue.Empty:
+                # Процесс, завершившийся без "done", упал (например, был убит системой)
+                for index in [index for index in running if not processes[index].is_alive()]:
+                    running.discard(index)
+                    errors.append(f"шард {index}: процесс завершился с кодом {processes[index].exitcode}")
+                continue
+            kind, index, *rest = message
+            if kind == "batch":
+                rows, failures, percent, series, retries = rest
+                metrics.merge_delta(series, retries)
+                if on_failure:
+                    for failure in failures:
+                        on_failure(*failure)
+                if rows:
+                    on_rows(rows)
+                if percent is not None and progress_callback:
+                    percents[index] = percent
+                    progress_callback(int(sum(p * n for p, n in zip(percents, sizes)) / total))
+            elif kind == "error":
+                errors.append(f"шард {index}: {rest[0]}")
+                # Остальные шарды тоже останавливаем: запуск всё равно придётся продолжить
+                stop.set()
+            elif kind == "done":
+                running.discard(index)
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+    if errors:
+        raise RuntimeError("; ".join(errors))
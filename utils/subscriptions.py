@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from utils.retry import DEFAULT_POLICY
+
+# Отдаётся генератором subscribe() после каждого (пере)подключения: события, пришедшие
+# во время обрыва, потеряны, поэтому потребителю нужно заново сверить состояние
+RESUBSCRIBED = object()
+
+
+class SubscriptionError(Exception):
+    """Узел отклонил подписку."""
+
+
+async def subscribe(url, method, params, is_interrupted=None, policy=None, poll_interval=1.0):
+    """
+    Подписка JSON-RPC поверх websocket (eth_subscribe, CometBFT subscribe).
+    Асинхронный генератор: отдаёт RESUBSCRIBED после подключения, затем полезную
+    нагрузку каждого уведомления. При обрыве соединения переподключается
+    с экспоненциальной задержкой; завершается, когда is_interrupted() вернёт True.
+    """
+    async for payload in subscribe_many(url, method, [params], is_interrupted, policy, poll_interval):
+        yield payload
+
+
+def _is_confirmation(message, waiting):
+    # Подтверждение — ответ на запрос подписки: id подписки (eth_subscribe) или пустой
+    # объект (CometBFT). События CometBFT приходят с тем же id, но с непустым result
+    result = message.get("result")
+    return message.get("id") in waiting and "params" not in message and not (isinstance(result, dict) and result)
+
+
+async def subscribe_many(url, method, params_list, is_interrupted=None, policy=None, poll_interval=1.0):
+    """
+    То же, что subscribe, для нескольких подписок на одном соединении: уведомления
+    всех подписок идут одним потоком. RESUBSCRIBED отдаётся, когда узел подтвердил
+    все подписки; события, пришедшие раньше, не отдаются — потребитель всё равно
+    сверяет состояние после RESUBSCRIBED.
+    """
+    from websockets.asyncio.client import connect
+    from websockets.exceptions import WebSocketException
+
+    policy = policy or DEFAULT_POLICY
+    attempt = 0
+    requests = [json.dumps({"jsonrpc": "2.0", "id": number, "method": method, "params": params})
+                for number, params in enumerate(params_list, start=1)]
+
+    def interrupted():
+        return is_interrupted is not None and is_interrupted()
+
+    while not interrupted():
+        try:
+            async with connect(url, max_size=None) as ws:
+                for request in requests:
+                    await ws.send(request)
+                waiting = set(range(1, len(requests) + 1))
+                while waiting:
+                    reply = json.loads(await asyncio.wait_for(ws.recv(), timeout=30))
+                    if "error" in reply:
+                        raise SubscriptionError(reply["error"])
+                    if _is_confirmation(reply, waiting):
+                        waiting.discard(reply["id"])
+                attempt = 0
+                yield RESUBSCRIBED
+                while not interrupted():
+                    try:
+                        message = await asyncio.wait_for(ws.recv(), timeout=poll_interval)
+                    except asyncio.TimeoutError:
+                        continue
+                    data = json.loads(message)
+                    # eth_subscribe присылает данные в params.result, CometBFT — в result
+                    payload = data["params"].get("result") if "params" in data else data.get("result")
+                    if payload:
+                        yield payload
+        except (OSError, asyncio.TimeoutError, WebSocketException) as e:
+            if interrupted():
+                return
+            delay = policy.delay(min(attempt, 10))
+            attempt += 1
+            print(f"Подписка {url} прервана: {e}. Переподключение через {delay:.1f} с")
+            await asyncio.sleep(delay)
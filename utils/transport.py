@@ -0,0 +1,250 @@
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from utils import metrics
+
+# Общий транспортный слой для обоих чекеров. Сессии и провайдеры живут на уровне
+# модуля, поэтому переиспользуются между запусками в рамках одного сеанса приложения.
+
+DEFAULT_POOL_SIZE = 32
+DEFAULT_DNS_TTL = 300
+# Бюджет одного HTTP-запроса, секунд: медленный эндпоинт не держит запуск дольше
+DEFAULT_REQUEST_TIMEOUT = 30
+
+_lock = threading.Lock()
+_pool_size = DEFAULT_POOL_SIZE
+_sessions = {}  # (scheme, host) -> requests.Session
+_providers = {}  # (network, rpc_url) -> Web3
+
+_request_timeout = DEFAULT_REQUEST_TIMEOUT
+_dns_ttl = DEFAULT_DNS_TTL
+
+
+class DnsCache:
+    """
+    Кэш разрешения имён с TTL для одной сессии. Глобальный socket.getaddrinfo не
+    подменяется: разрешение имён у Qt, websockets и остального кода процесса не меняется.
+    Хранятся все адреса хоста, как их вернул резолвер: соединение перебирает их по
+    очереди, недоступный адрес уходит в конец списка, а если недоступны все — запись
+    удаляется и следующее соединение разрешает имя заново.
+    """
+
+    def __init__(self, ttl, resolver=None):
+        self.ttl = ttl
+        self.resolver = resolver or socket.getaddrinfo
+        self._entries = {}  # (host, port) -> (срок годности, [IP-адреса])
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((host, port))
+            if entry and entry[0] > now:
+                return list(entry[1])
+        addresses = list(dict.fromkeys(info[4][0] for info in self.resolver(host, port, 0, socket.SOCK_STREAM)))
+        with self._lock:
+            self._entries[host, port] = (now + self.ttl, addresses)
+        return list(addresses)
+
+    def demote(self, host, port, address):
+        """Переносит недоступный адрес в конец списка: следующие соединения начнут с остальных."""
+        with self._lock:
+            entry = self._entries.get((host, port))
+            if entry and address in entry[1]:
+                entry[1].remove(address)
+                entry[1].append(address)
+
+    def evict(self, host, port):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+# Ошибки установки соединения, после которых стоит попробовать следующий адрес хоста
+_CONNECT_ERRORS = (OSError, NewConnectionError, ConnectTimeoutError)
+
+
+class _CachedDnsConnection:
+    """Примесь к соединениям urllib3: TCP-соединение открывается по адресам из DnsCache адаптера."""
+
+    dns = None
+
+    def _new_conn(self):
+        # Имя подменяется только на время connect: SNI, проверка сертификата и
+        # заголовок Host по-прежнему используют имя хоста
+        host = self._dns_host
+        error = None
+        for address in self.dns.resolve(host, self.port):
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except _CONNECT_ERRORS as e:
+                error = e
+                self.dns.demote(host, self.port, address)
+            finally:
+                self._dns_host = host
+        self.dns.evict(host, self.port)
+        raise error or NewConnectionError(self, f"Имя {host} не разрешилось ни в один адрес")
+
+
+class CachedDnsAdapter(HTTPAdapter):
+    """HTTPAdapter, соединения которого разрешают имена через собственный DnsCache с TTL dns_ttl."""
+
+    def __init__(self, dns_ttl, resolver=None, **kwargs):
+        self.dns = DnsCache(dns_ttl, resolver)
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        attrs = {"dns": self.dns}
+        http = type("CachedDnsHTTPConnection", (_CachedDnsConnection, HTTPConnection), attrs)
+        https = type("CachedDnsHTTPSConnection", (_CachedDnsConnection, HTTPSConnection), attrs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type("CachedDnsHTTPConnectionPool", (HTTPConnectionPool,), {"ConnectionCls": http}),
+            "https": type("CachedDnsHTTPSConnectionPool", (HTTPSConnectionPool,), {"ConnectionCls": https}),
+        }
+
+
+def configure(config):
+    """
+    Применяет настройки секции [Transport]: размер пула соединений на хост, TTL DNS-кэша
+    и бюджет одного запроса (request_timeout, 0 — без ограничения).
+    """
+    global _pool_size, _dns_ttl, _request_timeout
+    pool_size = config.getint("Transport", "pool_size", fallback=DEFAULT_POOL_SIZE)
+    dns_ttl = config.getint("Transport", "dns_ttl", fallback=DEFAULT_DNS_TTL)
+    request_timeout = config.getfloat("Transport", "request_timeout", fallback=DEFAULT_REQUEST_TIMEOUT)
+    with _lock:
+        if request_timeout != _request_timeout:
+            # Таймаут провайдера web3 задаётся при создании — пересоздаём провайдеры
+            _request_timeout = request_timeout
+            _providers.clear()
+        if pool_size != _pool_size or dns_ttl != _dns_ttl:
+            # Размер пула и кэш DNS задаются при создании адаптера — пересоздаём сессии
+            _pool_size = pool_size
+            _dns_ttl = dns_ttl
+            for session in _sessions.values():
+                session.close()
+            _sessions.clear()
+            _providers.clear()
+
+
+class InstrumentedSession(requests.Session):
+    """Сессия requests, учитывающая каждый запрос в метриках: задержку, статус и объём данных."""
+
+    def send(self, request, **kwargs):
+        kwargs["timeout"] = _limit_timeout(kwargs.get("timeout"))
+        started = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            metrics.observe(request.url, time.perf_counter() - started, False, request.body)
+            raise
+        if kwargs.get("stream"):
+            received = int(response.headers.get("Content-Length") or 0)
+        else:
+            received = len(response.content)
+        metrics.observe(request.url, time.perf_counter() - started, response.status_code == 200,
+                        request.body, received)
+        return response
+
+
+def _limit_timeout(timeout):
+    """Таймаут запроса, не превышающий бюджет request_timeout (в том числе для пары (connect, read))."""
+    if _request_timeout <= 0:
+        return timeout
+    if timeout is None:
+        return _request_timeout
+    if isinstance(timeout, tuple):
+        return tuple(_request_timeout if part is None else min(part, _request_timeout) for part in timeout)
+    return min(timeout, _request_timeout)
+
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return parts.scheme, parts.netloc
+
+
+def get_session(url):
+    """Возвращает keep-alive сессию requests для хоста из url (одна на хост)."""
+    key = _host_key(url)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = InstrumentedSession()
+            if _dns_ttl > 0:
+                adapter = CachedDnsAdapter(_dns_ttl, pool_connections=1, pool_maxsize=_pool_size)
+            else:
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[key] = session
+        return session
+
+
+def get_web3(network, rpc_url):
+    """
+    Возвращает Web3 для эндпоинта сети, работающий поверх общей сессии хоста.
+    Провайдер создаётся один раз на эндпоинт; новый появляется, только если
+    RPC-адрес сети в config.ini изменился.
+    """
+    from web3 import Web3
+
+    session = get_session(rpc_url)
+    with _lock:
+        web3 = _providers.get((network, rpc_url))
+        if web3 is None:
+            request_kwargs = {"timeout": _request_timeout} if _request_timeout > 0 else None
+            web3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs=request_kwargs, session=session))
+            _providers[(network, rpc_url)] = web3
+        return web3
+
+
+def create_aiohttp_session(limit_per_host=None):
+    """
+    Создаёт aiohttp-сессию с пулом keep-alive соединений на хост и кэшем DNS.
+    Сессия привязана к циклу событий, поэтому создаётся на каждый запуск.
+    Запросы сессии учитываются в метриках.
+    """
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(
+        limit=0,
+        limit_per_host=limit_per_host or _pool_size,
+        ttl_dns_cache=_dns_ttl or None,
+        use_dns_cache=_dns_ttl > 0,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=_request_timeout or None),
+                                 trace_configs=[metrics.aiohttp_trace_config()])
+
+
+def close_sessions(urls):
+    """
+    Закрывает сессии хостов из urls и сбрасывает провайдеры этих эндпоинтов (при
+    остановке запуска): keep-alive соединения освобождаются, следующий запуск
+    откроет новые. Запрос, уже отправленный в другом потоке, завершается в
+    пределах request_timeout.
+    """
+    urls = set(urls)
+    keys = {_host_key(url) for url in urls}
+    with _lock:
+        for key in keys & _sessions.keys():
+            _sessions.pop(key).close()
+        for key in [key for key in _providers if key[1] in urls]:
+            del _providers[key]
+
+
+def close_all():
+    """Закрывает все сессии (например, при выходе из приложения)."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _providers.clear()
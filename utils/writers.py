@@ -0,0 +1,167 @@
+import csv
+import os
+from decimal import Decimal
+
+# Поддерживаемые форматы итогового файла и их расширения
+OUTPUT_FORMATS = {
+    "xlsx": ".xlsx",
+    "csv": ".csv",
+    "parquet": ".parquet",
+}
+
+
+class ResultWriter:
+    """
+    Базовый потоковый писатель результатов: строки записываются по мере готовности
+    и не накапливаются в памяти. Строка — dict с ключами из columns или список значений.
+    amounts — {колонка суммы: знаков после запятой}: форматы с типизированными
+    колонками пишут такие колонки десятичным типом без потери точности.
+    """
+
+    def __init__(self, path, columns, amounts=None):
+        self.path = path
+        self.columns = list(columns)
+        self.amounts = {column: places for column, places in (amounts or {}).items() if column in self.columns}
+        self.rows_written = 0
+
+    def _values(self, row):
+        if isinstance(row, dict):
+            return [row.get(column) for column in self.columns]
+        return list(row)
+
+    def write(self, row):
+        self._write_values(self._values(row))
+        self.rows_written += 1
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def _write_values(self, values):
+        raise NotImplementedError
+
+    def flush(self):
+        """Делает записанные строки видимыми в файле, если формат это позволяет."""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class XlsxWriter(ResultWriter):
+    """xlsx в режиме write-only openpyxl: строки сразу сериализуются во временный файл."""
+
+    def __init__(self, path, columns, amounts=None):
+        super().__init__(path, columns, amounts)
+        from openpyxl import Workbook
+
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("Sheet1")
+        self._sheet.append(self.columns)
+
+    def _write_values(self, values):
+        self._sheet.append(values)
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.save(self.path)
+            self._workbook = None
+
+
+class CsvWriter(ResultWriter):
+    def __init__(self, path, columns, amounts=None):
+        super().__init__(path, columns, amounts)
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.columns)
+
+    def _write_values(self, values):
+        self._writer.writerow(values)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class ParquetWriter(ResultWriter):
+    """
+    Parquet через pyarrow: строки буферизуются и сбрасываются группами по row_group_size.
+    Колонки сумм из amounts — decimal128(38, знаков) с точными значениями, остальные —
+    строки. Пустые и нечисловые ячейки сумм ("-" у выключенной сети) пишутся как null.
+    """
+
+    def __init__(self, path, columns, amounts=None, row_group_size=50_000):
+        super().__init__(path, columns, amounts)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ValueError("Для формата parquet требуется пакет pyarrow") from e
+        self._pa = pyarrow
+        self.row_group_size = row_group_size
+        self._buffer = []
+        self._schema = pyarrow.schema([
+            (column, pyarrow.decimal128(38, self.amounts[column]) if column in self.amounts else pyarrow.string())
+            for column in self.columns
+        ])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def _write_values(self, values):
+        self._buffer.append(values)
+        if len(self._buffer) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        data = {}
+        for i, column in enumerate(self.columns):
+            if column in self.amounts:
+                data[column] = [row[i] if isinstance(row[i], (Decimal, int)) and not isinstance(row[i], bool)
+                                else None for row in self._buffer]
+            else:
+                data[column] = [None if row[i] is None else str(row[i]) for row in self._buffer]
+        self._writer.write_table(self._pa.table(data, schema=self._schema))
+        self._buffer.clear()
+
+    def close(self):
+        if self._writer is not None:
+            self._flush()
+            self._writer.close()
+            self._writer = None
+
+
+WRITERS = {
+    "xlsx": XlsxWriter,
+    "csv": CsvWriter,
+    "parquet": ParquetWriter,
+}
+
+
+def output_format(config):
+    fmt = config.get("Output", "format", fallback="xlsx").strip().lower()
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Неизвестный формат вывода: {fmt}. Допустимые: {', '.join(OUTPUT_FORMATS)}")
+    return fmt
+
+
+def output_path(config, basename):
+    """Путь к итоговому файлу с учётом output_dir и выбранного формата из секции [Output]."""
+    filename = basename + OUTPUT_FORMATS[output_format(config)]
+    output_dir = config.get("Output", "output_dir", fallback="").strip()
+    if output_dir:
+        return os.path.join(output_dir, filename)
+    return filename
+
+
+def open_writer(config, path, columns, amounts=None):
+    """Писатель формата из секции [Output]; amounts — {колонка суммы: знаков после запятой}."""
+    return WRITERS[output_format(config)](path, columns, amounts)